@@ -1,9 +1,29 @@
 import time
 import os
 import sys
+import resource
+import subprocess
+import tempfile
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from src.merkle_rfc6962 import MerkleTree
+from src.merkle_rfc6962 import MerkleTree, LEAF_PREFIX, NODE_PREFIX, MODE_RFC6962
+from src.merkle_log import MerkleLog
+from src.merkle_sparse import SparseMerkleTree, DEPTH
+from src.sm3_ref import sm3_hash
+from src.sm3_opt import sm3_node_hash, sm3_hash_many, sm3_node_hash_many
+
+def bench_node_hash(count: int = 2000):
+    """内部节点哈希吞吐：通用 sm3_hash 路径（优化前）对比 65 字节定长快速路径（优化后）"""
+    pairs = [(os.urandom(32), os.urandom(32)) for _ in range(count)]
+    t0 = time.perf_counter()
+    for l, r in pairs:
+        sm3_hash(NODE_PREFIX + l + r)
+    t1 = time.perf_counter()
+    for l, r in pairs:
+        sm3_node_hash(l, r)
+    t2 = time.perf_counter()
+    print(f"节点哈希：优化前 {count / (t1 - t0):.0f} node-hashes/s，"
+          f"优化后 {count / (t2 - t1):.0f} node-hashes/s，加速比 {(t1 - t0) / (t2 - t1):.2f}x")
 
 def bench(num_leaves: int = 1000, leaf_size: int = 32, memory_friendly: bool = True):
     print(f"基准：leaf_count={num_leaves}, leaf_size={leaf_size}, memory_friendly={memory_friendly}")
@@ -22,6 +42,161 @@ def bench(num_leaves: int = 1000, leaf_size: int = 32, memory_friendly: bool = T
         ok = MerkleTree.verify_inclusion(leaves[idx], idx, proof, tree.get_root())
         print("验证包含证明:", ok)
 
-if __name__ == "__main__":
+def bench_workers(num_leaves: int = 1 << 20, leaf_size: int = 32, workers_list=(1, 2, 4, 8)):
+    """多进程并行构建的扩展性：不同 workers 数下的构建耗时与加速比"""
+    print(f"并行构建：leaf_count={num_leaves}, leaf_size={leaf_size}")
+    leaves = [os.urandom(leaf_size) for _ in range(num_leaves)]
+    base = None
+    root = None
+    for w in workers_list:
+        t0 = time.perf_counter()
+        tree = MerkleTree(leaves, workers=w)
+        t1 = time.perf_counter()
+        if base is None:
+            base, root = t1 - t0, tree.get_root()
+        assert tree.get_root() == root
+        print(f"  workers={w}: {t1 - t0:.2f} 秒，加速比 {base / (t1 - t0):.2f}x")
+
+def _rss_child(layout: str, num_leaves: int):
+    """子进程：按指定层存储方式构建树，打印峰值 RSS（KB）"""
+    data = os.urandom(32 * num_leaves)
+    leaves = [data[i:i + 32] for i in range(0, len(data), 32)]
+    del data
+    if layout == "list":
+        # 优化前的存储方式：每层为 bytes 对象列表
+        cur = sm3_hash_many([LEAF_PREFIX + d for d in leaves])
+        levels = [cur]
+        while len(cur) > 1:
+            cur = sm3_node_hash_many(cur + [cur[-1]] if len(cur) % 2 else cur)
+            levels.append(cur)
+    else:
+        tree = MerkleTree(leaves)
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+def bench_memory(counts=(1 << 20, 10 << 20)):
+    """峰值 RSS：每节点一个 bytes 对象（优化前）对比每层一个连续缓冲区（优化后）"""
+    for n in counts:
+        rss = {}
+        for layout in ("list", "buffer"):
+            out = subprocess.run([sys.executable, __file__, "--rss", layout, str(n)],
+                                 check=True, capture_output=True, text=True).stdout
+            rss[layout] = int(out.split()[-1]) / 1024
+        print(f"leaf_count={n}: 峰值 RSS 优化前 {rss['list']:.1f} MB，"
+              f"优化后 {rss['buffer']:.1f} MB（{rss['list'] / rss['buffer']:.2f}x）")
+
+def bench_persist(num_leaves: int = 10 << 20, path: str = None, proofs: int = 1000):
+    """持久化：save 耗时、mmap 打开耗时（应与叶子数无关）以及打开后的证明生成耗时"""
+    path = path or os.path.join(tempfile.gettempdir(), "merkle_bench.bin")
+    data = os.urandom(32 * num_leaves)
+    leaves = [data[i:i + 32] for i in range(0, len(data), 32)]
+    tree = MerkleTree(leaves)
+    t0 = time.perf_counter()
+    tree.save(path)
+    t1 = time.perf_counter()
+    opened = MerkleTree.open(path)
+    t2 = time.perf_counter()
+    for i in range(proofs):
+        opened.inclusion_proof((i * 2654435761) % num_leaves)
+    t3 = time.perf_counter()
+    assert opened.get_root() == tree.get_root()
+    print(f"持久化：leaf_count={num_leaves}, 文件 {os.path.getsize(path) / 1e6:.1f} MB，"
+          f"save {t1 - t0:.2f} 秒，open {(t2 - t1) * 1e3:.3f} 毫秒，"
+          f"证明 {(t3 - t2) / proofs * 1e6:.1f} 微秒/个")
+    opened.close()
+    os.remove(path)
+
+def bench_log(num_leaves: int = 20000, leaf_size: int = 32):
+    """只追加日志：逐条 append 并在每次追加后取 root 的吞吐"""
+    leaves = [os.urandom(leaf_size) for _ in range(num_leaves)]
+    log = MerkleLog()
+    t0 = time.perf_counter()
+    for d in leaves:
+        log.append(d)
+        log.root()
+    t1 = time.perf_counter()
+    print(f"追加日志：{num_leaves / (t1 - t0):.0f} appends/s（每次追加后计算 root）")
+
+def bench_rfc6962(num_leaves: int = 1 << 20, proofs: int = 100000):
+    """RFC 6962 模式：由已存层生成包含证明与一致性证明的速率（proofs/s）"""
+    data = os.urandom(32 * num_leaves)
+    leaves = [data[i:i + 32] for i in range(0, len(data), 32)]
+    tree = MerkleTree(leaves, mode=MODE_RFC6962)
+    idxs = [(i * 2654435761) % num_leaves for i in range(proofs)]
+    t0 = time.perf_counter()
+    for i in idxs:
+        tree.inclusion_proof(i)
+    t1 = time.perf_counter()
+    for i in idxs:
+        tree.consistency_proof(i + 1)
+    t2 = time.perf_counter()
+    print(f"RFC 6962：leaf_count={num_leaves}，包含证明 {proofs / (t1 - t0):.0f} proofs/s，"
+          f"一致性证明 {proofs / (t2 - t1):.0f} proofs/s")
+
+def bench_multi_proof(num_leaves: int = 1 << 20, count: int = 1000):
+    """批量证明：与 count 个独立证明比较证明字节数与验证耗时"""
+    import random
+    data = os.urandom(32 * num_leaves)
+    leaves = [data[i:i + 32] for i in range(0, len(data), 32)]
+    tree = MerkleTree(leaves)
+    root = tree.get_root()
+    idxs = random.sample(range(num_leaves), count)
+    singles = [tree.inclusion_proof(i) for i in idxs]
+    multi = tree.multi_proof(idxs)
+    t0 = time.perf_counter()
+    assert all(MerkleTree.verify_inclusion(leaves[i], i, p, root) for i, p in zip(idxs, singles))
+    t1 = time.perf_counter()
+    assert MerkleTree.verify_multi([leaves[i] for i in idxs], idxs, multi, root, num_leaves)
+    t2 = time.perf_counter()
+    single_bytes = sum(len(p) for p in singles) * 32
+    print(f"批量证明：{count} 个下标 / {num_leaves} 叶子，独立证明 {single_bytes} 字节、验证 {t1 - t0:.2f} 秒；"
+          f"multi_proof {len(multi) * 32} 字节、验证 {t2 - t1:.2f} 秒")
+
+def bench_stream(num_leaves: int = 1 << 20, leaf_size: int = 64):
+    """流式根：从生成器逐条产生叶子，报告吞吐与峰值 RSS（内存应与叶子数无关）"""
+    def gen():
+        block = os.urandom(leaf_size * 1024)
+        for i in range(num_leaves):
+            j = (i % 1024) * leaf_size
+            yield block[j:j + leaf_size]
+    t0 = time.perf_counter()
+    tree = MerkleTree.from_iterable(gen())
+    t1 = time.perf_counter()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"流式根：leaf_count={tree.n}，{tree.n / (t1 - t0):.0f} leaves/s，"
+          f"{tree.n * leaf_size / (t1 - t0) / 1e6:.2f} MB/s，当前进程峰值 RSS {rss:.1f} MB")
+
+def bench_sparse(entries: int = 20000, singles: int = 200, batch: int = 2000, proofs: int = 200):
+    """稀疏 Merkle 树：逐条更新与批量更新的 updates/s，以及压缩证明相对完整证明（256 个兄弟）的大小"""
+    smt = SparseMerkleTree()
+    keys = [os.urandom(32) for _ in range(entries)]
+    t0 = time.perf_counter()
+    smt.update_many((k, b"\x01") for k in keys)
+    t1 = time.perf_counter()
+    extra = [os.urandom(32) for _ in range(singles + batch)]
+    t2 = time.perf_counter()
+    for k in extra[:singles]:
+        smt.update(k, b"\x01")
+    t3 = time.perf_counter()
+    smt.update_many((k, b"\x01") for k in extra[singles:])
+    t4 = time.perf_counter()
+    sizes = [len(smt.prove(keys[(i * 2654435761) % entries])) for i in range(proofs)]
+    avg = sum(sizes) / len(sizes)
+    print(f"稀疏 Merkle 树：预载 {entries} 条 {entries / (t1 - t0):.0f} updates/s；"
+          f"逐条 {singles / (t3 - t2):.0f} updates/s，批量 {batch} 条 {batch / (t4 - t3):.0f} updates/s；"
+          f"证明平均 {avg:.0f} 字节（完整证明 {DEPTH * 32} 字节，{DEPTH * 32 / avg:.1f}x）；"
+          f"存储 {smt.node_count() / len(smt):.1f} 节点/键（完全展开约 {DEPTH} 节点/键）")
+
+if __name__ == "__main__" and sys.argv[1:2] == ["--rss"]:
+    _rss_child(sys.argv[2], int(sys.argv[3]))
+elif __name__ == "__main__":
     # 默认参数（方便在普通机器上快速跑）
+    bench_node_hash()
     bench(num_leaves=2000, leaf_size=32, memory_friendly=False)
+    bench_log()
+    bench_sparse()
+    bench_rfc6962()
+    bench_multi_proof()
+    bench_stream()
+    bench_workers(num_leaves=1 << 20)
+    bench_memory()
+    bench_persist()
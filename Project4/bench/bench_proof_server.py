@@ -0,0 +1,95 @@
+"""
+证明服务负载生成器：多个并发连接持续发送批量 proof 请求，报告 requests/s、proofs/s 与延迟分位数。
+不指定 --port / --unix 时，先构建一棵随机树保存到临时文件，再在子进程中启动本地服务（python -m src.merkle_server）。
+示例：
+  python bench/bench_proof_server.py --leaves 1048576 --clients 16 --batch 8 --duration 10
+  python bench/bench_proof_server.py --port 7000 --leaves 1048576   # 压测已在运行的实例（--leaves 为其叶子数）
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.merkle_rfc6962 import MerkleTree
+from src.merkle_server import ProofClient
+
+def _percentile(xs, q: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(q * (len(xs) - 1))))]
+
+async def _worker(args, n: int, deadline: float, latencies: list, rng: random.Random):
+    client = await ProofClient.connect(args.host, args.port, args.unix)
+    hot = max(1, int(n * args.hot))
+    while time.perf_counter() < deadline:
+        # 按 --hot 比例从前 hot 个下标中抽取，模拟热点证明
+        idxs = [rng.randrange(hot) for _ in range(args.batch)]
+        t0 = time.perf_counter()
+        await client.proofs(idxs)
+        latencies.append(time.perf_counter() - t0)
+    await client.close()
+
+async def run_load(args, n: int):
+    latencies = []
+    deadline = time.perf_counter() + args.duration
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_worker(args, n, deadline, latencies, random.Random(i)) for i in range(args.clients)))
+    elapsed = time.perf_counter() - t0
+    reqs = len(latencies)
+    print(f"clients={args.clients} batch={args.batch}: {reqs / elapsed:.0f} requests/s，"
+          f"{reqs * args.batch / elapsed:.0f} proofs/s")
+    print(f"延迟 p50 {_percentile(latencies, 0.50) * 1e3:.3f} ms  p95 {_percentile(latencies, 0.95) * 1e3:.3f} ms  "
+          f"p99 {_percentile(latencies, 0.99) * 1e3:.3f} ms  平均 {statistics.mean(latencies) * 1e3:.3f} ms")
+
+async def _wait_ready(args, proc, timeout: float = 60.0):
+    t_end = time.perf_counter() + timeout
+    while True:
+        try:
+            client = await ProofClient.connect(args.host, args.port, args.unix)
+            await client.close()
+            return
+        except OSError:
+            if proc.poll() is not None or time.perf_counter() > t_end:
+                raise RuntimeError("本地证明服务未能启动")
+            await asyncio.sleep(0.1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Merkle 证明服务负载生成器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="已运行实例的端口（不给则启动本地实例）")
+    parser.add_argument("--unix", help="已运行实例的 Unix 套接字路径")
+    parser.add_argument("--leaves", type=int, default=1 << 16, help="树的叶子数")
+    parser.add_argument("--clients", type=int, default=8, help="并发连接数")
+    parser.add_argument("--batch", type=int, default=8, help="每个请求包含的下标数")
+    parser.add_argument("--duration", type=float, default=5.0, help="压测时长（秒）")
+    parser.add_argument("--hot", type=float, default=0.01, help="请求下标集中在前 hot 比例的叶子上")
+    args = parser.parse_args()
+
+    proc = path = None
+    if args.port is None and args.unix is None:
+        data = os.urandom(32 * args.leaves)
+        tree = MerkleTree([data[i:i + 32] for i in range(0, len(data), 32)])
+        path = os.path.join(tempfile.gettempdir(), "merkle_server_bench.bin")
+        tree.save(path)
+        args.port = 7000 + os.getpid() % 1000
+        proc = subprocess.Popen([sys.executable, "-m", "src.merkle_server", path, "--port", str(args.port)],
+                                cwd=ROOT, stdout=subprocess.DEVNULL)
+    try:
+        if proc is not None:
+            asyncio.run(_wait_ready(args, proc))
+        asyncio.run(run_load(args, args.leaves))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+            os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import time
+import os
+import subprocess
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.sm3_ref import IV, compress, sm3_hash
+from src import sm3_opt
+from src.sm3_opt import SM3, sm3_hash_fast, sm3_hash_prefixed
+from src.sm3_mac import hmac_sm3, hmac_sm3_many, sm3_kdf
+
+def _mbps(nbytes: int, seconds: float) -> float:
+    return nbytes / seconds / 1e6 if seconds > 0 else float("inf")
+
+def bench(size: int, chunk: int = 1 << 20):
+    """对比参考实现 sm3_hash 与流式 SM3 对象在给定消息长度下的吞吐（MB/s）"""
+    data = os.urandom(size)
+    t0 = time.perf_counter()
+    ref = sm3_hash(data)
+    t1 = time.perf_counter()
+    h = SM3()
+    mv = memoryview(data)
+    for i in range(0, size, chunk):
+        h.update(mv[i:i + chunk])
+    opt = h.digest()
+    t2 = time.perf_counter()
+    assert ref == opt
+    print(f"size={size:>10} 字节  sm3_hash: {_mbps(size, t1 - t0):7.3f} MB/s  "
+          f"SM3.update: {_mbps(size, t2 - t1):7.3f} MB/s  加速比 {(t1 - t0) / (t2 - t1):.2f}x")
+
+def bench_prefix(prefix_len: int = 1024, suffix_len: int = 32, count: int = 200):
+    """共享前缀：每次整条重新哈希 对比 复用缓存的 midstate 只哈希后缀"""
+    prefix = os.urandom(prefix_len)
+    suffixes = [os.urandom(suffix_len) for _ in range(count)]
+    t0 = time.perf_counter()
+    full = [sm3_hash_fast(prefix + s) for s in suffixes]
+    t1 = time.perf_counter()
+    cached = [sm3_hash_prefixed(prefix, s) for s in suffixes]
+    t2 = time.perf_counter()
+    assert full == cached
+    print(f"共享前缀 {prefix_len} 字节 + 后缀 {suffix_len} 字节：整条哈希 {count / (t1 - t0):.0f} 次/s，"
+          f"midstate 缓存 {count / (t2 - t1):.0f} 次/s，加速比 {(t1 - t0) / (t2 - t1):.2f}x")
+
+def _blocks_per_sec(fn, data: bytes) -> float:
+    V = tuple(IV)
+    t0 = time.perf_counter()
+    for off in range(0, len(data), 64):
+        V = fn(V, data, off)
+    return (len(data) // 64) / (time.perf_counter() - t0)
+
+def bench_compress(single: int = 3000, multi_blocks: int = 2000):
+    """
+    压缩函数对比：参考实现 compress、两段式循环版本、导入时生成的完全展开版本。
+    单块：对同一个 64 字节块反复压缩；多块：连续压缩 multi_blocks 个随机块。
+    """
+    block = os.urandom(64)
+    data = os.urandom(64 * multi_blocks)
+    ref = lambda V, d, off: compress(list(V), d[off:off + 64])
+    unrolled = sm3_opt._build_unrolled()[1]
+    for name, fn in [("sm3_ref.compress", ref), ("循环版本", sm3_opt._compress_fast_loop), ("完全展开", unrolled)]:
+        s = _blocks_per_sec(fn, block * single)
+        m = _blocks_per_sec(fn, data)
+        print(f"{name:>16}: 单块 {s:8.0f} blocks/s  多块 {m:8.0f} blocks/s ({m * 64 / 1e6:.3f} MB/s)")
+
+def bench_hmac(msg_len: int = 64, count: int = 2000):
+    """同一密钥下的 HMAC-SM3：朴素 sm3_hash(k ^ ipad || ...) 构造 对比 缓存密钥 midstate 的逐条 / 批量接口"""
+    key = os.urandom(32).ljust(64, b"\x00")
+    ipad = bytes(b ^ 0x36 for b in key)
+    opad = bytes(b ^ 0x5C for b in key)
+    msgs = [os.urandom(msg_len) for _ in range(count)]
+    t0 = time.perf_counter()
+    naive = [sm3_hash(opad + sm3_hash(ipad + m)) for m in msgs]
+    t1 = time.perf_counter()
+    cached = [hmac_sm3(key, m) for m in msgs]
+    t2 = time.perf_counter()
+    batched = hmac_sm3_many(key, msgs)
+    t3 = time.perf_counter()
+    assert naive == cached == batched
+    print(f"HMAC-SM3（消息 {msg_len} 字节）：朴素 {count / (t1 - t0):.0f} msgs/s，"
+          f"缓存 pad {count / (t2 - t1):.0f} msgs/s（{(t1 - t0) / (t2 - t1):.2f}x），"
+          f"批量 {count / (t3 - t2):.0f} msgs/s（{(t1 - t0) / (t3 - t2):.2f}x）")
+
+def bench_kdf(z_len: int = 64, klen: int = 1 << 16):
+    """SM2 KDF：逐个计数器整条哈希 Z || ct 对比 共享 Z 的 midstate 后批量计算计数器块"""
+    z = os.urandom(z_len)
+    t0 = time.perf_counter()
+    naive = b"".join(sm3_hash(z + ct.to_bytes(4, "big")) for ct in range(1, -(-klen // 32) + 1))[:klen]
+    t1 = time.perf_counter()
+    fast = sm3_kdf(z, klen)
+    t2 = time.perf_counter()
+    assert naive == fast
+    print(f"KDF（Z {z_len} 字节，派生 {klen} 字节）：朴素 {klen / (t1 - t0) / 1e6:.3f} MB/s，"
+          f"sm3_kdf {klen / (t2 - t1) / 1e6:.3f} MB/s，加速比 {(t1 - t0) / (t2 - t1):.2f}x")
+
+def _backend_child(size: int, count: int):
+    """子进程：在当前后端下测量 sm3_hash_fast 吞吐、sm3_hash_many 与 Merkle 构建速率，打印一行结果"""
+    from src.merkle_rfc6962 import MerkleTree
+    data = os.urandom(size)
+    msgs = [os.urandom(32) for _ in range(count)]
+    t0 = time.perf_counter()
+    sm3_opt.sm3_hash_fast(data)
+    t1 = time.perf_counter()
+    sm3_opt.sm3_hash_many(msgs)
+    t2 = time.perf_counter()
+    MerkleTree(msgs)
+    t3 = time.perf_counter()
+    print(f"{_mbps(size, t1 - t0):.3f} {count / (t2 - t1):.0f} {count / (t3 - t2):.0f}")
+
+def bench_backends(size: int = 1 << 20, count: int = 20000):
+    """编译后端对比纯 Python / NumPy 后端：各在独立子进程中运行（SM3_NO_NATIVE=1 强制回退）"""
+    if not sm3_opt.HAVE_NATIVE:
+        print("未找到编译后端（python -m src.sm3_native 构建），只测纯 Python 后端")
+    rows = [("纯 Python/NumPy", {"SM3_NO_NATIVE": "1"})]
+    if sm3_opt.HAVE_NATIVE:
+        rows.append(("编译后端 (C)", {}))
+    for name, extra in rows:
+        out = subprocess.run([sys.executable, __file__, "--backend", str(size), str(count)],
+                             env={**os.environ, **extra}, check=True, capture_output=True, text=True).stdout
+        mbps, many, merkle = out.split()
+        print(f"{name:>16}: sm3_hash_fast {float(mbps):9.3f} MB/s  sm3_hash_many {int(many):9d} 条/s  "
+              f"Merkle 构建 {int(merkle):9d} leaves/s")
+
+if __name__ == "__main__" and sys.argv[1:2] == ["--backend"]:
+    _backend_child(int(sys.argv[2]), int(sys.argv[3]))
+elif __name__ == "__main__":
+    bench_backends()
+    bench_compress()
+    bench_hmac()
+    bench_kdf()
+    bench_prefix()
+    # 默认 1 KB / 1 MB / 100 MB；可通过命令行传入字节数覆盖，例如: python bench_sm3.py 1024 1048576
+    sizes = [int(a) for a in sys.argv[1:]] or [1 << 10, 1 << 20, 100 << 20]
+    for s in sizes:
+        bench(s)
@@ -0,0 +1,143 @@
+"""
+SM3 / Merkle 基准测试套件（带回归检测）：
+- 每个用例先预热 warmup 次，再像 timeit.Timer.autorange 那样确定内层循环次数
+  （每个样本至少运行 --min-time 秒，默认 10 ms），重复采样 repeat 次，
+  记录单次调用耗时（样本耗时 / 循环次数）的中位数与 p95；
+- 结果以 JSON 输出（--json），可与基线文件比较（--baseline）：
+  任一用例的中位数比基线慢超过 --threshold（默认 10%）时以非零状态退出；
+- --update-baseline 把本次结果写为 --baseline 指定的新基线（须同时给出 --baseline）。
+示例：
+  python bench/bench_suite.py --sizes 64 1024 --leaves 1000 --json out.json --baseline bench/baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.sm3_ref import sm3_hash
+from src.sm3_opt import sm3_single_block_fast, sm3_hash_many
+from src.merkle_rfc6962 import MerkleTree
+
+def _p95(xs):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(0.95 * (len(xs) - 1))))]
+
+def autorange(fn, min_time: float) -> int:
+    """按 1, 2, 5, 10, 20, 50, ... 递增循环次数，直到一次采样耗时不少于 min_time 秒，返回该次数"""
+    i = 1
+    while True:
+        for loops in (i, 2 * i, 5 * i):
+            t0 = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            if time.perf_counter() - t0 >= min_time:
+                return loops
+        i *= 10
+
+def measure(fn, warmup: int, repeat: int, min_time: float = 0.01) -> dict:
+    """预热后按 autorange 确定的循环次数重复采样，返回单次调用耗时（秒）的中位数 / p95 / 最小值"""
+    for _ in range(warmup):
+        fn()
+    loops = autorange(fn, min_time)
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        runs.append((time.perf_counter() - t0) / loops)
+    return {"median": statistics.median(runs), "p95": _p95(runs), "min": min(runs), "repeat": repeat,
+            "loops": loops}
+
+def build_cases(sizes, leaves_counts, batch: int, proofs: int):
+    """生成 (用例名, 可调用对象, 每次运行处理的条目数) 列表"""
+    rng = random.Random(2025)
+    cases = []
+    for size in sizes:
+        msg = bytes(rng.getrandbits(8) for _ in range(size))
+        cases.append((f"sm3_ref.sm3_hash/{size}B", lambda m=msg: sm3_hash(m), 1))
+    short = b"x" * 40
+    cases.append(("sm3_opt.sm3_single_block_fast/40B", lambda: sm3_single_block_fast(short), 1))
+    msgs = [i.to_bytes(4, "big") * 8 for i in range(batch)]
+    cases.append((f"sm3_opt.sm3_hash_many/{batch}x32B", lambda: sm3_hash_many(msgs), batch))
+    for n in leaves_counts:
+        leaves = [i.to_bytes(8, "big") * 4 for i in range(n)]
+        cases.append((f"merkle.build/{n}", lambda l=leaves: MerkleTree(l), n))
+        tree = MerkleTree(leaves)
+        root = tree.get_root()
+        idxs = [rng.randrange(n) for _ in range(proofs)]
+        cases.append((f"merkle.proof/{n}x{proofs}",
+                      lambda t=tree, ix=idxs: [t.inclusion_proof(i) for i in ix], proofs))
+        pairs = [(leaves[i], i, tree.inclusion_proof(i)) for i in idxs]
+        cases.append((f"merkle.verify/{n}x{proofs}",
+                      lambda ps=pairs, r=root: [MerkleTree.verify_inclusion(d, i, p, r) for d, i, p in ps],
+                      proofs))
+    return cases
+
+def compare(results: dict, baseline: dict, threshold: float):
+    """返回 (用例名, 基线中位数, 本次中位数, 变化比例) 中超过阈值的回归列表"""
+    regressions = []
+    for name, r in results.items():
+        b = baseline.get(name)
+        if not b:
+            continue
+        ratio = r["median"] / b["median"] - 1
+        if ratio > threshold:
+            regressions.append((name, b["median"], r["median"], ratio))
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="SM3 / Merkle 基准测试套件")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 1024, 16384], help="sm3_hash 消息长度（字节）")
+    parser.add_argument("--leaves", type=int, nargs="+", default=[1000, 10000], help="Merkle 叶子数")
+    parser.add_argument("--batch", type=int, default=1000, help="sm3_hash_many 的消息条数")
+    parser.add_argument("--proofs", type=int, default=200, help="每次运行生成/验证的证明个数")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.01, help="每个样本的最短运行时间（秒）")
+    parser.add_argument("--filter", default="", help="只运行名字包含该子串的用例")
+    parser.add_argument("--json", help="把结果写入该 JSON 文件")
+    parser.add_argument("--baseline", help="与该基线 JSON 文件比较")
+    parser.add_argument("--threshold", type=float, default=0.10, help="中位数变慢超过该比例视为回归")
+    parser.add_argument("--update-baseline", action="store_true", help="把本次结果写为 --baseline 指定的基线")
+    args = parser.parse_args(argv)
+    if args.update_baseline and not args.baseline:
+        parser.error("--update-baseline 需要同时用 --baseline 指定基线文件")
+
+    results = {}
+    for name, fn, items in build_cases(args.sizes, args.leaves, args.batch, args.proofs):
+        if args.filter not in name:
+            continue
+        r = measure(fn, args.warmup, args.repeat, args.min_time)
+        r["items_per_s"] = items / r["median"] if r["median"] else float("inf")
+        results[name] = r
+        print(f"{name:<40} 中位数 {r['median'] * 1e3:10.3f} ms  p95 {r['p95'] * 1e3:10.3f} ms  "
+              f"{r['items_per_s']:12.1f} 条/s  x{r['loops']}")
+
+    report = {"python": platform.python_version(), "machine": platform.machine(), "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"已更新基线 {args.baseline}")
+        return 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new, ratio in regressions:
+            print(f"回归: {name} 基线 {old * 1e3:.3f} ms -> {new * 1e3:.3f} ms ({ratio:+.1%})")
+        if regressions:
+            return 1
+        print(f"与基线相比无超过 {args.threshold:.0%} 的回归")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
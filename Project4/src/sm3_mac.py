@@ -0,0 +1,107 @@
+"""
+基于 SM3 的 HMAC 与 SM2 密钥派生函数 KDF（GB/T 32918.4）。
+
+直接用 SM3(key || msg) 作 MAC 会受长度扩展攻击（见 length_extension.py），应使用 HMAC：
+  HMAC(K, m) = H((K' ^ opad) || H((K' ^ ipad) || m))
+K' ^ ipad 与 K' ^ opad 恰好各占一个块，压缩后的链值只取决于密钥，
+因此按密钥缓存这两个 midstate：之后每条消息只需压缩消息本身与外层的一个块。
+
+KDF(Z, klen) = H(Z || ct=1) || H(Z || ct=2) || ...（ct 为 32-bit 大端计数器），截取 klen 字节。
+所有计数器块共享 Z 的完整块，只压缩一次；剩余尾部 + 计数器 + 填充的等长块
+经 sm3_hash_many_from 批量处理（有 NumPy 时走向量化引擎）。
+"""
+
+from __future__ import annotations
+import hmac as _hmac
+from functools import lru_cache
+from typing import List, Tuple
+from .sm3_opt import (SM3, PREFIX_CACHE_SIZE, _compress_blocks, _compress_fast, _final_blocks,
+                      _pack8, sm3_hash_fast, sm3_hash_many_from)
+from .sm3_ref import IV
+
+BLOCK_SIZE = 64
+_IPAD = bytes(x ^ 0x36 for x in range(256))
+_OPAD = bytes(x ^ 0x5C for x in range(256))
+
+@lru_cache(maxsize=PREFIX_CACHE_SIZE)
+def hmac_pads(key: bytes) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    """
+    返回 (内层 midstate, 外层 midstate)：分别为压缩 K' ^ ipad、K' ^ opad 一个块后的链值。
+    按密钥 LRU 缓存（缓存中保存的是由密钥导出的链值，与密钥同等敏感）。
+    """
+    if len(key) > BLOCK_SIZE:
+        key = sm3_hash_fast(key)
+    key = key.ljust(BLOCK_SIZE, b"\x00")
+    V = tuple(IV)
+    return _compress_fast(V, key.translate(_IPAD)), _compress_fast(V, key.translate(_OPAD))
+
+def _outer(ostate: Tuple[int, ...], inner: bytes) -> bytes:
+    # 外层消息为 opad 块 + 32 字节内层摘要，填充后恰好还剩一个块
+    return _pack8(*_compress_fast(ostate, _final_blocks(inner, BLOCK_SIZE + 32)))
+
+class HMAC_SM3:
+    """
+    hmac 模块风格的流式 HMAC-SM3：
+      h = HMAC_SM3(key); h.update(a); h.update(b); h.digest()
+    内外层 midstate 取自 hmac_pads 缓存，构造对象时不再压缩密钥块。
+    """
+    name = "hmac-sm3"
+    digest_size = 32
+    block_size = BLOCK_SIZE
+
+    __slots__ = ("_inner", "_ostate")
+
+    def __init__(self, key: bytes, msg: bytes = b""):
+        istate, self._ostate = hmac_pads(bytes(key))
+        self._inner = SM3.from_state(istate, BLOCK_SIZE)
+        if msg:
+            self._inner.update(msg)
+
+    def update(self, msg) -> None:
+        self._inner.update(msg)
+
+    def copy(self) -> "HMAC_SM3":
+        other = HMAC_SM3.__new__(HMAC_SM3)
+        other._inner = self._inner.copy()
+        other._ostate = self._ostate
+        return other
+
+    def digest(self) -> bytes:
+        return _outer(self._ostate, self._inner.digest())
+
+    def hexdigest(self) -> str:
+        return self.digest().hex()
+
+def hmac_sm3(key: bytes, msg: bytes) -> bytes:
+    """HMAC-SM3(key, msg)，32 字节"""
+    istate, ostate = hmac_pads(bytes(key))
+    h = SM3.from_state(istate, BLOCK_SIZE)
+    h.update(msg)
+    return _outer(ostate, h.digest())
+
+def hmac_sm3_many(key: bytes, messages: List[bytes]) -> List[bytes]:
+    """同一密钥下批量计算 HMAC-SM3：内层与外层各走一次 sm3_hash_many_from"""
+    istate, ostate = hmac_pads(bytes(key))
+    inner = sm3_hash_many_from(istate, BLOCK_SIZE, messages)
+    return sm3_hash_many_from(ostate, BLOCK_SIZE, inner)
+
+def hmac_sm3_verify(key: bytes, msg: bytes, mac: bytes) -> bool:
+    """常数时间比较的 HMAC-SM3 校验"""
+    return _hmac.compare_digest(hmac_sm3(key, msg), mac)
+
+def sm3_kdf(z: bytes, klen: int) -> bytes:
+    """
+    SM2 密钥派生函数：由共享秘密 z 派生 klen 字节密钥。
+    z 的完整块只压缩一次，ct = 1..ceil(klen/32) 的各计数器块批量计算。
+    """
+    if klen < 0:
+        raise ValueError("klen 不能为负")
+    count = -(-klen // 32)
+    if count >= 1 << 32:
+        raise ValueError("klen 过大：计数器超过 32 位")
+    z = bytes(z)
+    full = len(z) - len(z) % BLOCK_SIZE
+    V = _compress_blocks(tuple(IV), z, 0, full // BLOCK_SIZE)
+    rest = z[full:]
+    tails = [rest + ct.to_bytes(4, "big") for ct in range(1, count + 1)]
+    return b"".join(sm3_hash_many_from(V, full, tails))[:klen]
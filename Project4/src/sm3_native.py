@@ -0,0 +1,152 @@
+"""
+可选的编译后端：用 ctypes 加载 csrc/sm3.c 编译出的共享库。
+- 查找顺序：环境变量 SM3_NATIVE_LIB 指定的路径，其次 Project4/build/ 下的 libsm3.so / libsm3.dylib / sm3.dll；
+- 设置 SM3_NO_NATIVE=1 可强制不加载（回退到纯 Python / NumPy 路径）；
+- 未找到或加载失败时 lib = None、HAVE_NATIVE = False，导入本模块本身不会失败；
+- 输入经缓冲区协议（PyObject_GetBuffer）直接取得 bytes / bytearray / memoryview / mmap 的底层指针，
+  不做拷贝；只读缓冲区同样适用。
+构建共享库：python -m src.sm3_native [输出目录]
+"""
+
+from __future__ import annotations
+import ctypes
+import os
+import subprocess
+import sys
+from typing import List, Optional, Tuple
+
+_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SOURCE = os.path.join(_ROOT, "csrc", "sm3.c")
+BUILD_DIR = os.path.join(_ROOT, "build")
+
+if sys.platform == "win32":
+    LIB_NAME = "sm3.dll"
+elif sys.platform == "darwin":
+    LIB_NAME = "libsm3.dylib"
+else:
+    LIB_NAME = "libsm3.so"
+
+class _Py_buffer(ctypes.Structure):
+    _fields_ = [
+        ("buf", ctypes.c_void_p),
+        ("obj", ctypes.py_object),
+        ("len", ctypes.c_ssize_t),
+        ("itemsize", ctypes.c_ssize_t),
+        ("readonly", ctypes.c_int),
+        ("ndim", ctypes.c_int),
+        ("format", ctypes.c_char_p),
+        ("shape", ctypes.POINTER(ctypes.c_ssize_t)),
+        ("strides", ctypes.POINTER(ctypes.c_ssize_t)),
+        ("suboffsets", ctypes.POINTER(ctypes.c_ssize_t)),
+        ("internal", ctypes.c_void_p),
+    ]
+
+_PyObject_GetBuffer = ctypes.pythonapi.PyObject_GetBuffer
+_PyObject_GetBuffer.argtypes = [ctypes.py_object, ctypes.POINTER(_Py_buffer), ctypes.c_int]
+_PyObject_GetBuffer.restype = ctypes.c_int
+_PyBuffer_Release = ctypes.pythonapi.PyBuffer_Release
+_PyBuffer_Release.argtypes = [ctypes.POINTER(_Py_buffer)]
+_PyBuffer_Release.restype = None
+_PyBUF_SIMPLE = 0  # 要求 C 连续、按字节访问
+
+class _Buffer:
+    """with _Buffer(obj) as (ptr, n): 在 with 块内持有 obj 的底层缓冲区（零拷贝）"""
+    __slots__ = ("_obj", "_view")
+
+    def __init__(self, obj):
+        self._obj = obj
+        self._view = _Py_buffer()
+
+    def __enter__(self) -> Tuple[int, int]:
+        _PyObject_GetBuffer(self._obj, ctypes.byref(self._view), _PyBUF_SIMPLE)
+        return self._view.buf or 0, self._view.len
+
+    def __exit__(self, *exc) -> None:
+        _PyBuffer_Release(ctypes.byref(self._view))
+
+def _declare(lib) -> None:
+    u8p = ctypes.c_void_p
+    u32x8 = ctypes.POINTER(ctypes.c_uint32)
+    lib.sm3_compress_blocks.argtypes = [u32x8, u8p, ctypes.c_size_t]
+    lib.sm3_compress_blocks.restype = None
+    lib.sm3_hash.argtypes = [u8p, ctypes.c_size_t, ctypes.c_char_p]
+    lib.sm3_hash.restype = None
+    lib.sm3_hash_many_from.argtypes = [u32x8, ctypes.c_uint64, u8p, ctypes.POINTER(ctypes.c_uint64),
+                                       ctypes.c_size_t, u8p]
+    lib.sm3_hash_many_from.restype = None
+    lib.sm3_node_hash_level.argtypes = [u8p, ctypes.c_size_t, u8p]
+    lib.sm3_node_hash_level.restype = None
+
+def load(path: Optional[str] = None):
+    """加载共享库并声明函数签名；失败时返回 None"""
+    path = path or os.environ.get("SM3_NATIVE_LIB") or os.path.join(BUILD_DIR, LIB_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        lib = ctypes.CDLL(path)
+        _declare(lib)
+    except (OSError, AttributeError):
+        return None
+    return lib
+
+def build(out_dir: str = BUILD_DIR, cc: Optional[str] = None) -> str:
+    """用系统 C 编译器把 csrc/sm3.c 编译为共享库，返回库文件路径"""
+    os.makedirs(out_dir, exist_ok=True)
+    out = os.path.join(out_dir, LIB_NAME)
+    cc = cc or os.environ.get("CC", "cc")
+    subprocess.run([cc, "-O3", "-shared", "-fPIC", SOURCE, "-o", out], check=True)
+    return out
+
+lib = None if os.environ.get("SM3_NO_NATIVE") else load()
+HAVE_NATIVE = lib is not None
+
+def _state_array(V) -> "ctypes.Array":
+    return (ctypes.c_uint32 * 8)(*V)
+
+def compress_blocks(V: Tuple[int, ...], data, off: int, nblocks: int) -> Tuple[int, ...]:
+    """在链值 V 上压缩 data[off:off + 64 * nblocks]，返回新链值"""
+    st = _state_array(V)
+    with _Buffer(data) as (ptr, n):
+        if off + 64 * nblocks > n:
+            raise ValueError("数据不足 nblocks 个块")
+        lib.sm3_compress_blocks(st, ptr + off, nblocks)
+    return tuple(st)
+
+def sm3_hash(data) -> bytes:
+    out = ctypes.create_string_buffer(32)
+    with _Buffer(data) as (ptr, n):
+        lib.sm3_hash(ptr, n, out)
+    return out.raw
+
+def hash_many_into(messages: List[bytes], state=None, length: int = 0) -> bytearray:
+    """
+    批量哈希：消息拼接成一个缓冲区并附带偏移表一次传入 C 端，摘要写入连续的 32*N 字节缓冲区。
+    给出 state 时从该 midstate（已处理 length 字节）出发。
+    """
+    n = len(messages)
+    out = bytearray(32 * n)
+    if not n:
+        return out
+    data = b"".join(messages)
+    offsets = (ctypes.c_uint64 * (n + 1))()
+    pos = 0
+    for i, m in enumerate(messages):
+        offsets[i] = pos
+        pos += len(m)
+    offsets[n] = pos
+    st = _state_array(state) if state is not None else None
+    with _Buffer(data) as (ptr, _), _Buffer(out) as (optr, _):
+        lib.sm3_hash_many_from(st, length, ptr, offsets, n, optr)
+    return out
+
+def node_hash_level(level) -> bytearray:
+    """对连续存储的一层节点两两计算 SM3(0x01 || left || right)"""
+    with _Buffer(level) as (ptr, n):
+        pairs = n // 64
+        out = bytearray(32 * pairs)
+        with _Buffer(out) as (optr, _):
+            lib.sm3_node_hash_level(ptr, pairs, optr)
+    return out
+
+if __name__ == "__main__":
+    print(build(*sys.argv[1:2]))
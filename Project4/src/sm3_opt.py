@@ -1,6 +1,20 @@
 from __future__ import annotations
-from typing import List
-from .sm3_ref import IV, MASK32, _rol, P0, sm3_hash  # 复用参考实现中的函数与常量
+import os
+import struct
+from functools import lru_cache
+from typing import List, Tuple
+from .sm3_ref import IV, MASK32  # 复用参考实现中的常量
+from .sm3_batch import HAVE_NUMPY
+from . import sm3_native as _native
+
+if HAVE_NUMPY:
+    import numpy as np
+    from .sm3_batch import sm3_hash_batch, node_hash_batch, hash_blocks, pack_padded
+
+# 消息条数达到该阈值时改用 NumPy 批量引擎（数组运算的固定开销在小批量时不划算）
+BATCH_THRESHOLD = 64
+# 单次交给批量引擎的最大条数（每条消息字在扩展阶段会展开成 68 个 uint32 数组元素）
+BATCH_CHUNK = 1 << 15
 
 # 为了速度在本模块内再定义本地 rol（减少全局查找）
 def _rol_local(x: int, n: int) -> int:
@@ -10,6 +24,259 @@ def _rol_local(x: int, n: int) -> int:
 # 复制 T_j 常量（本地使用）
 T = [0x79CC4519] * 16 + [0x7A879D8A] * 48
 
+_unpack16 = struct.Struct(">16I").unpack_from
+_pack8 = struct.Struct(">8I").pack
+
+def _expand(data, off: int = 0) -> List[int]:
+    """消息扩展：从 data[off:off+64] 读取一个块，返回 W0..W67（W'_j 在轮函数中按需计算）"""
+    M = MASK32
+    W = list(_unpack16(data, off))
+    # W16..W67 扩展（内联 P1(x) = x ^ (x<<<15) ^ (x<<<23)）
+    for j in range(16, 68):
+        x = W[j - 16] ^ W[j - 9]
+        y = W[j - 3]
+        x ^= ((y << 15) & M) | (y >> 17)
+        y = W[j - 13]
+        W.append(x ^ (((x << 15) & M) | (x >> 17)) ^ (((x << 23) & M) | (x >> 9))
+                 ^ (((y << 7) & M) | (y >> 25)) ^ W[j - 6])
+    return W
+
+# T_j <<< j 预计算常量表（轮函数中不再逐轮计算循环移位）
+TJ_ROT = [_rol_local(T[j], j) for j in range(64)]
+
+def _compress_w_loop(V: Tuple[int, ...], W: List[int]) -> Tuple[int, ...]:
+    """
+    使用已扩展好的消息字 W 执行 64 轮压缩（循环版本）。
+    轮函数全部内联、使用局部变量；按 FF/GG 的两种形式拆成 0..15 与 16..63 两段循环，
+    循环体内没有分支。V 为 8 个 32-bit 链值组成的元组，返回新的链值元组。
+    """
+    M = MASK32
+    K = TJ_ROT
+    A, B, C, D, E, F, G, H = V
+    for j in range(16):
+        A12 = ((A << 12) & M) | (A >> 20)
+        SS1 = (A12 + E + K[j]) & M
+        SS1 = ((SS1 << 7) & M) | (SS1 >> 25)
+        Wj = W[j]
+        TT1 = ((A ^ B ^ C) + D + (SS1 ^ A12) + (Wj ^ W[j + 4])) & M
+        TT2 = ((E ^ F ^ G) + H + SS1 + Wj) & M
+        D = C
+        C = ((B << 9) & M) | (B >> 23)
+        B = A
+        A = TT1
+        H = G
+        G = ((F << 19) & M) | (F >> 13)
+        F = E
+        # 内联 P0(x) = x ^ (x<<<9) ^ (x<<<17)
+        E = TT2 ^ (((TT2 << 9) & M) | (TT2 >> 23)) ^ (((TT2 << 17) & M) | (TT2 >> 15))
+    for j in range(16, 64):
+        A12 = ((A << 12) & M) | (A >> 20)
+        SS1 = (A12 + E + K[j]) & M
+        SS1 = ((SS1 << 7) & M) | (SS1 >> 25)
+        Wj = W[j]
+        TT1 = (((A & B) | (A & C) | (B & C)) + D + (SS1 ^ A12) + (Wj ^ W[j + 4])) & M
+        TT2 = (((E & F) | (~E & G)) + H + SS1 + Wj) & M
+        D = C
+        C = ((B << 9) & M) | (B >> 23)
+        B = A
+        A = TT1
+        H = G
+        G = ((F << 19) & M) | (F >> 13)
+        F = E
+        E = TT2 ^ (((TT2 << 9) & M) | (TT2 >> 23)) ^ (((TT2 << 17) & M) | (TT2 >> 15))
+    return (V[0] ^ A, V[1] ^ B, V[2] ^ C, V[3] ^ D,
+            V[4] ^ E, V[5] ^ F, V[6] ^ G, V[7] ^ H)
+
+def _compress_fast_loop(V: Tuple[int, ...], data, off: int = 0) -> Tuple[int, ...]:
+    """
+    通用压缩函数（循环版本）：直接从 data[off:off+64] 读取一个块，不做切片拷贝。
+    """
+    return _compress_w_loop(V, _expand(data, off))
+
+def _gen_unrolled(expand: bool) -> str:
+    """
+    生成完全展开的压缩函数源码：
+    - 64 轮全部展开，T_j <<< j 以字面常量写入，FF/GG 按轮号直接选用对应形式；
+    - 通过逐轮“重命名寄存器”代替 D=C、B=A 等 8 次赋值，每轮只产生新的 A 与 E；
+    - expand=True 时消息扩展也展开为局部变量 w0..w67（函数签名为 (V, data, off)），
+      否则从已扩展好的列表 W 解包（签名为 (V, W)）。
+    """
+    lines = []
+    if expand:
+        lines.append("def _compress_fast_unrolled(V, data, off=0):")
+        lines.append("    " + ", ".join(f"w{i}" for i in range(16)) + " = _unpack16(data, off)")
+        for j in range(16, 68):
+            lines.append(f"    x = w{j - 16} ^ w{j - 9} ^ (((w{j - 3} << 15) & M) | (w{j - 3} >> 17))")
+            lines.append(f"    w{j} = x ^ (((x << 15) & M) | (x >> 17)) ^ (((x << 23) & M) | (x >> 9))"
+                         f" ^ (((w{j - 13} << 7) & M) | (w{j - 13} >> 25)) ^ w{j - 6}")
+    else:
+        lines.append("def _compress_w_unrolled(V, W):")
+        lines.append("    " + ", ".join(f"w{i}" for i in range(68)) + " = W")
+    regs = ["a", "b", "c", "d", "e", "f", "g", "h"]
+    lines.append("    " + ", ".join(regs) + " = V")
+    for j in range(64):
+        a, b, c, d, e, f, g, h = regs
+        if j < 16:
+            ff, gg = f"({a} ^ {b} ^ {c})", f"({e} ^ {f} ^ {g})"
+        else:
+            ff, gg = f"(({a} & {b}) | ({a} & {c}) | ({b} & {c}))", f"(({e} & {f}) | (~{e} & {g}))"
+        lines.append(f"    a12 = (({a} << 12) & M) | ({a} >> 20)")
+        lines.append(f"    ss1 = (a12 + {e} + {TJ_ROT[j]:#010x}) & M")
+        lines.append("    ss1 = ((ss1 << 7) & M) | (ss1 >> 25)")
+        lines.append(f"    {d} = ({ff} + {d} + (ss1 ^ a12) + (w{j} ^ w{j + 4})) & M")
+        lines.append(f"    t = ({gg} + {h} + ss1 + w{j}) & M")
+        lines.append(f"    {h} = t ^ (((t << 9) & M) | (t >> 23)) ^ (((t << 17) & M) | (t >> 15))")
+        lines.append(f"    {b} = (({b} << 9) & M) | ({b} >> 23)")
+        lines.append(f"    {f} = (({f} << 19) & M) | ({f} >> 13)")
+        # 新的 (A..H) = (TT1, A, B<<<9, C, P0(TT2), E, F<<<19, G)
+        regs = [d, a, b, c, h, e, f, g]
+    out = ", ".join(f"V[{i}] ^ {r}" for i, r in enumerate(regs))
+    lines.append(f"    return ({out})")
+    return "\n".join(lines) + "\n"
+
+def _build_unrolled():
+    ns = {"M": MASK32, "_unpack16": _unpack16}
+    exec(compile(_gen_unrolled(False) + _gen_unrolled(True), "<sm3_opt unrolled>", "exec"), ns)
+    return ns["_compress_w_unrolled"], ns["_compress_fast_unrolled"]
+
+# 默认在导入时生成并使用完全展开的版本；设置环境变量 SM3_NO_UNROLL 可退回循环版本
+USE_UNROLLED = not os.environ.get("SM3_NO_UNROLL")
+if USE_UNROLLED:
+    _compress_w, _compress_fast = _build_unrolled()
+else:
+    _compress_w, _compress_fast = _compress_w_loop, _compress_fast_loop
+
+def _compress_blocks(V: Tuple[int, ...], data, off: int, nblocks: int) -> Tuple[int, ...]:
+    """对 data 中从 off 开始的连续 nblocks 个 64 字节块依次压缩"""
+    cf = _compress_fast
+    for i in range(nblocks):
+        V = cf(V, data, off + 64 * i)
+    return V
+
+def _final_blocks(tail: bytes, total_len: int) -> bytes:
+    """
+    只为末尾不足一个块的数据构造填充（1 或 2 个块），
+    避免为整条消息生成填充副本。
+    """
+    pad_len = 55 - (total_len % 64)
+    if pad_len < 0:
+        pad_len += 64
+    return tail + b"\x80" + b"\x00" * pad_len + (total_len * 8).to_bytes(8, "big")
+
+class SM3:
+    """
+    hashlib 风格的流式 SM3 对象：
+      h = SM3(); h.update(a); h.update(b); h.digest()
+    update() 只缓存不足 64 字节的尾部，完整块直接从输入缓冲区压缩；
+    digest() 不修改内部状态，可以继续 update()。
+    """
+    name = "sm3"
+    digest_size = 32
+    block_size = 64
+
+    __slots__ = ("_v", "_buf", "_len")
+
+    def __init__(self, data: bytes = b""):
+        self._v = tuple(IV)
+        self._buf = bytearray()
+        self._len = 0
+        if data:
+            self.update(data)
+
+    def update(self, data) -> None:
+        mv = memoryview(data).cast("B")
+        n = len(mv)
+        if not n:
+            return
+        self._len += n
+        buf = self._buf
+        off = 0
+        if buf:
+            need = 64 - len(buf)
+            if n < need:
+                buf += mv
+                return
+            buf += mv[:need]
+            self._v = _compress_fast(self._v, buf)
+            del buf[:]
+            off = need
+        nblocks = (n - off) // 64
+        if nblocks:
+            self._v = _compress_blocks(self._v, mv, off, nblocks)
+            off += 64 * nblocks
+        if off < n:
+            buf += mv[off:]
+
+    @classmethod
+    def from_state(cls, state, length: int) -> "SM3":
+        """
+        从中间链值（midstate）恢复：state 为处理完前 length 字节后的 8 个 32-bit 字，
+        即 compress 返回的链值，length 须为 64 的倍数。
+        """
+        if length % 64:
+            raise ValueError("midstate 只能位于块边界（length 须为 64 的倍数）")
+        obj = cls.__new__(cls)
+        obj._v = tuple(state)
+        obj._buf = bytearray()
+        obj._len = length
+        return obj
+
+    def state(self) -> Tuple[Tuple[int, ...], int, bytes]:
+        """返回 (链值, 已处理的块字节数, 尚未压缩的尾部字节)"""
+        return self._v, self._len - len(self._buf), bytes(self._buf)
+
+    def copy(self) -> "SM3":
+        other = SM3.__new__(SM3)
+        other._v = self._v
+        other._buf = bytearray(self._buf)
+        other._len = self._len
+        return other
+
+    def digest(self) -> bytes:
+        tail = _final_blocks(bytes(self._buf), self._len)
+        V = _compress_blocks(self._v, tail, 0, len(tail) // 64)
+        return _pack8(*V)
+
+    def hexdigest(self) -> str:
+        return self.digest().hex()
+
+def sm3_hash_fast(data: bytes) -> bytes:
+    """任意长度消息的快速 SM3（不生成整条消息的填充副本）"""
+    return SM3(data).digest()
+
+# 共享前缀的 midstate 缓存：以前缀字节串为键，缓存吸收完前缀后的 SM3 对象
+# （链值 + 不足一块的尾部），哈希后缀时复制一份继续 update 即可，无需重复压缩前缀块。
+PREFIX_CACHE_SIZE = 1024
+
+@lru_cache(maxsize=PREFIX_CACHE_SIZE)
+def sm3_prefix(prefix: bytes) -> SM3:
+    """返回吸收了 prefix 的 SM3 对象（LRU 缓存，调用方不得直接修改，应先 copy()）"""
+    return SM3(prefix)
+
+def sm3_hash_prefixed(prefix: bytes, suffix: bytes) -> bytes:
+    """SM3(prefix || suffix)，prefix 的压缩结果经 LRU 缓存复用"""
+    h = sm3_prefix(bytes(prefix)).copy()
+    h.update(suffix)
+    return h.digest()
+
+# Merkle 内部节点消息固定为 0x01 || left(32) || right(32)，共 65 字节 = 两个块。
+# 第二块只有第一个字节（right 的最后一个字节）可变，其余为固定的 0x80、零填充与
+# 位长 520。消息扩展在 GF(2) 上是线性的，因此第二块的全部 68 个 W 只取决于这一个
+# 字节：预先为 256 种取值算好整张扩展表，压缩第二块时无需再做消息扩展。
+NODE_MSG_LEN = 65
+_NODE_TAIL_W = [
+    _expand(bytes([b]) + _final_blocks(b"", NODE_MSG_LEN))
+    for b in range(256)
+]
+
+def sm3_node_hash(left: bytes, right: bytes) -> bytes:
+    """
+    Merkle 内部节点专用的定长两块快速路径：SM3(0x01 || left || right)，
+    要求 left/right 均为 32 字节。
+    """
+    V = _compress_w(tuple(IV), _expand(b"\x01" + left + right[:31]))
+    return _pack8(*_compress_w(V, _NODE_TAIL_W[right[31]]))
+
 def sm3_single_block_fast(message: bytes) -> bytes:
     """
     单块快速路径：适用于填充后只需一个 512-bit 块的消息（len < 56）
@@ -17,63 +284,159 @@ def sm3_single_block_fast(message: bytes) -> bytes:
     """
     mlen = len(message)
     if mlen >= 56:
-        # 若消息太长，回退到通用实现
-        return sm3_hash(message)
+        # 若消息太长，回退到多块快速实现
+        return sm3_hash_fast(message)
     # 构建 64 字节块
     block = bytearray(64)
     block[0:mlen] = message
     block[mlen] = 0x80
     bit_len = mlen * 8
     block[-8:] = bit_len.to_bytes(8, "big")
-    # W0..W15 解包
-    W = [0] * 68
-    for i in range(16):
-        W[i] = int.from_bytes(block[i*4:(i+1)*4], "big")
-    # W16..W67 扩展（内联 P1 的计算）
-    for j in range(16, 68):
-        x = W[j - 16] ^ W[j - 9] ^ _rol_local(W[j - 3], 15)
-        # 直接内联 P1(x) = x ^ (x<<<15) ^ (x<<<23) 的部分以减少函数调用
-        Wj = (x ^ _rol_local(x, 15) ^ _rol_local(W[j - 13], 7) ^ W[j - 6]) & MASK32
-        W[j] = Wj
-    # W' 计算
-    Wp = [(W[j] ^ W[j + 4]) & MASK32 for j in range(64)]
-    # 压缩环节（局部变量用于减少属性/全局查找）
-    A, B, C, D, E, F, G, H = IV[:]  # 复制 IV
-    for j in range(64):
-        SS1 = _rol_local((_rol_local(A, 12) + E + _rol_local(T[j], j)) & MASK32, 7)
-        SS2 = SS1 ^ _rol_local(A, 12)
-        if j < 16:
-            FFv = A ^ B ^ C
-            GGv = E ^ F ^ G
-        else:
-            FFv = ((A & B) | (A & C) | (B & C)) & MASK32
-            GGv = ((E & F) | (((~E) & MASK32) & G)) & MASK32
-        TT1 = (FFv + D + SS2 + Wp[j]) & MASK32
-        TT2 = (GGv + H + SS1 + W[j]) & MASK32
-        D = C
-        C = _rol_local(B, 9)
-        B = A
-        A = TT1
-        H = G
-        G = _rol_local(F, 19)
-        F = E
-        E = P0(TT2)
-    V = [(IV[i] ^ v) & MASK32 for i, v in enumerate([A, B, C, D, E, F, G, H])]
-    return b"".join(x.to_bytes(4, "big") for x in V)
+    return _pack8(*_compress_fast(tuple(IV), block))
+
+def _split_digests(buf) -> List[bytes]:
+    """把连续的 32 字节摘要缓冲区拆成 N 个 bytes"""
+    raw = bytes(buf)
+    return [raw[i:i + 32] for i in range(0, len(raw), 32)]
+
+def _sm3_hash_many_batch(messages: List[bytes], out: bytearray) -> None:
+    """
+    分块处理（每块 BATCH_CHUNK 条，限制 NumPy 临时数组的峰值内存），
+    块内按填充后块数分组，每组足够大时交给 NumPy 批量引擎，摘要写入 out。
+    """
+    for base in range(0, len(messages), BATCH_CHUNK):
+        groups = {}
+        for i, m in enumerate(messages[base:base + BATCH_CHUNK], base):
+            groups.setdefault((len(m) + 8) // 64, []).append(i)
+        for idxs in groups.values():
+            msgs = [messages[i] for i in idxs]
+            if len(idxs) >= BATCH_THRESHOLD:
+                digests = sm3_hash_batch(msgs).tobytes()
+                if idxs[-1] - idxs[0] == len(idxs) - 1:
+                    out[32 * idxs[0]:32 * (idxs[-1] + 1)] = digests
+                    continue
+                digests = _split_digests(digests)
+            else:
+                digests = [sm3_single_block_fast(m) for m in msgs]
+            for i, d in zip(idxs, digests):
+                out[32 * i:32 * i + 32] = d
+
+def sm3_hash_many_into(messages: List[bytes]) -> bytearray:
+    """
+    与 sm3_hash_many 相同，但把 N 个摘要依次写入一个连续的 32*N 字节缓冲区，
+    避免为每个摘要单独创建 bytes 对象（Merkle 树按层连续存储时使用）。
+    """
+    out = bytearray(32 * len(messages))
+    if HAVE_NUMPY and len(messages) >= BATCH_THRESHOLD:
+        _sm3_hash_many_batch(messages, out)
+        return out
+    for i, m in enumerate(messages):
+        out[32 * i:32 * i + 32] = sm3_single_block_fast(m)
+    return out
+
+def sm3_node_hash_level(level) -> bytearray:
+    """
+    对连续存储的一层节点（32 字节一个，节点数须为偶数）两两计算
+    SM3(0x01 || left || right)，返回上一层的连续缓冲区。
+    """
+    mv = memoryview(level).cast("B")
+    pairs = len(mv) // 64
+    if HAVE_NUMPY and pairs >= BATCH_THRESHOLD:
+        out = bytearray(32 * pairs)
+        children = np.frombuffer(mv, dtype=np.uint8).reshape(pairs, 64)
+        for b in range(0, pairs, BATCH_CHUNK):
+            e = min(b + BATCH_CHUNK, pairs)
+            out[32 * b:32 * e] = node_hash_batch(children[b:e]).tobytes()
+        return out
+    nh = sm3_node_hash
+    return bytearray(b"".join(nh(mv[i:i + 32], mv[i + 32:i + 64]) for i in range(0, len(mv), 64)))
+
+def sm3_node_hash_many(nodes: List[bytes]) -> List[bytes]:
+    """
+    对相邻的两两节点 (nodes[2i], nodes[2i+1]) 批量计算 SM3(0x01 || left || right)，
+    nodes 长度须为偶数且每个元素为 32 字节。
+    """
+    if HAVE_NUMPY and len(nodes) >= 2 * BATCH_THRESHOLD:
+        return _split_digests(sm3_node_hash_level(b"".join(nodes)))
+    nh = sm3_node_hash
+    return [nh(nodes[i], nodes[i + 1]) for i in range(0, len(nodes), 2)]
 
 def sm3_hash_many(messages: List[bytes]) -> List[bytes]:
     """
     批量哈希接口：对大量短消息（比如 Merkle 叶子）可以显著降低 Python 调用开销。
-    简单策略：若消息长度 < 56 则走单块快速路径，否则使用参考实现。
+    条数超过 BATCH_THRESHOLD 且安装了 NumPy 时走向量化批量引擎；
+    否则若消息长度 < 56 则走单块快速路径，否则使用多块快速实现。
     """
+    if HAVE_NUMPY and len(messages) >= BATCH_THRESHOLD:
+        return _split_digests(sm3_hash_many_into(messages))
     out = []
     for m in messages:
         if len(m) < 56:
             out.append(sm3_single_block_fast(m))
         else:
-            out.append(sm3_hash(m))
+            out.append(sm3_hash_fast(m))
+    return out
+
+def sm3_hash_many_from(state, length: int, messages: List[bytes]) -> List[bytes]:
+    """
+    从公共 midstate 出发批量哈希：返回 SM3(P || m) 的列表，其中 P 是任意长度为 length
+    （64 的倍数）、压缩后链值为 state 的前缀（HMAC 的密钥填充块、KDF 的共享输入等）。
+    按填充后长度分组，组足够大且安装了 NumPy 时整组交给批量引擎（以 state 为起始链值），
+    否则逐条从 state 继续压缩。
+    """
+    if length % 64:
+        raise ValueError("midstate 只能位于块边界（length 须为 64 的倍数）")
+    state = tuple(state)
+    padded = [_final_blocks(bytes(m), length + len(m)) for m in messages]
+    out: List[bytes] = [b""] * len(padded)
+    groups = {}
+    for i, p in enumerate(padded):
+        groups.setdefault(len(p), []).append(i)
+    for plen, idxs in groups.items():
+        if HAVE_NUMPY and len(idxs) >= BATCH_THRESHOLD:
+            for b in range(0, len(idxs), BATCH_CHUNK):
+                part = idxs[b:b + BATCH_CHUNK]
+                words = pack_padded(b"".join(padded[i] for i in part), len(part))
+                raw = hash_blocks(words, iv=state).tobytes()
+                for k, i in enumerate(part):
+                    out[i] = raw[32 * k:32 * k + 32]
+        else:
+            nblocks = plen // 64
+            for i in idxs:
+                out[i] = _pack8(*_compress_blocks(state, padded[i], 0, nblocks))
     return out
 
+# 编译后端（csrc/sm3.c，见 sm3_native）可用时，用 C 实现替换上面的热点函数；
+# 其他模块在导入时按名字取到的即为替换后的版本。设置 SM3_NO_NATIVE=1 可强制使用纯 Python / NumPy 路径。
+HAVE_NATIVE = _native.HAVE_NATIVE
+if HAVE_NATIVE:
+    def _compress_fast(V: Tuple[int, ...], data, off: int = 0) -> Tuple[int, ...]:
+        return _native.compress_blocks(V, data, off, 1)
+
+    _compress_blocks = _native.compress_blocks
+    sm3_hash_fast = _native.sm3_hash
+    sm3_node_hash_level = _native.node_hash_level
+
+    def sm3_node_hash(left: bytes, right: bytes) -> bytes:
+        return _native.sm3_hash(b"\x01" + left + right)
+
+    def sm3_single_block_fast(message: bytes) -> bytes:
+        return _native.sm3_hash(message)
+
+    def sm3_hash_many_into(messages: List[bytes]) -> bytearray:
+        return _native.hash_many_into(messages)
+
+    def sm3_node_hash_many(nodes: List[bytes]) -> List[bytes]:
+        return _split_digests(_native.node_hash_level(b"".join(nodes)))
+
+    def sm3_hash_many(messages: List[bytes]) -> List[bytes]:
+        return _split_digests(_native.hash_many_into(messages))
+
+    def sm3_hash_many_from(state, length: int, messages: List[bytes]) -> List[bytes]:
+        if length % 64:
+            raise ValueError("midstate 只能位于块边界（length 须为 64 的倍数）")
+        return _split_digests(_native.hash_many_into(messages, tuple(state), length))
+
 # 测试可用性
 if __name__ == "__main__":
     for s in [b"", b"abc", b"hello world"]:
@@ -48,3 +48,26 @@ def test_length_extension_success():
     # 服务器端验证（有 key）
     server_mac = hexdigest(key + forged_msg)
     assert server_mac == forged_mac
+
+def _server_verify(key: bytes, message: bytes, mac_hex: str) -> bool:
+    # 本地验证器（服务器端持有 key），模块级函数以便进程池 pickle
+    return hexdigest(key + message) == mac_hex
+
+def test_prefix_length_search():
+    from functools import partial
+    from src.length_extension import forge_candidates, search_prefix_length
+    key = b"k" * 37
+    message = b"user=guest"
+    mac = hexdigest(key + message)
+    extra = b";role=admin" * 7
+    oracle = partial(_server_verify, key)
+    # 与逐个长度的 forge_mac 结果一致
+    cands = forge_candidates(message, mac, extra, range(1, 80))
+    for L, forged, forged_mac, ok in cands[::13]:
+        assert (forged, forged_mac) == forge_mac(message, mac, extra, L)
+        assert ok is None
+    # 并行枚举时只有真实前缀长度能通过服务器验证
+    for workers in (1, 2):
+        hits = search_prefix_length(message, mac, extra, range(1, 80), oracle, workers=workers)
+        assert [L for L, _, _ in hits] == [len(key)]
+        assert _server_verify(key, hits[0][1], hits[0][2])
@@ -0,0 +1,275 @@
+import sys
+import pytest
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.merkle_rfc6962 import MerkleTree
+
+def _leaves(n: int):
+    return [i.to_bytes(4, "big") * (i % 5 + 1) for i in range(n)]
+
+def test_parallel_build_matches_sequential():
+    # 多进程构建的根、各层与包含证明必须与顺序构建完全一致
+    for n in [2, 7, 64, 333]:
+        leaves = _leaves(n)
+        seq = MerkleTree(leaves)
+        par = MerkleTree(leaves, workers=2)
+        assert par.get_root() == seq.get_root()
+        assert MerkleTree(leaves, memory_friendly=True, workers=3).get_root() == seq.get_root()
+        for idx in [0, n // 2, n - 1]:
+            assert par.inclusion_proof(idx) == seq.inclusion_proof(idx)
+
+def test_contiguous_levels_and_proofs():
+    # 每层为连续缓冲区；证明元素为指向层缓冲区的 32 字节 memoryview
+    leaves = _leaves(21)
+    tree = MerkleTree(leaves)
+    assert all(isinstance(level, bytearray) for level in tree.levels)
+    assert [tree.level_size(l) for l in range(len(tree.levels))] == [21, 11, 6, 3, 2, 1]
+    for idx in range(21):
+        proof = tree.inclusion_proof(idx)
+        assert all(isinstance(p, memoryview) and len(p) == 32 for p in proof)
+        assert MerkleTree.verify_inclusion(leaves[idx], idx, proof, tree.get_root())
+    assert not MerkleTree.verify_inclusion(b"x", 3, tree.inclusion_proof(3), tree.get_root())
+
+def test_save_and_open_roundtrip(tmp_path):
+    # 持久化后以 mmap 打开，根与证明不变
+    leaves = _leaves(37)
+    tree = MerkleTree(leaves)
+    path = str(tmp_path / "tree.bin")
+    tree.save(path)
+    with MerkleTree.open(path) as opened:
+        assert opened.n == 37
+        assert opened.get_root() == tree.get_root()
+        for idx in [0, 18, 36]:
+            proof = opened.inclusion_proof(idx)
+            assert proof == tree.inclusion_proof(idx)
+            assert MerkleTree.verify_inclusion(leaves[idx], idx, proof, opened.get_root())
+
+def test_open_rejects_corrupt_files(tmp_path):
+    # 截断的文件、未知的树形模式、与叶子数不符的层数都在打开时报错
+    import struct
+    tree = MerkleTree(_leaves(64))
+    path = tmp_path / "tree.bin"
+    tree.save(str(path))
+    data = path.read_bytes()
+    cases = {
+        "half": data[:len(data) // 2],
+        "tail": data[:-1],
+        "header": data[:20],
+        "mode": data[:12] + struct.pack("<H", 7) + data[14:],
+        "levels": data[:16] + struct.pack("<I", 3) + data[20:],
+        "count": data[:20] + struct.pack("<Q", 65) + data[28:],
+    }
+    for name, blob in cases.items():
+        bad = tmp_path / (name + ".bin")
+        bad.write_bytes(blob)
+        with pytest.raises(ValueError):
+            MerkleTree.open(str(bad))
+    with MerkleTree.open(str(path)) as opened:
+        assert opened.get_root() == tree.get_root()
+
+def test_append_only_log_matches_tree():
+    # 每次追加后的根与证明都应与对同样叶子整体构建的 MerkleTree 一致
+    from src.merkle_log import MerkleLog
+    leaves = _leaves(40)
+    log = MerkleLog()
+    for n, data in enumerate(leaves, 1):
+        assert log.append(data) == n - 1
+        tree = MerkleTree(leaves[:n])
+        assert log.root() == tree.get_root()
+        for idx in {0, n // 2, n - 1}:
+            proof = log.inclusion_proof(idx)
+            assert proof == tree.inclusion_proof(idx)
+            assert MerkleTree.verify_inclusion(leaves[idx], idx, proof, log.root())
+    compact = MerkleLog(store_nodes=False)
+    compact.extend(leaves)
+    assert compact.root() == log.root()
+
+def _mth(hashes):
+    # RFC 6962 MTH 的直接递归定义，作为参考
+    from src.merkle_rfc6962 import node_hash
+    if len(hashes) == 1:
+        return hashes[0]
+    k = 1 << ((len(hashes) - 1).bit_length() - 1)
+    return node_hash(_mth(hashes[:k]), _mth(hashes[k:]))
+
+def test_rfc6962_mode_proofs():
+    # RFC 6962 模式：根符合 MTH 定义，包含/一致性证明可验证，且并行构建与追加日志一致
+    from src.merkle_rfc6962 import MODE_RFC6962, leaf_hash
+    from src.merkle_log import MerkleLog
+    leaves = _leaves(23)
+    tree = MerkleTree(leaves, mode=MODE_RFC6962)
+    assert tree.get_root() == _mth([leaf_hash(d) for d in leaves])
+    assert MerkleTree(leaves, mode=MODE_RFC6962, workers=2).get_root() == tree.get_root()
+    log = MerkleLog(mode=MODE_RFC6962)
+    roots = {}
+    for n, d in enumerate(leaves, 1):
+        log.append(d)
+        roots[n] = _mth([leaf_hash(x) for x in leaves[:n]])
+        assert log.root() == roots[n]
+    for size in [1, 2, 7, 8, 13, 23]:
+        for idx in range(size):
+            proof = tree.inclusion_proof(idx, tree_size=size)
+            assert MerkleTree.verify_inclusion_rfc6962(leaves[idx], idx, size, proof, roots[size])
+            if size == 23:
+                assert proof == log.inclusion_proof(idx)
+        assert not MerkleTree.verify_inclusion_rfc6962(b"?", 0, size, tree.inclusion_proof(0, size), roots[size])
+    for new in [1, 5, 8, 16, 23]:
+        for old in range(1, new + 1):
+            proof = tree.consistency_proof(old, new)
+            assert MerkleTree.verify_consistency(old, new, roots[old], roots[new], proof)
+            if old < new:
+                assert not MerkleTree.verify_consistency(old, new, roots[new], roots[new], proof)
+
+def test_multi_proof_roundtrip():
+    # 批量证明去重共享的兄弟节点，且两种树形模式下都能验证
+    import random
+    from src.merkle_rfc6962 import MODE_DUPLICATE, MODE_RFC6962
+    rng = random.Random(7)
+    for mode in (MODE_DUPLICATE, MODE_RFC6962):
+        for n in [1, 2, 5, 19, 64]:
+            leaves = _leaves(n)
+            tree = MerkleTree(leaves, mode=mode)
+            for k in [1, 3, n]:
+                idxs = rng.sample(range(n), min(k, n))
+                proof = tree.multi_proof(idxs)
+                data = [leaves[i] for i in idxs]
+                assert MerkleTree.verify_multi(data, idxs, proof, tree.get_root(), n, mode)
+                assert len(proof) <= sum(len(tree.inclusion_proof(i)) for i in idxs)
+                if n > 1:
+                    assert not MerkleTree.verify_multi([b"?"] + data[1:], idxs, proof, tree.get_root(), n, mode)
+            assert tree.multi_proof(list(range(n))) == []
+
+def test_streaming_root_from_iterator():
+    # 流式构造只保留 O(log n) 前沿，根与整体构建一致（含不满的最后一块）
+    from src.merkle_rfc6962 import MODE_DUPLICATE, MODE_RFC6962
+    for mode in (MODE_DUPLICATE, MODE_RFC6962):
+        for n in [0, 1, 8, 13, 77]:
+            leaves = _leaves(n)
+            tree = MerkleTree.from_iterable(iter(leaves), mode=mode, chunk=8)
+            assert tree.n == n
+            assert tree.get_root() == MerkleTree(leaves, mode=mode).get_root()
+            assert MerkleTree(leaves, memory_friendly=True, mode=mode).get_root() == tree.get_root()
+
+def test_proof_server_roundtrip():
+    # 证明服务：批量证明与根经二进制帧往返后可验证；越界下标返回错误而不断开连接
+    import asyncio
+    from src.merkle_server import ProofClient, ProofServer
+    leaves = _leaves(37)
+    tree = MerkleTree(leaves)
+
+    async def run():
+        server = ProofServer(tree, cache_size=16)
+        await server.start(port=0)
+        host, port = server.address[:2]
+        client = await ProofClient.connect(host, port)
+        mode, n, root = await client.root()
+        assert (mode, n, root) == (tree.mode, 37, tree.get_root())
+        for _ in range(2):
+            got = await client.proofs(list(range(37)))
+            assert [i for i, _ in got] == list(range(37))
+            assert all(MerkleTree.verify_inclusion(leaves[i], i, p, root) for i, p in got)
+        try:
+            await client.proofs([37])
+            assert False, "越界下标应返回错误"
+        except ValueError:
+            pass
+        assert [i for i, _ in await client.proofs([5, 5])] == [5, 5]
+        # 对端在负载中途断开：服务端安静地关闭该连接，不产生未处理异常，其他连接不受影响
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, ctx: errors.append(ctx))
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write((100).to_bytes(4, "big") + b"\x02" * 10)
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+        await reader.read()
+        assert (await client.root())[2] == root
+        assert not errors
+        await client.close()
+        await server.close()
+        return server.cache_info()
+
+    info = asyncio.run(run())
+    assert info.hits >= 1 and info.currsize <= 16
+
+def test_proof_server_large_batch():
+    # 大批量请求：超过 max_batch 时返回错误而不是超过 MAX_FRAME 的响应，连接保持同步；
+    # 恰好 max_batch 个下标时响应不超过 MAX_FRAME；负载长度与下标个数不符时返回错误
+    import asyncio
+    from src.merkle_server import (ProofClient, ProofServer, MAX_FRAME, OP_PROOF, STATUS_ERROR,
+                                   encode_request)
+    tree = MerkleTree([i.to_bytes(4, "big") for i in range(1 << 17)])
+    server = ProofServer(tree, cache_size=0)
+    assert server.max_batch < 40000
+    bad = encode_request(OP_PROOF, 7, [1, 2])[4:]
+    for payload in (bad + b"\x00" * 8, bad[:-8], bad[:-1]):
+        assert server.handle_payload(payload)[0] == STATUS_ERROR
+
+    async def run():
+        await server.start(port=0)
+        host, port = server.address[:2]
+        client = await ProofClient.connect(host, port)
+        with pytest.raises(ValueError):
+            await client.proofs(list(range(40000)))
+        got = await client.proofs(list(range(server.max_batch)))
+        assert len(got) == server.max_batch and len(got[-1][1]) == 17
+        assert (await client.root())[2] == tree.get_root()
+        await client.close()
+        await server.close()
+    asyncio.run(run())
+    resp = server.handle_payload(encode_request(OP_PROOF, 1, list(range(server.max_batch)))[4:])
+    assert len(resp) <= MAX_FRAME
+
+def test_sparse_merkle_membership_and_absence():
+    # 稀疏 Merkle 树：存在 / 不存在证明、批量更新与逐条更新结果一致、删除后根回到空树
+    from src.merkle_sparse import SparseMerkleTree, smt_key, default_hashes, BITMAP_LEN
+    keys = [smt_key(b"cert-%d" % i) for i in range(40)]
+    batch = SparseMerkleTree()
+    batch.update_many([(k, b"revoked-%d" % i) for i, k in enumerate(keys)])
+    single = SparseMerkleTree()
+    for i, k in enumerate(keys):
+        single.update(k, b"revoked-%d" % i)
+    root = batch.root()
+    assert root == single.root() and len(batch) == 40
+    for i, k in enumerate(keys[:5]):
+        proof = batch.prove(k)
+        assert SparseMerkleTree.verify(root, k, b"revoked-%d" % i, proof)
+        assert not SparseMerkleTree.verify(root, k, b"other", proof)
+        assert not SparseMerkleTree.verify(root, k, None, proof)
+        # 压缩证明只含非默认兄弟，40 个键时远少于 256 个
+        assert len(proof) - BITMAP_LEN < 32 * 16
+    absent = smt_key(b"not-revoked")
+    proof = batch.prove(absent)
+    assert batch.get(absent) is None
+    assert SparseMerkleTree.verify(root, absent, None, proof)
+    assert not SparseMerkleTree.verify(root, absent, b"x", proof)
+    # 只存分支节点与捷径叶子：40 个随机键远少于 40 * 256 个节点
+    assert batch.node_count() < 40 * 16
+    batch.update_many([(k, None) for k in keys])
+    assert batch.root() == default_hashes()[-1] and len(batch) == 0
+    assert all(not store for store in batch._nodes) and all(not s for s in batch._short)
+
+def test_sparse_merkle_shortcuts():
+    # 共享长前缀的键：插入时拆分捷径、删除时捷径上移，根与按键集合重新构建的树一致；
+    # 不存在的键落在另一个键的捷径下时，证明中的兄弟为该键补齐到分叉处的路径
+    from src.merkle_sparse import SparseMerkleTree
+    base = bytes(range(32))
+    def near(i):
+        return base[:30] + bytes([i >> 3, i & 7])
+    keys = [near(i) for i in range(12)]
+    smt = SparseMerkleTree()
+    smt.update(keys[0], b"v0")
+    for i, k in enumerate(keys[1:], 1):
+        smt.update(k, b"v%d" % i)
+    fresh = SparseMerkleTree()
+    fresh.update_many([(k, b"v%d" % i) for i, k in enumerate(keys)])
+    assert smt.root() == fresh.root()
+    for absent in (near(40), near(13), bytes(32)):
+        assert SparseMerkleTree.verify(smt.root(), absent, None, smt.prove(absent))
+    smt.update_many([(k, None) for k in keys[1:11]])
+    only = SparseMerkleTree()
+    only.update_many([(keys[0], b"v0"), (keys[11], b"v11")])
+    assert smt.root() == only.root() and smt.node_count() == only.node_count()
+    for k in (keys[0], keys[11], keys[5]):
+        assert SparseMerkleTree.verify(smt.root(), k, smt.get(k), smt.prove(k))
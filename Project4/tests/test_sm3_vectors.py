@@ -13,3 +13,122 @@ def test_sm3_abc_vector():
     # 优化实现的单块快速路径应与参考实现一致
     out = sm3_single_block_fast(data)
     assert out.hex() == expected
+
+def test_sm3_streaming_matches_ref():
+    # 流式对象在任意切分方式下都应与参考实现一致
+    from src.sm3_opt import SM3, sm3_hash_fast
+    from src.sm3_ref import sm3_hash
+    data = bytes(range(256)) * 5
+    for n in [0, 1, 55, 56, 63, 64, 65, 119, 120, 128, 1000, len(data)]:
+        m = data[:n]
+        assert sm3_hash_fast(m) == sm3_hash(m)
+        h = SM3()
+        for i in range(0, n, 7):
+            h.update(m[i:i + 7])
+        c = h.copy()
+        assert h.digest() == sm3_hash(m)
+        c.update(b"x")
+        assert c.digest() == sm3_hash(m + b"x")
+        assert h.hexdigest() == sm3_hash(m).hex()
+
+def test_sm3_node_hash_matches_ref():
+    # 65 字节内部节点快速路径需覆盖第二块首字节的各种取值
+    from src.sm3_opt import sm3_node_hash
+    from src.sm3_ref import sm3_hash
+    for b in (0, 1, 0x7F, 0x80, 0xFF):
+        left = bytes(range(32))
+        right = bytes(range(31)) + bytes([b])
+        assert sm3_node_hash(left, right) == sm3_hash(b"\x01" + left + right)
+
+def test_sm3_batch_matches_ref():
+    # 向量化批量引擎（超过阈值时启用）必须与参考实现逐位一致
+    from src.sm3_opt import sm3_hash_many, sm3_node_hash_many, BATCH_THRESHOLD
+    from src.sm3_ref import sm3_hash
+    msgs = [bytes([i % 251]) * (i % 130) for i in range(4 * BATCH_THRESHOLD)]
+    assert sm3_hash_many(msgs) == [sm3_hash(m) for m in msgs]
+    nodes = [sm3_hash(bytes([i])) for i in range(4 * BATCH_THRESHOLD)]
+    expected = [sm3_hash(b"\x01" + nodes[i] + nodes[i + 1]) for i in range(0, len(nodes), 2)]
+    assert sm3_node_hash_many(nodes) == expected
+
+def test_sm3_midstate_resume():
+    # 由 midstate 恢复与共享前缀缓存都应与一次性哈希一致
+    from src.sm3_opt import SM3, sm3_hash_prefixed, sm3_prefix
+    from src.sm3_ref import sm3_hash, compress, IV
+    prefix = bytes(range(256)) * 4 + b"tail"
+    for suffix in [b"", b"x", bytes(32), bytes(100)]:
+        assert sm3_hash_prefixed(prefix, suffix) == sm3_hash(prefix + suffix)
+    assert sm3_prefix.cache_info().hits >= 3
+    V = IV
+    for i in range(0, 128, 64):
+        V = compress(V, prefix[i:i + 64])
+    h = SM3.from_state(V, 128)
+    h.update(prefix[128:])
+    assert h.digest() == sm3_hash(prefix)
+    assert h.state()[1] == len(prefix) - len(prefix) % 64
+
+def _hmac_naive(key, msg):
+    from src.sm3_ref import sm3_hash
+    if len(key) > 64:
+        key = sm3_hash(key)
+    key = key.ljust(64, b"\x00")
+    ipad = bytes(b ^ 0x36 for b in key)
+    opad = bytes(b ^ 0x5C for b in key)
+    return sm3_hash(opad + sm3_hash(ipad + msg))
+
+def test_hmac_sm3_and_kdf():
+    # HMAC 与 KDF 的缓存/批量实现应与按定义直接拼接的朴素构造一致
+    from src.sm3_mac import HMAC_SM3, hmac_sm3, hmac_sm3_many, hmac_sm3_verify, sm3_kdf
+    from src.sm3_ref import sm3_hash
+    msgs = [bytes(range(n % 256)) * (1 + n // 256) for n in range(0, 300, 3)]
+    for key in [b"", b"k", b"k" * 64, b"k" * 65, bytes(range(200))]:
+        expected = [_hmac_naive(key, m) for m in msgs]
+        assert [hmac_sm3(key, m) for m in msgs] == expected
+        assert hmac_sm3_many(key, msgs) == expected
+        h = HMAC_SM3(key)
+        for i in range(0, len(msgs[-1]), 13):
+            h.update(msgs[-1][i:i + 13])
+        assert h.digest() == expected[-1]
+        assert hmac_sm3_verify(key, msgs[1], expected[1])
+        assert not hmac_sm3_verify(key, msgs[1], expected[2])
+    for zlen in [0, 20, 64, 100]:
+        z = bytes(range(zlen))
+        for klen in [0, 16, 32, 33, 100, 32 * 70 + 5]:
+            naive = b"".join(sm3_hash(z + ct.to_bytes(4, "big")) for ct in range(1, klen // 32 + 2))
+            assert sm3_kdf(z, klen) == naive[:klen]
+
+def _native_lib(tmp_path):
+    # 优先使用已构建的共享库，否则在临时目录现场编译；没有 C 编译器时跳过
+    import shutil
+    import pytest
+    from src import sm3_native
+    if sm3_native.HAVE_NATIVE:
+        return sm3_native.lib
+    if not shutil.which(os.environ.get("CC", "cc")):
+        pytest.skip("没有 C 编译器，跳过编译后端测试")
+    return sm3_native.load(sm3_native.build(str(tmp_path)))
+
+def test_native_backend_matches_python(tmp_path, monkeypatch):
+    # 编译后端与纯 Python 实现在随机输入上逐项对照
+    import random
+    from src import sm3_native
+    from src.sm3_ref import IV, compress, sm3_hash
+    from src.sm3_opt import _compress_fast_loop
+    monkeypatch.setattr(sm3_native, "lib", _native_lib(tmp_path))
+    rng = random.Random(16)
+    msgs = [rng.randbytes(rng.randrange(300)) for _ in range(200)]
+    for m in msgs:
+        assert sm3_native.sm3_hash(m) == sm3_hash(m)
+        assert sm3_native.sm3_hash(memoryview(bytearray(m))) == sm3_hash(m)
+    assert sm3_native.hash_many_into(msgs) == b"".join(sm3_hash(m) for m in msgs)
+    data = rng.randbytes(64 * 5)
+    V = tuple(IV)
+    for off in range(0, len(data), 64):
+        V = _compress_fast_loop(V, data, off)
+        assert tuple(compress(list(V), data[off:off + 64])) == _compress_fast_loop(V, data, off)
+    assert sm3_native.compress_blocks(tuple(IV), memoryview(data), 0, 5) == V
+    prefix = data[:128]
+    mid = sm3_native.compress_blocks(tuple(IV), prefix, 0, 2)
+    assert sm3_native.hash_many_into(msgs[:20], mid, 128) == b"".join(sm3_hash(prefix + m) for m in msgs[:20])
+    level = rng.randbytes(64 * 7)
+    expected = b"".join(sm3_hash(b"\x01" + level[i:i + 64]) for i in range(0, len(level), 64))
+    assert sm3_native.node_hash_level(memoryview(level)) == expected
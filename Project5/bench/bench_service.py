@@ -0,0 +1,58 @@
+"""
+多进程签名 / 验证服务的吞吐随工作进程数的变化（1..N，默认 N = CPU 核数）。
+每种进程数下先预热工作进程，再通过异步接口并发提交请求，报告 sign/s、verify/s 与相对 1 进程的加速比。
+示例：
+  python bench/bench_service.py --workers 8 --requests 4000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from sm2 import sm2_keygen, sm2_sign
+from sm2_service import SM2Service, DEFAULT_BATCH
+
+async def _throughput(service: SM2Service, sign_reqs, verify_reqs):
+    t0 = time.perf_counter()
+    await asyncio.gather(*(service.sign(*req) for req in sign_reqs))
+    t1 = time.perf_counter()
+    oks = await asyncio.gather(*(service.verify(*req) for req in verify_reqs))
+    t2 = time.perf_counter()
+    assert all(oks)
+    return len(sign_reqs) / (t1 - t0), len(verify_reqs) / (t2 - t1)
+
+async def _run(service: SM2Service, sign_reqs, verify_reqs):
+    async with service:
+        return await _throughput(service, sign_reqs, verify_reqs)
+
+def main():
+    parser = argparse.ArgumentParser(description="SM2 多进程服务吞吐")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="最大工作进程数")
+    parser.add_argument("--requests", type=int, default=1000, help="每项的请求数")
+    parser.add_argument("--keys", type=int, default=32, help="参与签名 / 验证的密钥对数")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="每个任务包的最大请求数")
+    args = parser.parse_args()
+
+    pairs = [sm2_keygen() for _ in range(args.keys)]
+    sign_reqs, verify_reqs = [], []
+    for i in range(args.requests):
+        d, pub = pairs[i % args.keys]
+        msg, uid = b"service-%d" % i, "user-%d" % (i % args.keys)
+        sign_reqs.append((d, msg, uid))
+        verify_reqs.append((pub, msg, sm2_sign(d, msg, uid), uid))
+
+    counts = sorted({1, *range(2, args.workers + 1, 2), args.workers})
+    base = None
+    for n in counts:
+        service = SM2Service(workers=n, batch=args.batch)
+        service.warm_up()
+        sign_rate, verify_rate = asyncio.run(_run(service, sign_reqs, verify_reqs))
+        base = base or (sign_rate, verify_rate)
+        print(f"workers={n:>3}: sign {sign_rate:9.1f}/s（{sign_rate / base[0]:.2f}x），"
+              f"verify {verify_rate:9.1f}/s（{verify_rate / base[1]:.2f}x）")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import time
+import os
+import sys
+import secrets
+import statistics
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+import sm2
+from sm2 import G, N, INFINITY, point_add, point_double, compute_za, sm3_hash, sm2_keygen, sm2_sign, sm2_verify
+from ecdsa import ecdsa_sign, ecdsa_verify
+
+def scalar_mult_affine(k: int, Pt):
+    """优化前的实现：仿射坐标 double-and-add，每次点加 / 倍点一次模逆"""
+    Q = INFINITY
+    while k > 0:
+        if k & 1:
+            Q = point_add(Q, Pt)
+        Pt = point_double(Pt)
+        k >>= 1
+    return Q
+
+def sm2_verify_affine(public_key, msg: bytes, signature, user_id: str) -> bool:
+    """优化前的验证流程：两次独立的仿射标量乘法再做一次仿射点加"""
+    r, s = signature
+    e = int.from_bytes(sm3_hash(compute_za(user_id, public_key) + msg), "big") % N
+    xy = point_add(scalar_mult_affine(s, G), scalar_mult_affine((r + s) % N, public_key))
+    return (e + xy.x) % N == r
+
+def _rate(fn, count: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return count / (time.perf_counter() - t0)
+
+def bench_sign_verify(count: int = 50):
+    """SM2 / ECDSA 签名与验证速率：仿射坐标（优化前）对比 Jacobian 坐标（优化后）"""
+    d, pub = sm2_keygen()
+    msg, uid = b"benchmark message", "alice@example.com"
+    sig = sm2_sign(d, msg, uid)
+    k = secrets.randbelow(N - 1) + 1
+    esig = ecdsa_sign(msg, d, k)
+
+    fast = sm2.scalar_mult
+    sm2.scalar_mult = scalar_mult_affine  # ecdsa_sign 经 sm2.secret_scalar_mult 同样走到这里
+    try:
+        before = {
+            "sm2_sign": _rate(lambda: sm2_sign(d, msg, uid), count),
+            "sm2_verify": _rate(lambda: sm2_verify_affine(pub, msg, sig, uid), count),
+            "ecdsa_sign": _rate(lambda: ecdsa_sign(msg, d, k), count),
+        }
+    finally:
+        sm2.scalar_mult = fast
+    after = {
+        "sm2_sign": _rate(lambda: sm2_sign(d, msg, uid), count),
+        "sm2_verify": _rate(lambda: sm2_verify(pub, msg, sig, uid), count),
+        "ecdsa_sign": _rate(lambda: ecdsa_sign(msg, d, k), count),
+        "ecdsa_verify": _rate(lambda: ecdsa_verify(msg, esig, pub), count),
+    }
+    for name, rate in after.items():
+        old = before.get(name)
+        extra = f"，优化前 {old:8.1f} 次/s，加速比 {rate / old:.2f}x" if old else ""
+        print(f"{name:>12}: {rate:8.1f} 次/s{extra}")
+
+def _deep_size(table) -> int:
+    return sys.getsizeof(table) + sum(sys.getsizeof(row) + sum(
+        sys.getsizeof(pt) + sys.getsizeof(pt[0]) + sys.getsizeof(pt[1]) for pt in row) for row in table)
+
+def bench_fixed_base(count: int = 50):
+    """G 的固定基表：构建耗时、内存占用、持久化文件加载耗时，以及 keygen / 签名相对 double-and-add 的加速比"""
+    import tempfile
+    t0 = time.perf_counter()
+    table = sm2.build_fixed_base_table()
+    t1 = time.perf_counter()
+    path = os.path.join(tempfile.gettempdir(), "sm2_g_table.bin")
+    sm2.save_fixed_base_table(path, table)
+    t2 = time.perf_counter()
+    sm2.load_fixed_base_table(path)
+    t3 = time.perf_counter()
+    print(f"固定基表 w={sm2.FIXED_BASE_WINDOW}：{len(table)} 行 × {len(table[0])} 点，构建 {(t1 - t0) * 1e3:.1f} ms，"
+          f"内存约 {_deep_size(table) / 1e6:.2f} MB，文件 {os.path.getsize(path) / 1e3:.0f} KB，"
+          f"从文件加载 {(t3 - t2) * 1e3:.1f} ms")
+    os.remove(path)
+
+    d, _ = sm2_keygen()
+    msg, uid = b"benchmark message", "alice@example.com"
+    k = secrets.randbelow(N - 1) + 1
+    cases = [("sm2_keygen", sm2_keygen), ("sm2_sign", lambda: sm2_sign(d, msg, uid)),
+             ("ecdsa_sign", lambda: ecdsa_sign(msg, d, k))]
+    fast = sm2.fixed_base_mult
+    sm2.fixed_base_mult = lambda kk: sm2._double_and_add(kk % N, G)
+    try:
+        before = [_rate(fn, count) for _, fn in cases]
+    finally:
+        sm2.fixed_base_mult = fast
+    for (name, fn), old in zip(cases, before):
+        rate = _rate(fn, count)
+        print(f"{name:>12}: 查表 {rate:8.1f} 次/s，double-and-add {old:8.1f} 次/s，加速比 {rate / old:.2f}x")
+
+def bench_verify(count: int = 50, rounds: int = 5):
+    """
+    验证的核心运算 sG + tP：固定基表 + double-and-add 分别计算再相加 对比 交错 wNAF 双标量乘法；
+    两种实现交替运行 rounds 轮取最快一轮（单核机器上计时噪声较大）。最后给出完整验证速率。
+    """
+    d, pub = sm2_keygen()
+    scalars = [(secrets.randbelow(N), secrets.randbelow(N)) for _ in range(count)]
+    sm2.g_wnaf_table()
+    separate = lambda: [sm2.jacobian_add(sm2.scalar_mult_jacobian(a, G), sm2.scalar_mult_jacobian(b, pub)).to_affine()
+                        for a, b in scalars]
+    interleaved = lambda: [sm2.double_scalar_mult(a, G, b, pub) for a, b in scalars]
+    assert separate() == interleaved()
+    best = [float("inf"), float("inf")]
+    for _ in range(rounds):
+        for i, fn in enumerate((separate, interleaved)):
+            t0 = time.perf_counter()
+            fn()
+            best[i] = min(best[i], time.perf_counter() - t0)
+    print(f"sG + tP：分别计算 {count / best[0]:8.1f} 次/s，交错 wNAF {count / best[1]:8.1f} 次/s，"
+          f"加速比 {best[0] / best[1]:.2f}x")
+    msg, uid = b"benchmark message", "alice@example.com"
+    sig = sm2_sign(d, msg, uid)
+    esig = ecdsa_sign(msg, d, secrets.randbelow(N - 1) + 1)
+    print(f"  sm2_verify: {_rate(lambda: sm2_verify(pub, msg, sig, uid), count):8.1f} verifies/s  "
+          f"ecdsa_verify: {_rate(lambda: ecdsa_verify(msg, esig, pub), count):8.1f} verifies/s")
+
+def sm2_verify_uncached(public_key, msg: bytes, signature, user_id: str) -> bool:
+    """未使用验证上下文缓存的流程：每次重新计算 Z_A，sG + tP 走交错 wNAF"""
+    r, s = signature
+    e = int.from_bytes(sm3_hash(compute_za(user_id, public_key) + msg), "big") % N
+    xy = sm2.double_scalar_mult(s, G, (r + s) % N, public_key)
+    return (e + xy.x) % N == r
+
+def bench_zipf(keys: int = 200, verifies: int = 4000, zipf_s: float = 1.1):
+    """公钥服从 Zipf 分布的重复验证：验证上下文缓存（Z_A + 公钥固定基表）开启前后的 verifies/s 与命中率"""
+    import random
+    rng = random.Random(22)
+    pairs = [sm2_keygen() for _ in range(keys)]
+    weights = [1 / (i + 1) ** zipf_s for i in range(keys)]
+    picks = rng.choices(range(keys), weights, k=verifies)
+    jobs = []
+    for n, i in enumerate(picks):
+        d, pub = pairs[i]
+        msg, uid = b"msg-%d" % n, "user-%d@example.com" % i
+        jobs.append((pub, msg, sm2_sign(d, msg, uid), uid))
+    t0 = time.perf_counter()
+    assert all(sm2_verify_uncached(*job) for job in jobs)
+    t1 = time.perf_counter()
+    sm2.verifier_cache_clear()
+    assert all(sm2_verify(*job) for job in jobs)
+    t2 = time.perf_counter()
+    info = sm2.verifier_cache_info()
+    print(f"Zipf(s={zipf_s}) {keys} 个公钥 / {verifies} 次验证：无缓存 {verifies / (t1 - t0):8.1f} verifies/s，"
+          f"上下文缓存 {verifies / (t2 - t1):8.1f} verifies/s，加速比 {(t1 - t0) / (t2 - t1):.2f}x；"
+          f"命中 {info.hits}，未命中 {info.misses}，缓存 {info.currsize}/{info.maxsize}")
+
+def bench_batch(sizes=(1, 64, 1024, 16384), keys: int = 64, pool: int = 256):
+    """
+    批量验证：每种批大小下逐条 sm2_verify / ecdsa_verify 与 sm2_verify_batch / ecdsa_verify_batch 的每签名耗时。
+    签名从 pool 条（keys 个公钥）中循环取用；每次测量前清空验证上下文缓存。
+    """
+    from ecdsa import ecdsa_verify_batch
+    pairs = [sm2_keygen() for _ in range(keys)]
+    sm2_items, ecdsa_items = [], []
+    for i in range(pool):
+        d, pub = pairs[i % keys]
+        msg, uid = b"batch-%d" % i, "user-%d" % (i % keys)
+        sm2_items.append((pub, msg, sm2_sign(d, msg, uid), uid))
+        ecdsa_items.append((msg, ecdsa_sign(msg, d, secrets.randbelow(N - 1) + 1), pub))
+
+    def per_sig(fn, items) -> float:
+        sm2.verifier_cache_clear()
+        t0 = time.perf_counter()
+        assert all(fn(items))
+        return (time.perf_counter() - t0) / len(items) * 1e6
+
+    for size in sizes:
+        s_items = [sm2_items[i % pool] for i in range(size)]
+        e_items = [ecdsa_items[i % pool] for i in range(size)]
+        loop_sm2 = per_sig(lambda its: [sm2_verify(*it) for it in its], s_items)
+        batch_sm2 = per_sig(sm2.sm2_verify_batch, s_items)
+        loop_ecdsa = per_sig(lambda its: [ecdsa_verify(*it) for it in its], e_items)
+        batch_ecdsa = per_sig(ecdsa_verify_batch, e_items)
+        print(f"batch={size:>6}: SM2 逐条 {loop_sm2:8.0f} us/签名，批量 {batch_sm2:8.0f} us/签名；"
+              f"ECDSA 逐条 {loop_ecdsa:8.0f} us/签名，批量 {batch_ecdsa:8.0f} us/签名")
+
+def bench_ladder(count: int = 50, samples: int = 200):
+    """
+    常数代价的 Montgomery 阶梯与快速路径对比：kG、kP 的速率，阶梯后端下的签名速率，
+    以及按汉明重量分组、随机标量的单次耗时分布（快速 double-and-add 随重量变化，阶梯应基本不变）。
+    """
+    Q = sm2.scalar_mult(secrets.randbelow(N - 1) + 1, G)
+    ks = [secrets.randbelow(N - 1) + 1 for _ in range(count)]
+    it = iter(ks * 4)
+    for name, Pt in (("kG", G), ("kP", Q)):
+        fast = _rate(lambda: sm2.scalar_mult(next(it), Pt), count // 2)
+        ladder = _rate(lambda: sm2.scalar_mult_ladder(next(it), Pt), count // 2)
+        print(f"{name}: 快速路径 {fast:8.1f} 次/s，阶梯 {ladder:8.1f} 次/s（{fast / ladder:.2f}x）")
+
+    d, _ = sm2_keygen()
+    msg, uid = b"benchmark message", "alice@example.com"
+    for backend in (sm2.SCALAR_MULT_FAST, sm2.SCALAR_MULT_LADDER):
+        sm2.set_secret_scalar_mult(backend)
+        print(f"sm2_sign[{backend}]: {_rate(lambda: sm2_sign(d, msg, uid), count):8.1f} 次/s")
+    sm2.set_secret_scalar_mult(sm2.SCALAR_MULT_FAST)
+
+    # 低 / 高汉明重量的标量与随机标量各 samples 个；三组交替测量，避免机器负载漂移被误当成组间差异。
+    # 随机标量一组另给出变异系数（标准差 / 均值）及耗时与汉明重量的相关系数。
+    # 随机标量的重量集中在 128 附近，计时噪声会冲淡相关系数；重量的影响主要看低 / 高两组的中位数差。
+    bits = N.bit_length()
+    low = [(1 << (bits - 2)) | secrets.randbits(16) for _ in range(samples)]
+    high = [((1 << (bits - 1)) - 1) ^ (1 << secrets.randbelow(bits - 1)) for _ in range(samples)]
+    rand = [secrets.randbelow(N - 1) + 1 for _ in range(samples)]
+    for fname, fn in (("double-and-add", sm2._double_and_add), ("ladder", sm2.scalar_mult_ladder_jacobian)):
+        ts = {"低重量": [], "高重量": [], "随机": []}
+        for kl, kh, kr in zip(low, high, rand):
+            for gname, k in (("低重量", kl), ("高重量", kh), ("随机", kr)):
+                t0 = time.perf_counter()
+                fn(k, Q)
+                ts[gname].append((time.perf_counter() - t0) * 1e6)
+        print(f"{fname:>15}: " + "，".join(
+            f"{g} 中位数 {statistics.median(v):8.0f} us（标准差 {statistics.pstdev(v):6.0f}）" for g, v in ts.items()))
+        rt = ts["随机"]
+        corr = statistics.correlation([bin(k).count("1") for k in rand], rt)
+        print(f"{'':>15}  随机标量：变异系数 {statistics.pstdev(rt) / statistics.mean(rt):.3f}，"
+              f"耗时与汉明重量的相关系数 {corr:+.3f}")
+
+if __name__ == "__main__":
+    # 可通过命令行传入每项的运行次数，例如: python bench_sm2.py 200
+    bench_sign_verify(*(int(a) for a in sys.argv[1:2]))
+    bench_fixed_base(*(int(a) for a in sys.argv[1:2]))
+    bench_verify(*(int(a) for a in sys.argv[1:2]))
+    bench_zipf()
+    bench_batch()
+    bench_ladder(*(int(a) for a in sys.argv[1:2]))
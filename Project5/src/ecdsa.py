@@ -1,4 +1,6 @@
-from sm2 import scalar_mult, G, N, mod_inv
+from sm2 import (Point, secret_scalar_mult, verifier_context, G, N, mod_inv, batch_mod_inv,
+                 verify_jobs_batch)
+from typing import List, Tuple
 import hashlib
 
 def hash_to_int(msg: bytes) -> int:
@@ -12,7 +14,7 @@ def hash_to_int(msg: bytes) -> int:
 
 def ecdsa_sign(msg: bytes, private_key: int, k: int) -> Tuple[int, int]:
     """ECDSA签名算法"""
-    R = scalar_mult(k, G)
+    R = secret_scalar_mult(k, G)
     r = R.x % N
     if r == 0:
         raise ValueError("r is zero, try different k")
@@ -35,8 +37,31 @@ def ecdsa_verify(msg: bytes, signature: Tuple[int, int], public_key: Point) -> b
     u1 = (e * w) % N
     u2 = (r * w) % N
     
-    point1 = scalar_mult(u1, G)
-    point2 = scalar_mult(u2, public_key)
-    R = point_add(point1, point2)
+    # u1*G + u2*Q：公钥预计算取自验证上下文缓存（ECDSA 无 Z_A，user_id 为 None），只做一次模逆
+    ctx = verifier_context(None, public_key)
+    if ctx is None:
+        return False
+    R = ctx.mult_add_g(u1, u2)
+    if R.is_infinity():
+        return False
     
-    return R.x % N == r
\ No newline at end of file
+    return R.to_affine().x % N == r
+
+def ecdsa_verify_batch(items: List[Tuple[bytes, Tuple[int, int], Point]]) -> List[bool]:
+    """
+    批量 ECDSA 验证：items[i] = (消息, (r, s), 公钥)，返回每项一个布尔值。
+    全部 s 的逆一次批量求出；与 sm2_verify_batch 相同，r 只含 x 坐标，逐项检查 x(u1*G + u2*Q) ≡ r (mod n)。
+    """
+    # 公钥检查与 ecdsa_verify 相同：不在曲线上时验证上下文为 None
+    ctxs = [verifier_context(None, public_key) if 1 <= r < N and 1 <= s < N else None
+            for _, (r, s), public_key in items]
+    inv = iter(batch_mod_inv([s for (_, (_, s), _), ctx in zip(items, ctxs) if ctx is not None], N))
+    jobs = []
+    for (msg, (r, s), _), ctx in zip(items, ctxs):
+        if ctx is None:
+            jobs.append(None)
+            continue
+        w = next(inv)
+        e = hash_to_int(msg) % N
+        jobs.append((ctx, e * w % N, r * w % N, r))
+    return verify_jobs_batch(jobs)
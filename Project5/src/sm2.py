@@ -1,6 +1,9 @@
 import hashlib
+import os
 import secrets
-from typing import Tuple, Optional
+import time
+from functools import lru_cache
+from typing import List, Tuple, Optional
 
 # SM2椭圆曲线参数
 P = 0x8542D69E4C044F18E8B92435BF6FF7DE457283915C45517D722EDB8B08F1DFC3
@@ -29,57 +32,416 @@ INFINITY = Point(0, 0)
 G = Point(G_X, G_Y)
 
 def mod_inv(a: int, n: int) -> int:
-    """扩展欧几里得算法求模逆"""
-    t, new_t = 0, 1
-    r, new_r = n, a
-    
-    while new_r != 0:
-        quotient = r // new_r
-        t, new_t = new_t, t - quotient * new_t
-        r, new_r = new_r, r - quotient * new_r
-    
-    if r > 1:
-        raise ValueError("a is not invertible")
-    if t < 0:
-        t += n
-    
-    return t
-
-def point_add(P: Point, Q: Point) -> Point:
-    """椭圆曲线点加法"""
-    if P == INFINITY:
-        return Q
-    if Q == INFINITY:
-        return P
-    if P.x == Q.x and P.y != Q.y:
+    """模逆（pow(a, -1, n) 由解释器内部的扩展欧几里得算法完成，不可逆时抛出 ValueError）"""
+    try:
+        return pow(a, -1, n)
+    except ValueError:
+        raise ValueError("a is not invertible") from None
+
+def point_add(P1: Point, P2: Point) -> Point:
+    """椭圆曲线点加法（仿射坐标，每次一次模逆；批量运算请用下面的 Jacobian 坐标）"""
+    if P1 == INFINITY:
+        return P2
+    if P2 == INFINITY:
+        return P1
+    if P1.x == P2.x and P1.y != P2.y:
         return INFINITY
     
-    if P == Q:
+    if P1 == P2:
         # 倍点公式
-        lam = (3 * P.x * P.x + A) * mod_inv(2 * P.y, P) % P
+        lam = (3 * P1.x * P1.x + A) * mod_inv(2 * P1.y, P) % P
     else:
         # 点加公式
-        lam = (Q.y - P.y) * mod_inv(Q.x - P.x, P) % P
+        lam = (P2.y - P1.y) * mod_inv(P2.x - P1.x, P) % P
     
-    x3 = (lam * lam - P.x - Q.x) % P
-    y3 = (lam * (P.x - x3) - P.y) % P
+    x3 = (lam * lam - P1.x - P2.x) % P
+    y3 = (lam * (P1.x - x3) - P1.y) % P
     
     return Point(x3, y3)
 
-def point_double(P: Point) -> Point:
+def point_double(P1: Point) -> Point:
     """椭圆曲线倍点运算"""
-    return point_add(P, P)
+    return point_add(P1, P1)
+
+class JacobianPoint:
+    """
+    Jacobian 射影坐标点：(X, Y, Z) 对应仿射点 (X/Z^2, Y/Z^3)，Z = 0 表示无穷远点。
+    点加与倍点只用乘法和加减，不做模逆；整条运算链结束时 to_affine 只求一次逆。
+    """
+    __slots__ = ("X", "Y", "Z")
+
+    def __init__(self, X: int, Y: int, Z: int = 1):
+        self.X = X
+        self.Y = Y
+        self.Z = Z
+
+    @classmethod
+    def from_affine(cls, Pt: Point) -> "JacobianPoint":
+        if Pt == INFINITY:
+            return cls(1, 1, 0)
+        return cls(Pt.x, Pt.y, 1)
+
+    def is_infinity(self) -> bool:
+        return self.Z == 0
+
+    def to_affine(self) -> Point:
+        if self.Z == 0:
+            return INFINITY
+        zi = mod_inv(self.Z, P)
+        zi2 = zi * zi % P
+        return Point(self.X * zi2 % P, self.Y * zi2 * zi % P)
+
+JACOBIAN_INFINITY = JacobianPoint(1, 1, 0)
+
+def jacobian_double(Q: JacobianPoint) -> JacobianPoint:
+    """Jacobian 倍点（一般 a 的 dbl-2007-bl 公式：1M + 8S + 1*a）"""
+    X1, Y1, Z1 = Q.X, Q.Y, Q.Z
+    if Z1 == 0 or Y1 == 0:
+        return JACOBIAN_INFINITY
+    XX = X1 * X1 % P
+    YY = Y1 * Y1 % P
+    YYYY = YY * YY % P
+    ZZ = Z1 * Z1 % P
+    S = 2 * ((X1 + YY) ** 2 - XX - YYYY) % P
+    M = (3 * XX + A * ZZ * ZZ) % P
+    X3 = (M * M - 2 * S) % P
+    Y3 = (M * (S - X3) - 8 * YYYY) % P
+    Z3 = ((Y1 + Z1) ** 2 - YY - ZZ) % P
+    return JacobianPoint(X3, Y3, Z3)
+
+def jacobian_add(Q1: JacobianPoint, Q2: JacobianPoint) -> JacobianPoint:
+    """Jacobian 点加（两点均为 Jacobian 坐标；相等时转为倍点，互逆时得到无穷远点）"""
+    if Q1.Z == 0:
+        return Q2
+    if Q2.Z == 0:
+        return Q1
+    Z1Z1 = Q1.Z * Q1.Z % P
+    Z2Z2 = Q2.Z * Q2.Z % P
+    U1 = Q1.X * Z2Z2 % P
+    U2 = Q2.X * Z1Z1 % P
+    S1 = Q1.Y * Q2.Z * Z2Z2 % P
+    S2 = Q2.Y * Q1.Z * Z1Z1 % P
+    H = (U2 - U1) % P
+    R = (S2 - S1) % P
+    if H == 0:
+        return jacobian_double(Q1) if R == 0 else JACOBIAN_INFINITY
+    HH = H * H % P
+    HHH = H * HH % P
+    V = U1 * HH % P
+    X3 = (R * R - HHH - 2 * V) % P
+    Y3 = (R * (V - X3) - S1 * HHH) % P
+    Z3 = Q1.Z * Q2.Z * H % P
+    return JacobianPoint(X3, Y3, Z3)
+
+def jacobian_add_affine(Q1: JacobianPoint, x2: int, y2: int) -> JacobianPoint:
+    """混合点加：Q1 为 Jacobian 坐标，第二个点为仿射坐标 (x2, y2)（Z2 = 1，省去 Z2 的幂）"""
+    if Q1.Z == 0:
+        return JacobianPoint(x2, y2, 1)
+    Z1Z1 = Q1.Z * Q1.Z % P
+    U2 = x2 * Z1Z1 % P
+    S2 = y2 * Q1.Z * Z1Z1 % P
+    H = (U2 - Q1.X) % P
+    R = (S2 - Q1.Y) % P
+    if H == 0:
+        return jacobian_double(Q1) if R == 0 else JACOBIAN_INFINITY
+    HH = H * H % P
+    HHH = H * HH % P
+    V = Q1.X * HH % P
+    X3 = (R * R - HHH - 2 * V) % P
+    Y3 = (R * (V - X3) - Q1.Y * HHH) % P
+    Z3 = Q1.Z * H % P
+    return JacobianPoint(X3, Y3, Z3)
+
+def jacobian_to_affine_batch(points: List[JacobianPoint]) -> List[Tuple[int, int]]:
+    """
+    批量转回仿射坐标（Montgomery 批量求逆技巧：n 个点只做一次模逆），返回 (x, y) 列表；
+    要求所有点都不是无穷远点。
+    """
+    prefix = []
+    acc = 1
+    for Q in points:
+        prefix.append(acc)
+        acc = acc * Q.Z % P
+    inv = mod_inv(acc, P)
+    out = [None] * len(points)
+    for i in range(len(points) - 1, -1, -1):
+        Q = points[i]
+        zi = inv * prefix[i] % P
+        inv = inv * Q.Z % P
+        zi2 = zi * zi % P
+        out[i] = (Q.X * zi2 % P, Q.Y * zi2 * zi % P)
+    return out
+
+def _double_and_add(k: int, Pt: Point) -> JacobianPoint:
+    """从高位到低位的 double-and-add，全程 Jacobian 坐标（Pt 以仿射坐标做混合点加），不做模逆"""
+    if k <= 0 or Pt == INFINITY:
+        return JACOBIAN_INFINITY
+    x, y = Pt.x, Pt.y
+    Q = JacobianPoint(x, y, 1)
+    for bit in bin(k)[3:]:
+        Q = jacobian_double(Q)
+        if bit == "1":
+            Q = jacobian_add_affine(Q, x, y)
+    return Q
+
+# 基点 G 的固定基预计算表（comb / 分窗）：
+#   G_TABLE[i][j - 1] = j * 2^(w*i) * G 的仿射坐标，i = 0..ceil(256/w)-1，j = 1..2^w-1
+# kG = Σ_i G_TABLE[i][k_i - 1]（k_i 为 k 的第 i 个 w 位窗口），只需约 256/w 次混合点加，无倍点。
+# 默认 w = 8：32 行 × 255 个点。首次使用时构建（或从 SM2_G_TABLE 指定的文件加载），
+# save_fixed_base_table 可把表持久化，避免每个进程都重新构建。
+FIXED_BASE_WINDOW = 8
+G_TABLE_MAGIC = b"SM2GTBL1"
+_G_TABLE: Optional[List[List[Tuple[int, int]]]] = None
+G_TABLE_BUILD_SECONDS = 0.0
 
-def scalar_mult(k: int, P: Point) -> Point:
-    """Double-and-Add标量乘法"""
-    Q = INFINITY
-    while k > 0:
+def build_comb_table(Pt: Point, w: int) -> List[List[Tuple[int, int]]]:
+    """
+    构建点 Pt 的固定基表：table[i][j - 1] = j * 2^(w*i) * Pt。
+    先用倍点链得到各行的基点 2^(w*i) * Pt，行内用混合点加累加，
+    基点与全部表项各做一次批量求逆转回仿射坐标。
+    """
+    rows = -(-N.bit_length() // w)
+    bases = [JacobianPoint(Pt.x, Pt.y, 1)]
+    for _ in range(rows - 1):
+        base = bases[-1]
+        for _ in range(w):
+            base = jacobian_double(base)
+        bases.append(base)
+    per_row = (1 << w) - 1
+    points = []
+    for bx, by in jacobian_to_affine_batch(bases):
+        Q = JacobianPoint(bx, by, 1)
+        points.append(Q)
+        for _ in range(per_row - 1):
+            Q = jacobian_add_affine(Q, bx, by)
+            points.append(Q)
+    flat = jacobian_to_affine_batch(points)
+    return [flat[i:i + per_row] for i in range(0, len(flat), per_row)]
+
+def comb_mult(table: List[List[Tuple[int, int]]], k: int) -> JacobianPoint:
+    """用固定基表计算 k * Pt：按 w 位窗口查表累加，约 256/w 次混合点加，不做倍点"""
+    k %= N
+    w = (len(table[0]) + 1).bit_length() - 1
+    mask = (1 << w) - 1
+    Q = JACOBIAN_INFINITY
+    i = 0
+    while k:
+        d = k & mask
+        if d:
+            x, y = table[i][d - 1]
+            Q = jacobian_add_affine(Q, x, y)
+        k >>= w
+        i += 1
+    return Q
+
+def build_fixed_base_table(w: int = FIXED_BASE_WINDOW) -> List[List[Tuple[int, int]]]:
+    """构建 G 的固定基表"""
+    return build_comb_table(G, w)
+
+def save_fixed_base_table(path: str, table: Optional[List[List[Tuple[int, int]]]] = None) -> None:
+    """持久化格式：魔数 8 字节 | 窗口宽度 u8 | 行数 u16 | 按行依次的 x(32) || y(32)"""
+    table = table or fixed_base_table()
+    w = (len(table[0]) + 1).bit_length() - 1
+    with open(path, "wb") as f:
+        f.write(G_TABLE_MAGIC + bytes([w]) + len(table).to_bytes(2, "big"))
+        for row in table:
+            f.write(b"".join(x.to_bytes(32, "big") + y.to_bytes(32, "big") for x, y in row))
+
+def _equals_affine(Q: JacobianPoint, x: int, y: int) -> bool:
+    """Jacobian 点 Q 是否等于仿射点 (x, y)：比较 X = x·Z^2、Y = y·Z^3，不做模逆"""
+    if Q.Z == 0:
+        return False
+    zz = Q.Z * Q.Z % P
+    return (Q.X - x * zz) % P == 0 and (Q.Y - y * zz * Q.Z) % P == 0
+
+def check_comb_table(table: List[List[Tuple[int, int]]], Pt: Point) -> None:
+    """
+    校验固定基表的行结构：table[0][0] = Pt，table[i][0] = 2^w * table[i-1][0]，
+    table[i][j] = table[i][j-1] + table[i][0]。全部在 Jacobian 坐标下与表项比较，不做模逆；
+    不符时抛出 ValueError。
+    """
+    w = (len(table[0]) + 1).bit_length() - 1
+    if table[0][0] != (Pt.x, Pt.y):
+        raise ValueError("固定基表与基点不符")
+    for i, row in enumerate(table):
+        bx, by = row[0]
+        if i:
+            Q = JacobianPoint(*table[i - 1][0], 1)
+            for _ in range(w):
+                Q = jacobian_double(Q)
+            if not _equals_affine(Q, bx, by):
+                raise ValueError(f"固定基表第 {i} 行的基点不是上一行的 2^{w} 倍")
+        for j in range(1, len(row)):
+            if not _equals_affine(jacobian_add_affine(JacobianPoint(*row[j - 1], 1), bx, by), *row[j]):
+                raise ValueError(f"固定基表第 {i} 行第 {j} 项不是前一项加本行基点")
+
+def load_fixed_base_table(path: str) -> List[List[Tuple[int, int]]]:
+    """加载持久化的表，并校验魔数、长度、每个点都在曲线上以及整张表的行结构（见 check_comb_table）"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:8] != G_TABLE_MAGIC:
+        raise ValueError("不是 G 固定基表文件")
+    w = data[8]
+    nrows = int.from_bytes(data[9:11], "big")
+    per_row = (1 << w) - 1
+    if len(data) != 11 + 64 * per_row * nrows or nrows * w < N.bit_length():
+        raise ValueError("G 固定基表文件长度不符")
+    table = []
+    off = 11
+    for _ in range(nrows):
+        row = []
+        for _ in range(per_row):
+            x = int.from_bytes(data[off:off + 32], "big")
+            y = int.from_bytes(data[off + 32:off + 64], "big")
+            if (y * y - x * x * x - A * x - B) % P:
+                raise ValueError("G 固定基表中有不在曲线上的点")
+            row.append((x, y))
+            off += 64
+        table.append(row)
+    check_comb_table(table, G)
+    return table
+
+def fixed_base_table() -> List[List[Tuple[int, int]]]:
+    """返回 G 的固定基表（惰性构建；设置了 SM2_G_TABLE 且文件存在时从文件加载）"""
+    global _G_TABLE, G_TABLE_BUILD_SECONDS
+    if _G_TABLE is None:
+        t0 = time.perf_counter()
+        path = os.environ.get("SM2_G_TABLE")
+        _G_TABLE = load_fixed_base_table(path) if path and os.path.exists(path) else build_fixed_base_table()
+        G_TABLE_BUILD_SECONDS = time.perf_counter() - t0
+    return _G_TABLE
+
+def fixed_base_mult(k: int) -> JacobianPoint:
+    """kG：查 G 的固定基表，约 256/w 次混合点加，不做倍点"""
+    return comb_mult(fixed_base_table(), k)
+
+def scalar_mult_jacobian(k: int, Pt: Point) -> JacobianPoint:
+    """kP 的 Jacobian 坐标结果：P 为基点 G 时查固定基表，否则 double-and-add"""
+    if Pt == G:
+        return fixed_base_mult(k) if k > 0 else JACOBIAN_INFINITY
+    return _double_and_add(k, Pt)
+
+def scalar_mult(k: int, Pt: Point) -> Point:
+    """标量乘法 kP：Jacobian 坐标下计算，最后只做一次模逆转回仿射坐标"""
+    return scalar_mult_jacobian(k, Pt).to_affine()
+
+# 验证用的双标量乘法 aP + bQ（Straus–Shamir 交错 wNAF）：
+# 两个标量共用一条倍点链（约 256 次倍点），每个标量只在其 wNAF 非零位上做一次混合点加。
+# P 为 G 时使用惰性构建的 G 奇数倍表（窗口 G_WNAF_WINDOW），否则每次调用现场构建奇数倍表
+# （窗口 Q_WNAF_WINDOW，批量求逆转为仿射坐标后做混合点加）。
+G_WNAF_WINDOW = 7
+Q_WNAF_WINDOW = 5
+_G_WNAF: Optional[List[Tuple[int, int]]] = None
+
+def wnaf(k: int, w: int) -> List[int]:
+    """k 的宽度为 w 的 NAF（低位在前）：非零位为绝对值小于 2^(w-1) 的奇数，任意 w 个连续位中至多一个非零"""
+    digits = []
+    full = 1 << w
+    half = full >> 1
+    while k:
         if k & 1:
-            Q = point_add(Q, P)
-        P = point_double(P)
+            d = k & (full - 1)
+            if d >= half:
+                d -= full
+            k -= d
+        else:
+            d = 0
+        digits.append(d)
         k >>= 1
+    return digits
+
+def odd_multiples(Pt: Point, w: int) -> List[Tuple[int, int]]:
+    """[1P, 3P, 5P, ..., (2^(w-1)-1)P] 的仿射坐标（Jacobian 坐标累加后一次批量求逆）"""
+    J = JacobianPoint(Pt.x, Pt.y, 1)
+    twice = jacobian_double(J)
+    pts = [J]
+    for _ in range((1 << (w - 2)) - 1):
+        pts.append(jacobian_add(pts[-1], twice))
+    return jacobian_to_affine_batch(pts)
+
+def g_wnaf_table() -> List[Tuple[int, int]]:
+    """G 的奇数倍表（惰性构建，进程内只构建一次）"""
+    global _G_WNAF
+    if _G_WNAF is None:
+        _G_WNAF = odd_multiples(G, G_WNAF_WINDOW)
+    return _G_WNAF
+
+def double_scalar_mult_jacobian(a: int, P1: Point, b: int, P2: Point) -> JacobianPoint:
+    """aP1 + bP2 的 Jacobian 坐标结果（交错 wNAF，共用一条倍点链）"""
+    # 先把两个标量的 wNAF 合并成“第 i 位要加的仿射点”列表，主循环里只剩倍点与点加
+    adds: List[List[Tuple[int, int]]] = []
+    for k, Pt in ((a % N, P1), (b % N, P2)):
+        if k == 0 or Pt == INFINITY:
+            continue
+        if Pt == G:
+            digits, table = wnaf(k, G_WNAF_WINDOW), g_wnaf_table()
+        else:
+            digits, table = wnaf(k, Q_WNAF_WINDOW), odd_multiples(Pt, Q_WNAF_WINDOW)
+        while len(adds) < len(digits):
+            adds.append([])
+        for i, d in enumerate(digits):
+            if d > 0:
+                adds[i].append(table[d >> 1])
+            elif d < 0:
+                x, y = table[(-d) >> 1]
+                adds[i].append((x, P - y))
+    Q = JACOBIAN_INFINITY
+    for i in range(len(adds) - 1, -1, -1):
+        Q = jacobian_double(Q)
+        for x, y in adds[i]:
+            Q = jacobian_add_affine(Q, x, y)
     return Q
 
+def double_scalar_mult(a: int, P1: Point, b: int, P2: Point) -> Point:
+    """aP1 + bP2，结果为仿射坐标"""
+    return double_scalar_mult_jacobian(a, P1, b, P2).to_affine()
+
+# 常数代价的标量乘法（Montgomery 阶梯）：用于私钥、随机数 k 等秘密标量。
+# - 标量先改写为 k' = k + N 或 k + 2N，使其位长固定为 N.bit_length() + 1 且最高位为 1：
+#   循环次数与 k 的位长、汉明重量无关，且阶梯从 (P, 2P) 开始，不会经过无穷远点的特殊分支；
+# - 每一位固定做一次 Jacobian 点加与一次倍点，按位选择只是交换两个寄存器的下标；
+# - 起始点做射影随机化（(X, Y, Z) -> (λ^2 X, λ^3 Y, λZ)），中间坐标与输入无确定关系。
+# Python 大整数运算本身不是常数时间的，这里保证的是“每一位的域运算次数固定”，
+# 消除 double-and-add / 查表路径中随秘密位变化的点加次数。
+SCALAR_MULT_FAST = "fast"
+SCALAR_MULT_LADDER = "ladder"
+SECRET_SCALAR_MULT = os.environ.get("SM2_SCALAR_MULT", SCALAR_MULT_FAST)
+
+def scalar_mult_ladder_jacobian(k: int, Pt: Point) -> JacobianPoint:
+    """Montgomery 阶梯计算 kP（Jacobian 坐标），每一位一次点加 + 一次倍点"""
+    k %= N
+    if k == 0 or Pt == INFINITY:
+        return JACOBIAN_INFINITY
+    bits = N.bit_length()
+    k += N
+    if k.bit_length() <= bits:
+        k += N
+    lam = secrets.randbelow(P - 1) + 1
+    lam2 = lam * lam % P
+    R = [JacobianPoint(Pt.x * lam2 % P, Pt.y * lam2 * lam % P, lam), None]
+    R[1] = jacobian_double(R[0])
+    for i in range(bits - 1, -1, -1):
+        b = (k >> i) & 1
+        R[1 - b] = jacobian_add(R[0], R[1])
+        R[b] = jacobian_double(R[b])
+    return R[0]
+
+def scalar_mult_ladder(k: int, Pt: Point) -> Point:
+    return scalar_mult_ladder_jacobian(k, Pt).to_affine()
+
+def set_secret_scalar_mult(backend: str) -> None:
+    """选择秘密标量（密钥生成、签名中的 dG 与 kG）使用的后端：SCALAR_MULT_FAST 或 SCALAR_MULT_LADDER"""
+    global SECRET_SCALAR_MULT
+    if backend not in (SCALAR_MULT_FAST, SCALAR_MULT_LADDER):
+        raise ValueError(f"未知的标量乘法后端: {backend}")
+    SECRET_SCALAR_MULT = backend
+
+def secret_scalar_mult(k: int, Pt: Point) -> Point:
+    """对秘密标量计算 kP：按 SECRET_SCALAR_MULT 选择查表 / double-and-add 快速路径或常数代价的阶梯"""
+    if SECRET_SCALAR_MULT == SCALAR_MULT_LADDER:
+        return scalar_mult_ladder(k, Pt)
+    return scalar_mult(k, Pt)
+
 def hash_msg(msg: bytes) -> int:
     """消息哈希函数（简化版，实际应使用SM3）"""
     return int.from_bytes(hashlib.sha256(msg).digest(), 'big')
@@ -89,6 +451,10 @@ def sm3_hash(data: bytes) -> bytes:
     # 实际应用中应使用国密SM3标准实现
     return hashlib.sha256(data).digest()
 
+def sm3_hasher(data: bytes = b""):
+    """与 sm3_hash 相同算法的增量哈希对象，可 copy() 复用已吸收前缀的中间状态"""
+    return hashlib.sha256(data)
+
 def compute_za(user_id: str, public_key: Point) -> bytes:
     """计算ZA值"""
     entla = len(user_id).to_bytes(2, 'big')
@@ -97,9 +463,127 @@ def compute_za(user_id: str, public_key: Point) -> bytes:
     data += public_key.x.to_bytes(32, 'big') + public_key.y.to_bytes(32, 'big')
     return sm3_hash(data)
 
+# 验证方上下文缓存：以 (user_id, 公钥) 为键的有界 LRU（functools.lru_cache，cache_info() 给出命中 / 未命中计数）。
+# 每项保存 Z_A 及吸收了 Z_A 的哈希对象（计算 e 时复制后只哈希消息），以及公钥的固定基表：
+# 有了公钥表，sG + tP_A 两部分都只需查表累加（约 256/8 + 256/KEY_COMB_WINDOW 次点加），不再有倍点链。
+# 公钥表在同一公钥第 KEY_TABLE_MIN_USES 次验证时才构建（建表约相当于数次验证的开销），
+# 偶尔出现的公钥不付建表代价，仍走交错 wNAF。
+# 容量默认 4096，覆盖“数千个长期公钥”的工作集；可由环境变量 SM2_VERIFY_CACHE 或
+# configure_verify_cache(size) 调整（每个建了表的公钥约占 170 KB）。
+# 不在曲线上的公钥不进缓存：校验失败时工厂函数抛出 ValueError，lru_cache 不缓存异常，
+# 因此垃圾公钥流不会挤掉有效的上下文。
+VERIFY_CACHE_SIZE = int(os.environ.get("SM2_VERIFY_CACHE", 4096))
+KEY_COMB_WINDOW = 4
+KEY_TABLE_MIN_USES = 8
+
+class VerifierContext:
+    """单个 (user_id, 公钥) 的验证预计算；user_id 为 None 时（ECDSA）不计算 Z_A"""
+    __slots__ = ("public_key", "user_id", "za", "_hasher", "table", "uses")
+
+    def __init__(self, user_id: Optional[str], public_key: Point):
+        self.public_key = public_key
+        self.user_id = user_id
+        self.za = compute_za(user_id, public_key) if user_id is not None else None
+        self._hasher = sm3_hasher(self.za) if self.za is not None else None
+        self.table: Optional[List[List[Tuple[int, int]]]] = None
+        self.uses = 0
+
+    def digest_e(self, msg: bytes) -> int:
+        """e = H(Z_A || msg) mod n，Z_A 部分已在哈希对象中"""
+        h = self._hasher.copy()
+        h.update(msg)
+        return int.from_bytes(h.digest(), 'big') % N
+
+    def mult_add_g(self, a: int, b: int) -> JacobianPoint:
+        """aG + b * 公钥（Jacobian 坐标）：公钥表可用时两部分都查表，否则交错 wNAF"""
+        self.uses += 1
+        if self.table is None and self.uses >= KEY_TABLE_MIN_USES:
+            self.table = build_comb_table(self.public_key, KEY_COMB_WINDOW)
+        if self.table is None:
+            return double_scalar_mult_jacobian(a, G, b, self.public_key)
+        return jacobian_add(fixed_base_mult(a), comb_mult(self.table, b))
+
+def _make_verifier_context(user_id: Optional[str], x: int, y: int) -> VerifierContext:
+    Pt = Point(x, y)
+    if not is_on_curve(Pt):
+        raise ValueError("公钥不在曲线上")
+    return VerifierContext(user_id, Pt)
+
+_verifier_context = lru_cache(maxsize=VERIFY_CACHE_SIZE)(_make_verifier_context)
+
+def configure_verify_cache(size: int) -> None:
+    """以新容量重建验证上下文缓存（原有条目与计数被丢弃）"""
+    global _verifier_context, VERIFY_CACHE_SIZE
+    if size < 0:
+        raise ValueError("缓存容量不能为负")
+    VERIFY_CACHE_SIZE = size
+    _verifier_context = lru_cache(maxsize=size)(_make_verifier_context)
+
+def verifier_context(user_id: Optional[str], public_key: Point) -> Optional[VerifierContext]:
+    """取 (user_id, 公钥) 的验证上下文（LRU 缓存）；公钥不在曲线上（含无穷远点）时返回 None 且不缓存"""
+    try:
+        return _verifier_context(user_id, public_key.x, public_key.y)
+    except ValueError:
+        return None
+
+def verifier_cache_info():
+    """验证上下文缓存的命中 / 未命中 / 容量统计"""
+    return _verifier_context.cache_info()
+
+def verifier_cache_clear() -> None:
+    _verifier_context.cache_clear()
+
+def is_on_curve(Pt: Point) -> bool:
+    """公钥合法性检查：坐标在 [0, p) 内、不是无穷远点且满足曲线方程"""
+    x, y = Pt.x, Pt.y
+    if Pt == INFINITY or not (0 <= x < P and 0 <= y < P):
+        return False
+    return (y * y - x * x * x - A * x - B) % P == 0
+
+def batch_mod_inv(values: List[int], n: int) -> List[int]:
+    """批量求模逆（Montgomery 技巧：一次模逆 + 3(k-1) 次乘法），values 中不能有 0"""
+    prefix = []
+    acc = 1
+    for v in values:
+        prefix.append(acc)
+        acc = acc * v % n
+    inv = mod_inv(acc, n)
+    out = [0] * len(values)
+    for i in range(len(values) - 1, -1, -1):
+        out[i] = inv * prefix[i] % n
+        inv = inv * values[i] % n
+    return out
+
+def x_matches(R: JacobianPoint, x: int) -> bool:
+    """
+    判断仿射 x(R) ≡ x (mod n)：由于 n < p，x(R) 只可能是 x 或 x + n；
+    在 Jacobian 坐标下比较 X 与 x·Z^2，无需模逆。
+    """
+    if R.Z == 0:
+        return False
+    zz = R.Z * R.Z % P
+    return (x * zz - R.X) % P == 0 or (x + N < P and ((x + N) * zz - R.X) % P == 0)
+
+def verify_jobs_batch(jobs: List[Optional[Tuple[VerifierContext, int, int, int]]]) -> List[bool]:
+    """
+    批量验证的公共部分：jobs[i] 为 (验证上下文, a, b, x) 表示检查 x(aG + b * 公钥) ≡ x (mod n)，
+    为 None 表示输入已判定无效。批内出现至少 KEY_TABLE_MIN_USES 次的公钥先建好固定基表，
+    每项只做查表累加与一次 Jacobian 坐标比较，整批不做模逆。
+    """
+    counts = {}
+    for job in jobs:
+        if job is not None:
+            counts[id(job[0])] = counts.get(id(job[0]), 0) + 1
+    for job in jobs:
+        if job is not None:
+            ctx = job[0]
+            if ctx.table is None and counts[id(ctx)] + ctx.uses >= KEY_TABLE_MIN_USES:
+                ctx.table = build_comb_table(ctx.public_key, KEY_COMB_WINDOW)
+    return [job is not None and x_matches(job[0].mult_add_g(job[1], job[2]), job[3]) for job in jobs]
+
 def sm2_sign(private_key: int, msg: bytes, user_id: str, k: Optional[int] = None) -> Tuple[int, int]:
     """SM2签名算法"""
-    public_key = scalar_mult(private_key, G)
+    public_key = secret_scalar_mult(private_key, G)
     za = compute_za(user_id, public_key)
     e = int.from_bytes(sm3_hash(za + msg), 'big') % N
     
@@ -107,7 +591,7 @@ def sm2_sign(private_key: int, msg: bytes, user_id: str, k: Optional[int] = None
         if k is None:
             k = secrets.randbelow(N - 1) + 1
         
-        kG = scalar_mult(k, G)
+        kG = secret_scalar_mult(k, G)
         r = (e + kG.x) % N
         if r == 0 or r + k == N:
             k = None
@@ -126,19 +610,41 @@ def sm2_verify(public_key: Point, msg: bytes, signature: Tuple[int, int], user_i
     if not (1 <= r < N) or not (1 <= s < N):
         return False
     
-    za = compute_za(user_id, public_key)
-    e = int.from_bytes(sm3_hash(za + msg), 'big') % N
     t = (r + s) % N
+    if t == 0:
+        return False
     
-    point1 = scalar_mult(s, G)
-    point2 = scalar_mult(t, public_key)
-    xy = point_add(point1, point2)
+    # Z_A 与公钥预计算取自验证上下文缓存；整个验证只做一次模逆
+    ctx = verifier_context(user_id, public_key)
+    if ctx is None:
+        return False
+    e = ctx.digest_e(msg)
+    xy = ctx.mult_add_g(s, t)
+    if xy.is_infinity():
+        return False
     
-    R = (e + xy.x) % N
+    R = (e + xy.to_affine().x) % N
     return R == r
 
+def sm2_verify_batch(items: List[Tuple[Point, bytes, Tuple[int, int], str]]) -> List[bool]:
+    """
+    批量 SM2 验证：items[i] = (公钥, 消息, (r, s), user_id)，返回每项一个布尔值。
+    先检查全部输入（r、s、t 的范围；公钥不在曲线上时验证上下文为 None，与 sm2_verify 同一规则），再对每项检查 x(sG + tP_A) ≡ r - e (mod n)。
+    签名只含 R 的 x 坐标（y 的符号未知），随机线性组合的聚合检查在数学上不可行，
+    因此逐项判定；批量带来的收益来自共享的验证上下文（Z_A、公钥表）与免模逆的坐标比较。
+    """
+    jobs = []
+    for public_key, msg, (r, s), user_id in items:
+        t = (r + s) % N
+        if not (1 <= r < N and 1 <= s < N) or t == 0:
+            jobs.append(None)
+            continue
+        ctx = verifier_context(user_id, public_key)
+        jobs.append(None if ctx is None else (ctx, s, t, (r - ctx.digest_e(msg)) % N))
+    return verify_jobs_batch(jobs)
+
 def sm2_keygen() -> Tuple[int, Point]:
     """生成SM2密钥对"""
     private_key = secrets.randbelow(N - 1) + 1
-    public_key = scalar_mult(private_key, G)
+    public_key = secret_scalar_mult(private_key, G)
     return private_key, public_key
\ No newline at end of file
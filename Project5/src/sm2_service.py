@@ -0,0 +1,165 @@
+"""
+多进程 SM2 签名 / 验证服务：纯 Python 的 sm2_sign / sm2_verify 受 GIL 限制只能用满一个核，
+这里用进程池把请求分摊到多个核上。
+- 每个工作进程在 initializer 中预热 G 的固定基表与 wNAF 表（设置 SM2_G_TABLE 时从文件加载），
+  公钥的验证上下文（Z_A、comb 表）留在各进程自己的 LRU 中，随请求逐渐变热；
+- 异步接口：await service.sign(...) / await service.verify(...) 把请求放入 asyncio 队列，
+  调度协程一次取出至多 batch 个同类请求打包成一个任务交给进程池（验证走 sm2_verify_batch），
+  结果按请求在包内的顺序写回各自的 Future；同时在途的包数不超过 2 * workers；
+  close() 后不再接收新请求，已入队的请求仍会完成；
+- 同步接口：sign_many / verify_many 把列表切块后经 executor.map 分发，结果顺序与输入一致。
+注意私钥会随签名请求经管道发送给工作进程。
+"""
+
+from __future__ import annotations
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from sm2 import Point, fixed_base_table, g_wnaf_table, sm2_sign, sm2_verify_batch
+
+OP_SIGN = "sign"
+OP_VERIFY = "verify"
+DEFAULT_BATCH = 64
+
+def _init_worker() -> None:
+    """工作进程初始化：预热 G 的预计算表"""
+    fixed_base_table()
+    g_wnaf_table()
+
+def _sign_batch(items: List[Tuple[int, bytes, str]]) -> List[Tuple[int, int]]:
+    return [sm2_sign(d, msg, uid) for d, msg, uid in items]
+
+def _verify_batch(items: List[Tuple[Point, bytes, Tuple[int, int], str]]) -> List[bool]:
+    return sm2_verify_batch(items)
+
+_RUNNERS = {OP_SIGN: _sign_batch, OP_VERIFY: _verify_batch}
+
+def _warm(_) -> int:
+    # 稍作停留，使 workers 个预热任务落到不同的工作进程上
+    time.sleep(0.05)
+    return os.getpid()
+
+class SM2Service:
+    """
+    多进程签名 / 验证服务：
+      async with SM2Service(workers=4) as service:
+          sig = await service.sign(d, b"msg", "alice@example.com")
+          ok = await service.verify(pub, b"msg", sig, "alice@example.com")
+      或同步批量：service.sign_many([(d, msg, uid), ...])、service.verify_many([(pub, msg, sig, uid), ...])，
+      用完后 service.shutdown()
+    """
+    def __init__(self, workers: Optional[int] = None, batch: int = DEFAULT_BATCH):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch = batch
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        self._queue: Optional[asyncio.Queue] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+        self._closed = False
+
+    def warm_up(self) -> None:
+        """启动全部工作进程并等待其完成预热（避免首批请求计入建表时间）"""
+        list(self._pool.map(_warm, range(self.workers)))
+
+    # ---- 同步批量接口 ----
+    def _map(self, op: str, items: list) -> list:
+        chunks = [items[i:i + self.batch] for i in range(0, len(items), self.batch)]
+        out = []
+        for res in self._pool.map(_RUNNERS[op], chunks):
+            out.extend(res)
+        return out
+
+    def sign_many(self, items: List[Tuple[int, bytes, str]]) -> List[Tuple[int, int]]:
+        return self._map(OP_SIGN, items)
+
+    def verify_many(self, items: List[Tuple[Point, bytes, Tuple[int, int], str]]) -> List[bool]:
+        return self._map(OP_VERIFY, items)
+
+    # ---- 异步接口 ----
+    async def start(self) -> "SM2Service":
+        if self._dispatcher is None:
+            self._queue = asyncio.Queue()
+            self._inflight = asyncio.Semaphore(2 * self.workers)
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+        return self
+
+    async def _submit(self, op: str, args: tuple):
+        if self._closed:
+            raise RuntimeError("服务已关闭")
+        if self._dispatcher is None:
+            await self.start()
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((op, args, fut))
+        return await fut
+
+    async def sign(self, private_key: int, msg: bytes, user_id: str) -> Tuple[int, int]:
+        return await self._submit(OP_SIGN, (private_key, msg, user_id))
+
+    async def verify(self, public_key: Point, msg: bytes, signature: Tuple[int, int], user_id: str) -> bool:
+        return await self._submit(OP_VERIFY, (public_key, msg, signature, user_id))
+
+    async def _dispatch(self) -> None:
+        queue = self._queue
+        stop = False
+        while not stop:
+            req = await queue.get()
+            if req is None:
+                break
+            reqs = [req]
+            while len(reqs) < self.batch and not queue.empty():
+                req = queue.get_nowait()
+                if req is None:
+                    stop = True
+                    break
+                reqs.append(req)
+            groups = {}
+            for req in reqs:
+                groups.setdefault(req[0], []).append(req)
+            for op, group in groups.items():
+                await self._inflight.acquire()
+                task = asyncio.ensure_future(self._run(op, group))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, op: str, group: list) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(self._pool, _RUNNERS[op], [args for _, args, _ in group])
+        except Exception as e:  # 工作进程异常：同包的请求都收到该异常
+            for _, _, fut in group:
+                if not fut.done():
+                    fut.set_exception(e)
+        else:
+            for (_, _, fut), res in zip(group, results):
+                if not fut.done():
+                    fut.set_result(res)
+        finally:
+            self._inflight.release()
+
+    async def close(self) -> None:
+        """
+        停止接收新请求；已在队列中的请求照常分派，等全部完成后关闭进程池。
+        队列末尾放入哨兵 None，调度协程分派完它之前的请求后退出。
+        """
+        self._closed = True
+        if self._dispatcher is not None:
+            self._queue.put_nowait(None)
+            await self._dispatcher
+            self._dispatcher = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        """关闭进程池（只使用同步接口时调用）"""
+        self._closed = True
+        self._pool.shutdown()
+
+    async def __aenter__(self) -> "SM2Service":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
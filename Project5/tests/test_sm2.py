@@ -0,0 +1,268 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+import secrets
+import pytest
+from sm2 import (G, N, P, INFINITY, Point, point_add, point_double, scalar_mult, scalar_mult_jacobian,
+                 jacobian_add, jacobian_double, JacobianPoint, sm2_keygen, sm2_sign, sm2_verify)
+from ecdsa import ecdsa_sign, ecdsa_verify
+
+def _scalar_mult_affine(k, Pt):
+    # 仿射坐标 double-and-add（优化前的实现），作为对照
+    Q = INFINITY
+    while k > 0:
+        if k & 1:
+            Q = point_add(Q, Pt)
+        Pt = point_double(Pt)
+        k >>= 1
+    return Q
+
+def test_jacobian_matches_affine():
+    # Jacobian 坐标的标量乘法、点加、倍点应与仿射坐标结果一致
+    for k in [1, 2, 3, 5, 255, N - 1, secrets.randbelow(N)]:
+        assert scalar_mult(k, G) == _scalar_mult_affine(k, G)
+    assert scalar_mult(N, G) == INFINITY
+    assert scalar_mult(N - 1, G) == Point(G.x, (-G.y) % P)
+    P1, P2 = scalar_mult(7, G), scalar_mult(11, G)
+    J1, J2 = scalar_mult_jacobian(7, G), scalar_mult_jacobian(11, G)
+    assert jacobian_add(J1, J2).to_affine() == point_add(P1, P2) == scalar_mult(18, G)
+    assert jacobian_double(J1).to_affine() == point_double(P1) == scalar_mult(14, G)
+    assert jacobian_add(J1, J1).to_affine() == scalar_mult(14, G)
+    assert jacobian_add(J1, scalar_mult_jacobian(N - 7, G)).is_infinity()
+    assert JacobianPoint.from_affine(INFINITY).to_affine() == INFINITY
+
+def test_sm2_and_ecdsa_sign_verify():
+    d, pub = sm2_keygen()
+    sig = sm2_sign(d, b"hello", "alice@example.com")
+    assert sm2_verify(pub, b"hello", sig, "alice@example.com")
+    assert not sm2_verify(pub, b"hello!", sig, "alice@example.com")
+    assert not sm2_verify(pub, b"hello", sig, "bob@example.com")
+    k = secrets.randbelow(N - 1) + 1
+    sig = ecdsa_sign(b"tx", d, k)
+    assert ecdsa_verify(b"tx", sig, pub)
+    assert not ecdsa_verify(b"tx2", sig, pub)
+    assert not ecdsa_verify(b"tx", (sig[0], (sig[1] + 1) % N), pub)
+
+def test_fixed_base_table(tmp_path):
+    # 固定基表查表结果应与通用 double-and-add 一致；持久化后可原样加载，损坏的文件被拒绝
+    import sm2
+    for k in [1, 2, 255, 256, 257, N - 1, N + 5, secrets.randbelow(N)]:
+        assert sm2.fixed_base_mult(k).to_affine() == sm2._double_and_add(k % N, G).to_affine()
+    table = sm2.build_fixed_base_table(w=3)
+    assert table[1][0] == (scalar_mult(8, G).x, scalar_mult(8, G).y)
+    path = str(tmp_path / "g_table.bin")
+    sm2.save_fixed_base_table(path, table)
+    assert sm2.load_fixed_base_table(path) == table
+    data = bytearray(open(path, "rb").read())
+    data[-1] ^= 1
+    open(path, "wb").write(bytes(data))
+    try:
+        sm2.load_fixed_base_table(path)
+        assert False, "损坏的表文件应被拒绝"
+    except ValueError:
+        pass
+    # 换成其他合法曲线点（篡改而非损坏）同样被行结构校验拒绝
+    for i, j, pt in [(1, 3, table[1][4]), (2, 0, table[2][1]), (0, 6, (G.x, (-G.y) % P))]:
+        tampered = [list(row) for row in table]
+        tampered[i][j] = pt
+        sm2.save_fixed_base_table(path, tampered)
+        with pytest.raises(ValueError):
+            sm2.load_fixed_base_table(path)
+
+def test_double_scalar_mult():
+    # 交错 wNAF 双标量乘法应与两次独立标量乘法之和一致（含 G 与任意点、零标量、结果为无穷远点）
+    import sm2
+    Q = scalar_mult(secrets.randbelow(N - 1) + 1, G)
+    for a, b in [(1, 1), (0, 5), (5, 0), (N - 1, 1), (secrets.randbelow(N), secrets.randbelow(N))]:
+        expected = point_add(scalar_mult(a, G), scalar_mult(b, Q))
+        assert sm2.double_scalar_mult(a, G, b, Q) == expected
+        assert sm2.double_scalar_mult(b, Q, a, G) == expected
+    assert sm2.double_scalar_mult(3, G, N - 3, G) == INFINITY
+    assert sm2.double_scalar_mult(0, G, 0, Q) == INFINITY
+    for k in [1, 7, 2 ** 200 + 12345, secrets.randbelow(N)]:
+        digits = sm2.wnaf(k, 5)
+        assert sum(d << i for i, d in enumerate(digits)) == k
+        assert all(d == 0 or (d % 2 and abs(d) < 16) for d in digits)
+
+def test_verifier_context_cache():
+    # 重复验证命中缓存；公钥表在第 KEY_TABLE_MIN_USES 次使用时构建，结果与未缓存路径一致
+    import sm2
+    sm2.verifier_cache_clear()
+    d, pub = sm2_keygen()
+    sigs = [(m, sm2_sign(d, m, "alice")) for m in (b"a", b"b", b"c")]
+    for m, sig in sigs:
+        assert sm2_verify(pub, m, sig, "alice")
+        assert not sm2_verify(pub, m + b"x", sig, "alice")
+    info = sm2.verifier_cache_info()
+    assert info.misses == 1 and info.hits == 5
+    ctx = sm2.verifier_context("alice", pub)
+    assert ctx.za == sm2.compute_za("alice", pub)
+    a, b = secrets.randbelow(N), secrets.randbelow(N)
+    expected = sm2.double_scalar_mult(a, G, b, pub)
+    while ctx.table is None:
+        assert ctx.mult_add_g(a, b).to_affine() == expected
+    assert ctx.uses == sm2.KEY_TABLE_MIN_USES
+    assert ctx.mult_add_g(a, b).to_affine() == expected
+    assert all(sm2_verify(pub, m, sig, "alice") for m, sig in sigs)
+    # 不同 user_id 是不同的缓存项
+    assert not sm2_verify(pub, b"a", sigs[0][1], "bob")
+    assert sm2.verifier_cache_info().misses == 2
+
+def test_verify_invalid_public_key():
+    # 无穷远点与不在曲线上的公钥：重复验证超过 KEY_TABLE_MIN_USES 次也只返回 False，不建表、不抛异常
+    import sm2
+    sm2.verifier_cache_clear()
+    d, pub = sm2_keygen()
+    sig = sm2_sign(d, b"m", "u")
+    esig = ecdsa_sign(b"m", d, secrets.randbelow(N - 1) + 1)
+    for bad in (INFINITY, Point(5, 0), Point(pub.x, (pub.y + 1) % P)):
+        for _ in range(sm2.KEY_TABLE_MIN_USES + 2):
+            assert not sm2_verify(bad, b"m", sig, "u")
+            assert not sm2_verify(bad, b"m", (1, 2), "u")
+            assert not ecdsa_verify(b"m", esig, bad)
+        assert sm2.verifier_context("u", bad) is None
+    assert sm2_verify(pub, b"m", sig, "u") and ecdsa_verify(b"m", esig, pub)
+
+def test_verify_cache_configurable():
+    # 缓存容量可调；无效公钥不进缓存，不会挤掉有效的上下文
+    import sm2
+    default = sm2.VERIFY_CACHE_SIZE
+    assert default >= 4096
+    sm2.configure_verify_cache(2)
+    try:
+        keys = [sm2_keygen() for _ in range(3)]
+        sigs = [sm2_sign(d, b"m", "u") for d, _ in keys]
+        for (_, pub), sig in zip(keys[:2], sigs):
+            assert sm2_verify(pub, b"m", sig, "u")
+        for i in range(20):
+            assert not sm2_verify(Point(i, i), b"m", sigs[0], "u")
+        info = sm2.verifier_cache_info()
+        assert info.maxsize == 2 and info.currsize == 2
+        before = info.hits
+        for (_, pub), sig in zip(keys[:2], sigs):
+            assert sm2_verify(pub, b"m", sig, "u")
+        assert sm2.verifier_cache_info().hits == before + 2
+        # 第三个有效公钥按 LRU 淘汰最久未用的一项
+        assert sm2_verify(keys[2][1], b"m", sigs[2], "u")
+        assert sm2.verifier_cache_info().currsize == 2
+        with pytest.raises(ValueError):
+            sm2.configure_verify_cache(-1)
+    finally:
+        sm2.configure_verify_cache(default)
+
+def test_verify_batch():
+    # 批量验证与逐条验证结果一致：篡改的消息、越界的 r/s、不在曲线上的公钥都只影响对应项
+    import sm2
+    from ecdsa import ecdsa_verify_batch
+    keys = [sm2_keygen() for _ in range(3)]
+    items, eitems = [], []
+    for i in range(24):
+        d, pub = keys[i % 3]
+        msg = b"batch-%d" % i
+        items.append((pub, msg, sm2_sign(d, msg, "uid-%d" % (i % 3)), "uid-%d" % (i % 3)))
+        eitems.append((msg, ecdsa_sign(msg, d, secrets.randbelow(N - 1) + 1), pub))
+    bad = {3: "msg", 7: "range", 11: "curve"}
+    for i, kind in bad.items():
+        pub, msg, (r, s), uid = items[i]
+        emsg, (er, es), _ = eitems[i]
+        if kind == "msg":
+            items[i] = (pub, msg + b"!", (r, s), uid)
+            eitems[i] = (emsg + b"!", (er, es), pub)
+        elif kind == "range":
+            items[i] = (pub, msg, (r, N), uid)
+            eitems[i] = (emsg, (0, es), pub)
+        else:
+            off = Point(pub.x, (pub.y + 1) % P)
+            items[i] = (off, msg, (r, s), uid)
+            eitems[i] = (emsg, (er, es), off)
+    expected = [i not in bad for i in range(24)]
+    assert sm2.sm2_verify_batch(items) == expected
+    assert [sm2_verify(*it) for it in items[:12]] == expected[:12]
+    assert ecdsa_verify_batch(eitems) == expected
+    assert [ecdsa_verify(*it) for it in eitems[:12]] == expected[:12]
+    assert sm2.sm2_verify_batch([]) == [] and ecdsa_verify_batch([]) == []
+
+def test_scalar_mult_ladder(monkeypatch):
+    # 阶梯结果与快速路径一致；点加 / 倍点次数与标量的位长、汉明重量无关
+    # （耗时随随机标量的离散程度见 bench_sm2.bench_ladder）
+    import sm2
+    Q = scalar_mult(secrets.randbelow(N - 1) + 1, G)
+    for k in [1, 2, 3, N - 1, N, N + 5, 2 ** 255, secrets.randbelow(N)]:
+        assert sm2.scalar_mult_ladder(k, G) == scalar_mult(k, G)
+        assert sm2.scalar_mult_ladder(k, Q) == scalar_mult(k, Q)
+
+    counts = {"add": 0, "double": 0}
+    add, double = sm2.jacobian_add, sm2.jacobian_double
+    def counting_add(a, b):
+        counts["add"] += 1
+        return add(a, b)
+    def counting_double(a):
+        counts["double"] += 1
+        return double(a)
+    monkeypatch.setattr(sm2, "jacobian_add", counting_add)
+    monkeypatch.setattr(sm2, "jacobian_double", counting_double)
+    scalars = [1, 2 ** 128, N - 1, (1 << 256) - 1, secrets.randbelow(N)]
+    ops = []
+    for k in scalars:
+        counts.update(add=0, double=0)
+        sm2.scalar_mult_ladder_jacobian(k, G)
+        ops.append((counts["add"], counts["double"]))
+    assert len(set(ops)) == 1
+    monkeypatch.undo()
+
+def test_secret_scalar_mult_backend():
+    # 切换到阶梯后端后密钥生成、签名仍与快速路径互通
+    import sm2
+    with pytest.raises(ValueError):
+        sm2.set_secret_scalar_mult("bogus")
+    old = sm2.SECRET_SCALAR_MULT
+    sm2.set_secret_scalar_mult(sm2.SCALAR_MULT_LADDER)
+    try:
+        d, pub = sm2_keygen()
+        sig = sm2_sign(d, b"ladder", "uid")
+        esig = ecdsa_sign(b"ladder", d, secrets.randbelow(N - 1) + 1)
+    finally:
+        sm2.set_secret_scalar_mult(old)
+    assert pub == scalar_mult(d, G)
+    assert sm2_verify(pub, b"ladder", sig, "uid")
+    assert ecdsa_verify(b"ladder", esig, pub)
+
+def test_sm2_service():
+    # 多进程服务：异步并发请求与同步批量接口的结果都与单进程一致且保持顺序
+    import asyncio
+    from sm2_service import SM2Service
+    keys = [sm2_keygen() for _ in range(2)]
+    msgs = [b"service-%d" % i for i in range(10)]
+
+    async def run():
+        async with SM2Service(workers=2, batch=4) as service:
+            sigs = await asyncio.gather(*(service.sign(keys[i % 2][0], m, "uid") for i, m in enumerate(msgs)))
+            checks = [service.verify(keys[i % 2][1], m, sig, "uid") for i, (m, sig) in enumerate(zip(msgs, sigs))]
+            checks.append(service.verify(keys[0][1], b"tampered", sigs[0], "uid"))
+            return sigs, await asyncio.gather(*checks)
+    sigs, oks = asyncio.run(run())
+
+    async def close_with_pending():
+        # close() 之前已入队的请求都会完成；close() 之后的请求被拒绝
+        service = SM2Service(workers=2, batch=4)
+        pending = [asyncio.ensure_future(service.sign(keys[0][0], m, "uid")) for m in msgs[:6]]
+        await asyncio.sleep(0)
+        await asyncio.wait_for(service.close(), 60)
+        assert all(t.done() for t in pending)
+        with pytest.raises(RuntimeError):
+            await service.sign(keys[0][0], b"late", "uid")
+        return [t.result() for t in pending]
+    late = asyncio.run(close_with_pending())
+    assert all(sm2_verify(keys[0][1], m, sig, "uid") for m, sig in zip(msgs[:6], late))
+    assert oks == [True] * len(msgs) + [False]
+    assert all(sm2_verify(keys[i % 2][1], m, sig, "uid") for i, (m, sig) in enumerate(zip(msgs, sigs)))
+
+    service = SM2Service(workers=2, batch=3)
+    try:
+        sigs = service.sign_many([(keys[i % 2][0], m, "uid") for i, m in enumerate(msgs)])
+        items = [(keys[i % 2][1], m, sig, "uid") for i, (m, sig) in enumerate(zip(msgs, sigs))]
+        items[5] = (keys[0][1], b"x", sigs[5], "uid")
+        assert service.verify_many(items) == [i != 5 for i in range(len(msgs))]
+    finally:
+        service.shutdown()